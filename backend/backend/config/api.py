@@ -1,9 +1,16 @@
+from core.cache import get_stats as get_list_cache_stats
+from core.events import hub as event_hub
+from core.exceptions import ConcurrentUpdateError
+from core.middleware import get_stats as get_compression_stats
+from core.renderers import FastJSONRenderer
 from django.http import HttpRequest
+from django.http import HttpResponse
 from ninja.openapi.docs import Redoc
 from ninja_extra import NinjaExtraAPI
 from note import apis as note_apis
 
 from config.auth import AuthController
+from config.stream import StreamController
 
 
 api = NinjaExtraAPI(
@@ -13,9 +20,16 @@ api = NinjaExtraAPI(
     app_name="backend",
     docs=Redoc(),
     docs_url="docs/",
+    renderer=FastJSONRenderer(),
 )
 
 
+@api.exception_handler(ConcurrentUpdateError)
+def concurrent_update(request: HttpRequest, exc: ConcurrentUpdateError) -> HttpResponse:  # noqa: ARG001
+    """Answer a write that lost the race against another write of the same object with 412."""
+    return api.create_response(request, {"detail": "Precondition Failed"}, status=412)
+
+
 @api.get(
     "",
     tags=["health_check"],
@@ -30,11 +44,20 @@ async def api_root_health_check(request: HttpRequest):  # noqa: ARG001
     tags=["health_check"],
 )
 async def health_check(request: HttpRequest):  # noqa: ARG001
-    """Check api health."""
-    return {"status": "healthy"}
+    """Check api health. also reports the list cache, compression and event counters of this process."""
+    return {
+        "status": "healthy",
+        "list_cache": get_list_cache_stats(),
+        "compression": get_compression_stats(),
+        "events": event_hub.get_stats(),
+    }
 
 
 api.register_controllers(AuthController)
 
 api.register_controllers(note_apis.NoteBookController)
 api.register_controllers(note_apis.NoteController)
+api.register_controllers(note_apis.SyncController)
+api.register_controllers(note_apis.WorkspaceController)
+
+api.register_controllers(StreamController)
@@ -7,10 +7,34 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+from typing import Any
 
 from django.core.asgi import get_asgi_application
 
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.config.settings.local")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# the app registry is ready only now
+from core.tasks import start_periodic_task  # noqa: E402
+from django.conf import settings  # noqa: E402
+from note.retention import purge_deleted  # noqa: E402
+
+from config.stream import STREAM_PATH  # noqa: E402
+from config.stream import websocket_stream  # noqa: E402
+
+
+async def application(scope: dict[str, Any], receive: Any, send: Any) -> None:
+    """Serve the WebSocket of the change stream, see config/stream.py, and everything else with django."""
+    if scope["type"] == "websocket":
+        if scope["path"].rstrip("/") == STREAM_PATH:
+            await websocket_stream(scope, receive, send)
+        else:
+            await receive()
+            await send({"type": "websocket.close"})
+        return
+    await django_application(scope, receive, send)
+
+
+start_periodic_task("purge_deleted", settings.RETENTION_PURGE_INTERVAL, purge_deleted)
@@ -37,6 +37,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 SILENCED_SYSTEM_CHECKS = [
     # Allow index names >30 characters, because we are not using Oracle
     "models.E034",
+    # Covering indexes (INCLUDE) are postgres only, other databases build them without the non-key columns
+    "models.W040",
 ]
 
 # URLS
@@ -103,6 +105,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.ApiCompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -177,6 +180,46 @@ EMAIL_TIMEOUT = 5
 # Django Admin URL
 ADMIN_URL = "admin/"
 
+# LIST CACHE
+# ------------------------------------------------------------------------------
+# cache of list responses per user, see core/cache.py
+LIST_CACHE_ENABLED = os.environ.get("DJANGO_LIST_CACHE_ENABLED", default="True").lower() == "true"
+LIST_CACHE_TIMEOUT = int(os.environ.get("DJANGO_LIST_CACHE_TIMEOUT", default=300))
+
+# API COMPRESSION
+# ------------------------------------------------------------------------------
+# api responses smaller than this many bytes are not compressed, see core/middleware.py
+API_COMPRESSION_MIN_SIZE = int(os.environ.get("DJANGO_API_COMPRESSION_MIN_SIZE", default=1024))
+
+# NOTE REVISIONS
+# ------------------------------------------------------------------------------
+# every N-th revision of a note is a full snapshot, the others reverse deltas, see note/revisions.py
+NOTE_REVISION_SNAPSHOT_INTERVAL = int(os.environ.get("DJANGO_NOTE_REVISION_SNAPSHOT_INTERVAL", default=20))
+
+# SYNC
+# ------------------------------------------------------------------------------
+# seconds before the token of a delta sync that are read again, writes committing later than this after their
+# updated_at may be missed by a sync, see `SyncController.sync` in note/apis.py
+SYNC_SAFETY_WINDOW = int(os.environ.get("DJANGO_SYNC_SAFETY_WINDOW", default=60))
+
+# RETENTION
+# ------------------------------------------------------------------------------
+# tombstones of deleted notes and note books are purged after this many days, see note/retention.py
+RETENTION_DELETED_DAYS = int(os.environ.get("DJANGO_RETENTION_DELETED_DAYS", default=30))
+RETENTION_BATCH_SIZE = int(os.environ.get("DJANGO_RETENTION_BATCH_SIZE", default=500))
+# seconds between purges in the server process, 0 disables them
+RETENTION_PURGE_INTERVAL = int(os.environ.get("DJANGO_RETENTION_PURGE_INTERVAL", default=3600))
+
+# EVENTS
+# ------------------------------------------------------------------------------
+# last change events of all users kept in the server process for resuming a stream, see core/events.py
+EVENTS_BUFFER_SIZE = int(os.environ.get("DJANGO_EVENTS_BUFFER_SIZE", default=1000))
+# events queued per connected client before it gets a reset
+EVENTS_QUEUE_SIZE = int(os.environ.get("DJANGO_EVENTS_QUEUE_SIZE", default=100))
+# seconds between heartbeats of an idle stream, and seconds before a stream ends and the client reconnects
+STREAM_HEARTBEAT = int(os.environ.get("DJANGO_STREAM_HEARTBEAT", default=15))
+STREAM_MAX_AGE = int(os.environ.get("DJANGO_STREAM_MAX_AGE", default=300))
+
 # LOGGING
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#logging
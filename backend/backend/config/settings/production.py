@@ -35,6 +35,11 @@ CACHES = {
     },
 }
 
+# LIST CACHE
+# ------------------------------------------------------------------------------
+# the cache above is per process, the list cache needs a shared one, see core/cache.py
+LIST_CACHE_ENABLED = os.environ.get("DJANGO_LIST_CACHE_ENABLED", default="False").lower() == "true"
+
 # EMAIL
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#email-backend
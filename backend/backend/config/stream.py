@@ -0,0 +1,161 @@
+"""Change stream of the user at `/api/stream`, see core/events.py.
+
+The stream is served as Server-Sent Events by `StreamController`, and over a WebSocket by `websocket_stream`,
+which config/asgi.py routes the WebSocket connections of the same path to.
+"""
+import asyncio
+import contextlib
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+from uuid import UUID
+
+from asgiref.sync import sync_to_async
+from core import events
+from core import schemas as core_schemas
+from core.exceptions import Http400BadRequestException
+from core.exceptions import Http401UnauthorizedException
+from core.renderers import dumps
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from ninja_extra import ControllerBase
+from ninja_extra import api_controller
+from ninja_extra import route
+from ninja_extra.permissions import IsAuthenticated
+from ninja_jwt.authentication import AsyncJWTAuth
+from ninja_jwt.authentication import JWTAuth
+from ninja_jwt.exceptions import AuthenticationFailed
+from ninja_jwt.exceptions import InvalidToken
+
+
+STREAM_PATH = "/api/stream"
+# milliseconds an EventSource waits before reconnecting
+RETRY_MS = 1000
+# seconds a WebSocket client has to send its token
+WEBSOCKET_AUTH_TIMEOUT = 10
+# close code of a WebSocket without a valid token
+WEBSOCKET_UNAUTHORIZED = 4401
+
+
+def format_sse(event: events.Event) -> bytes:
+    """Format an event as a Server-Sent Event, the event id is the SSE id so the browser resumes from it."""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event.id, event.action.encode(), dumps(event.as_dict()))
+
+
+@api_controller(
+    "/stream",
+    auth=AsyncJWTAuth(),
+    tags=["stream"],
+    permissions=[IsAuthenticated],
+)
+class StreamController(ControllerBase):
+    """Change stream api controller."""
+
+    @route.get(
+        "",
+        response={
+            400: core_schemas.Http400BadRequestSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def stream(self, request: ASGIRequest, last_event_id: int | None = None) -> StreamingHttpResponse:
+        """Stream the changes of the user's objects as Server-Sent Events.
+
+        Every event names the action, the model and the ids of the changed objects. A `reset` event means
+        changes were missed and the client has to sync again. The stream resumes after the `Last-Event-ID`
+        header, or the `last_event_id` parameter, and ends after `STREAM_MAX_AGE` seconds, the client then
+        reconnects. Comment lines are sent every `STREAM_HEARTBEAT` seconds without event.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        header = request.headers.get("Last-Event-ID")
+        if header:
+            try:
+                last_event_id = int(header)
+            except ValueError as err:
+                raise Http400BadRequestException from err
+
+        response = StreamingHttpResponse(
+            self.event_stream(request.user.id, last_event_id),  # type: ignore
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def event_stream(self, user_id: UUID, last_event_id: int | None) -> AsyncIterator[bytes]:
+        """Yield the Server-Sent Events of a user for `STREAM_MAX_AGE` seconds.
+
+        Args:
+            user_id (UUID): user id.
+            last_event_id (int | None): id of the last event the client received.
+
+        Yields:
+            bytes: one event or heartbeat.
+        """
+        yield b"retry: %d\n\n" % RETRY_MS
+
+        deadline = asyncio.get_running_loop().time() + settings.STREAM_MAX_AGE
+        async with contextlib.aclosing(events.listen(user_id, last_event_id, settings.STREAM_HEARTBEAT)) as stream:
+            async for event in stream:
+                yield b":\n\n" if event is None else format_sse(event)
+                if asyncio.get_running_loop().time() >= deadline:
+                    return
+
+
+def _authenticate(message: dict[str, Any]) -> tuple[AbstractBaseUser | None, int | None]:
+    """Get the user and the last event id from the first message of a WebSocket, None for an invalid message."""
+    try:
+        data = json.loads(message.get("text") or message.get("bytes") or "")
+        last_event_id = data.get("last_event_id")
+        if last_event_id is not None and not isinstance(last_event_id, int):
+            return None, None
+        auth = JWTAuth()
+        return auth.get_user(auth.get_validated_token(data["token"])), last_event_id
+    except (ValueError, AttributeError, KeyError, TypeError, InvalidToken, AuthenticationFailed):
+        return None, None
+    finally:
+        close_old_connections()
+
+
+async def websocket_stream(scope: dict[str, Any], receive: Any, send: Any) -> None:  # noqa: ARG001
+    """Stream the changes of the user's objects over a WebSocket, as ASGI application.
+
+    Browsers can not set headers on a WebSocket, so the first message of the client carries the access token,
+    `{"token": ..., "last_event_id": ...}`. Without a valid token within `WEBSOCKET_AUTH_TIMEOUT` seconds the
+    socket is closed with `WEBSOCKET_UNAUTHORIZED`. Then every event is sent as one json text message, the
+    same as the data of the Server-Sent Events.
+    """
+    if (await receive())["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    try:
+        message = await asyncio.wait_for(receive(), WEBSOCKET_AUTH_TIMEOUT)
+    except asyncio.TimeoutError:
+        message = {}
+    if message.get("type") == "websocket.disconnect":
+        return
+    user, last_event_id = await sync_to_async(_authenticate)(message)
+    if user is None:
+        await send({"type": "websocket.close", "code": WEBSOCKET_UNAUTHORIZED})
+        return
+
+    async def forward() -> None:
+        async with contextlib.aclosing(events.listen(user.id, last_event_id)) as stream:  # type: ignore
+            async for event in stream:
+                await send({"type": "websocket.send", "text": dumps(event.as_dict()).decode()})  # type: ignore
+
+    task = asyncio.create_task(forward())
+    try:
+        while (await receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from collections.abc import Callable
+from datetime import datetime
 from typing import Any
 from uuid import UUID
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.core.handlers.asgi import ASGIRequest
 from django.core.handlers.wsgi import WSGIRequest
 from django.db.models.base import ModelBase
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from django.http import HttpResponseNotModified
 from ninja.orm.metaclass import ModelSchemaMetaclass
 from ninja.schema import ResolverMetaclass
 from ninja_extra import api_controller
@@ -14,8 +20,21 @@ from ninja_extra import route
 from ninja_extra.permissions import IsAuthenticated
 from ninja_jwt.authentication import JWTAuth
 
+from core.cache import CachedResponse
+from core.cache import get_cached_response
+from core.cache import list_cache_key
+from core.cache import set_cached_response
+from core.conditional import is_not_modified
+from core.conditional import is_precondition_failed
+from core.conditional import not_modified_response
+from core.conditional import object_validators
+from core.conditional import queryset_validators
+from core.conditional import set_validator_headers
+from core.exceptions import Http400BadRequestException
 from core.exceptions import Http401UnauthorizedException
 from core.exceptions import Http404NotFoundException
+from core.exceptions import Http412PreconditionFailedException
+from core.renderers import render_json
 
 
 class BaseEditApiController:
@@ -26,13 +45,20 @@ class BaseEditApiController:
 
         CreateModelRequestSchema (ModelSchemaMetaclass | ResolverMetaclass | None): create request schema. just for type hint.
         PutModelRequestSchema (ModelSchemaMetaclass | ResolverMetaclass | None): put request schema. just for type hint.
-        GetModelResponseSchema (ModelSchemaMetaclass | ResolverMetaclass | None): get response schema. just for type hint.
+        GetModelResponseSchema (ModelSchemaMetaclass | ResolverMetaclass | None): get response schema. used to validate `fields`.
+        ListModelResponseSchema (ModelSchemaMetaclass | ResolverMetaclass | None): list item schema. used to render cached lists.
+        list_fields (str | None): default `fields` of lists, e.g. to leave large columns out. None selects all fields.
 
         pk_field (str): django model primary key field name. default is "id". must be set in child class.
 
     Methods:
         create: base create method. for use just call super().create(request, body).
-        get_all: base get all method. for use just call super().get_all(request).
+        get_all: base get all method. for use just call super().get_all(request, fields).
+        get_value_fields: resolve the `fields` query parameter into field names for `.values()`.
+        conditional_response: set ETag and Last-Modified headers, or get a 304 response if the client copy is fresh.
+        check_precondition: raise 412 if If-Match does not match the current version of the object.
+        set_object_validators: set the ETag and Last-Modified headers of an object on the response.
+        cached_list_response: serve a list from the per user cache, render and cache it on miss.
         get: base get method. for use just call super().get(request, pk).
         update: base update method. for use just call super().update(request, pk, body).
         delete: base delete method. for use just call super().delete(request, pk).
@@ -43,6 +69,9 @@ class BaseEditApiController:
     CreateModelRequestSchema: ModelSchemaMetaclass | ResolverMetaclass | None = None
     PutModelRequestSchema: ModelSchemaMetaclass | ResolverMetaclass | None = None
     GetModelResponseSchema: ModelSchemaMetaclass | ResolverMetaclass | None = None
+    ListModelResponseSchema: ModelSchemaMetaclass | ResolverMetaclass | None = None
+
+    list_fields: str | None = None
 
     def create(self, request: WSGIRequest | ASGIRequest, body: CreateModelRequestSchema) -> GetModelResponseSchema:  # type: ignore
         """Create object.
@@ -65,18 +94,140 @@ class BaseEditApiController:
 
         return model
 
-    def get_all(self, request: WSGIRequest | ASGIRequest) -> list[GetModelResponseSchema]:  # type: ignore
+    def get_all(self, request: WSGIRequest | ASGIRequest, fields: str | None = None) -> list[GetModelResponseSchema]:  # type: ignore
         """Get all objects belong to the user's company.
 
         Args:
             request (WSGIRequest|ASGIRequest): HTTP request.
+            fields (str | None, optional): comma separated fields to select. Defaults to None, all fields.
+
+        Returns:
+            HttpResponse: json list of objects, 304 if the client copy is fresh.
+        """
+        model = self.Model.objects.filter(created_by_user_id=request.user.id)  # type: ignore
+        value_fields = self.get_value_fields(fields)
+
+        return self.cached_list_response(
+            request,
+            {"fields": value_fields},
+            model,
+            lambda: render_json(list[self.ListModelResponseSchema], list(model.values(*value_fields))),  # type: ignore
+        )
+
+    def get_value_fields(self, fields: str | None) -> list[str]:
+        """Resolve the `fields` query parameter into field names for `.values()`.
+
+        Only the requested columns are selected from the database. `id` is always selected.
+        Without `fields` the `list_fields` are selected.
+
+        Args:
+            fields (str | None): comma separated field names of GetModelResponseSchema.
+
+        Raises:
+            Http400BadRequestException: if a field is not in both GetModelResponseSchema and ListModelResponseSchema.
+
+        Returns:
+            list[str]: field names for `.values()`. empty list means all fields.
+        """
+        fields = fields or self.list_fields
+        if not fields:
+            return []
+
+        schema_fields = self.GetModelResponseSchema.model_fields  # type: ignore
+        list_schema_fields = self.ListModelResponseSchema.model_fields  # type: ignore
+        value_fields = ["id"]
+        for name in (field.strip() for field in fields.split(",")):
+            if name not in schema_fields or name not in list_schema_fields:
+                raise Http400BadRequestException(f"Unknown field: {name}")
+            value_fields.append(schema_fields[name].alias or name)
+
+        return list(dict.fromkeys(value_fields))
+
+    def conditional_response(
+        self,
+        request: WSGIRequest | ASGIRequest,
+        etag: str,
+        last_modified: datetime | None,
+    ) -> HttpResponseNotModified | None:
+        """Set ETag and Last-Modified headers, or get a 304 response if the client copy is fresh.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            etag (str): current ETag.
+            last_modified (datetime | None): current last modified time.
+
+        Returns:
+            HttpResponseNotModified | None: 304 response to return as is, None to go on with the normal response.
+        """
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        set_validator_headers(self.context.response, etag, last_modified)  # type: ignore
+        return None
+
+    def check_precondition(self, request: WSGIRequest | ASGIRequest, obj: Any) -> None:
+        """Raise 412 if If-Match does not match the current version of the object.
+
+        Checked before the write so a stale client fails fast, `BaseModel.save` checks the version again
+        in the UPDATE itself.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            obj (Any): object about to be written.
+
+        Raises:
+            Http412PreconditionFailedException: if the client edited another version.
+        """
+        if is_precondition_failed(request, object_validators(obj)[0]):
+            raise Http412PreconditionFailedException
+
+    def set_object_validators(self, obj: Any) -> None:
+        """Set the ETag and Last-Modified headers of an object on the response, e.g. after a write.
+
+        Args:
+            obj (Any): object of the response.
+        """
+        set_validator_headers(self.context.response, *object_validators(obj))  # type: ignore
+
+    def cached_list_response(
+        self,
+        request: WSGIRequest | ASGIRequest,
+        params: dict[str, Any],
+        queryset: QuerySet | tuple[QuerySet, ...],
+        render: Callable[[], bytes],
+    ) -> HttpResponse:
+        """Serve a list from the per user cache, render and cache it on miss.
+
+        The cache is invalidated by any write of the user's objects, see core/cache.py.
+        A fresh client copy gets a 304, on hit without touching the database at all.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            params (dict[str, Any]): normalized filter of the list. part of the cache key.
+            queryset (QuerySet | tuple[QuerySet, ...]): filtered queryset of the list, or querysets of all the rows
+                the list is built from. used for the ETag and Last-Modified validators.
+            render (Callable[[], bytes]): renders the json body of the list. called on miss only.
 
         Returns:
-            list[GetModelResponseSchema]: list of objects. must be json serializable.
+            HttpResponse: json response, 304 if the client copy is fresh.
         """
-        model = self.Model.objects.filter(created_by_user_id=request.user.id).values()  # type: ignore
+        key = list_cache_key(self.Model.model_label, request.user.id, params)  # type: ignore
+        cached = get_cached_response(key)
 
-        return list(model)
+        if cached is None:
+            etag, last_modified = queryset_validators(*(queryset if isinstance(queryset, tuple) else (queryset,)))
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
+
+            cached = CachedResponse(render(), etag, last_modified)
+            set_cached_response(key, cached)
+
+        if is_not_modified(request, cached.etag, cached.last_modified):
+            return not_modified_response(cached.etag, cached.last_modified)
+
+        response = HttpResponse(cached.content, content_type="application/json; charset=utf-8")
+        set_validator_headers(response, cached.etag, cached.last_modified)
+        return response
 
     def get(self, request: WSGIRequest | ASGIRequest, pk: UUID) -> GetModelResponseSchema:  # type: ignore
         """Get object by primary key.
@@ -90,6 +241,7 @@ class BaseEditApiController:
 
         Returns:
             GetModelResponseSchema: object. must be json serializable.
+            HttpResponseNotModified: if the client copy is fresh.
         """
         if isinstance(request.user, AnonymousUser):
             raise Http401UnauthorizedException
@@ -101,6 +253,10 @@ class BaseEditApiController:
         except self.Model.DoesNotExist as err:  # type: ignore
             raise Http404NotFoundException from err
 
+        not_modified = self.conditional_response(request, *object_validators(model))
+        if not_modified is not None:
+            return not_modified
+
         return model
 
     def update(self, request: WSGIRequest | ASGIRequest, pk: UUID, body: PutModelRequestSchema):  # type: ignore
@@ -114,6 +270,7 @@ class BaseEditApiController:
         Raises:
             Http401UnauthorizedException: if user is not authenticated.
             Http404NotFoundException: if object not found.
+            Http412PreconditionFailedException: if If-Match does not match the current version.
 
         Returns:
             dict[str, Any]: response body. must be json serializable. typically {"msg": "success"}.
@@ -128,10 +285,13 @@ class BaseEditApiController:
         except self.Model.DoesNotExist as err:  # type: ignore
             raise Http404NotFoundException from err
 
+        self.check_precondition(request, model)
+
         for k, v in body.dict().items():
             setattr(model, k, v)
 
         model.save(request.user)
+        self.set_object_validators(model)
 
         return model
 
@@ -162,3 +322,161 @@ class BaseEditApiController:
         model.delete(request.user)
 
         return {"msg": "success"}
+
+
+class AsyncBaseEditApiController(BaseEditApiController):
+    """Async variant of BaseEditApiController for async route handlers.
+
+    The queries run in django's thread sensitive executor, the same one that runs the async ORM of django 4.2
+    (`aget` etc. wrap the sync query), so the handlers are not faster than the sync ones. The event loop is
+    just never blocked by the database, e.g. for the change streams served by the same process. Steps of
+    several queries run in one executor call, see `get_all`, and `BaseModel.acreate`, `asave` and `adelete`
+    run the sync methods.
+    Every async edit api controller should inherit from this class.
+
+    Methods:
+        create: base create method. for use just call await super().create(request, body).
+        get_all: base get all method. for use just call await super().get_all(request, fields).
+        get: base get method. for use just call await super().get(request, pk).
+        update: base update method. for use just call await super().update(request, pk, body).
+        delete: base delete method. for use just call await super().delete(request, pk).
+    """
+
+    async def create(  # type: ignore
+        self,
+        request: WSGIRequest | ASGIRequest,
+        body: BaseEditApiController.CreateModelRequestSchema,
+    ) -> BaseEditApiController.GetModelResponseSchema:
+        """Create object.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            body (CreateModelRequestSchema): Request body. must be a pydantic model.
+
+        Returns:
+            GetModelResponseSchema: created object.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        model = self.Model(  # type: ignore
+            **body.dict(),
+        )
+
+        await model.acreate(request.user)
+
+        return model
+
+    async def get_all(self, request: WSGIRequest | ASGIRequest, fields: str | None = None) -> HttpResponse:  # type: ignore
+        """Get all objects belong to the user.
+
+        The cache lookup, the validators and the rows are read in one executor call, see `cached_list_response`.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            fields (str | None, optional): comma separated fields to select. Defaults to None, all fields.
+
+        Returns:
+            HttpResponse: json list of objects, 304 if the client copy is fresh.
+        """
+        return await sync_to_async(super().get_all)(request, fields)
+
+    async def get(self, request: WSGIRequest | ASGIRequest, pk: UUID) -> BaseEditApiController.GetModelResponseSchema:  # type: ignore
+        """Get object by primary key.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            pk (UUID): primary key value of the object.
+
+        Raises:
+            Http401UnauthorizedException: if user is not authenticated.
+            Http404NotFoundException: if object not found.
+
+        Returns:
+            GetModelResponseSchema: object. must be json serializable.
+            HttpResponseNotModified: if the client copy is fresh.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        try:
+            model = await self.Model.objects.aget(  # type: ignore
+                id=pk,
+            )
+        except self.Model.DoesNotExist as err:  # type: ignore
+            raise Http404NotFoundException from err
+
+        not_modified = self.conditional_response(request, *object_validators(model))
+        if not_modified is not None:
+            return not_modified
+
+        return model
+
+    async def update(  # type: ignore
+        self,
+        request: WSGIRequest | ASGIRequest,
+        pk: UUID,
+        body: BaseEditApiController.PutModelRequestSchema,
+    ):
+        """Update object by primary key.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            pk (UUID): primary key value of the object.
+            body (PutModelRequestSchema): new values of the object.
+
+        Raises:
+            Http401UnauthorizedException: if user is not authenticated.
+            Http404NotFoundException: if object not found.
+            Http412PreconditionFailedException: if If-Match does not match the current version.
+
+        Returns:
+            GetModelResponseSchema: updated object.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        try:
+            model = await self.Model.objects.aget(  # type: ignore
+                id=pk,
+            )
+        except self.Model.DoesNotExist as err:  # type: ignore
+            raise Http404NotFoundException from err
+
+        self.check_precondition(request, model)
+
+        for k, v in body.dict().items():
+            setattr(model, k, v)
+
+        await model.asave(request.user)
+        self.set_object_validators(model)
+
+        return model
+
+    async def delete(self, request: WSGIRequest | ASGIRequest, pk: UUID) -> dict[str, Any]:
+        """Delete object by primary key.
+
+        Args:
+            request (WSGIRequest|ASGIRequest): HTTP request.
+            pk (UUID): primary key value of the object.
+
+        Raises:
+            Http401UnauthorizedException: if user is not authenticated.
+            Http404NotFoundException: if object not found.
+
+        Returns:
+            dict[str, Any]: response body. must be json serializable. typically {"msg": "success"}.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        try:
+            model = await self.Model.objects.aget(  # type: ignore
+                id=pk,
+            )
+        except self.Model.DoesNotExist as err:  # type: ignore
+            raise Http404NotFoundException from err
+
+        await model.adelete(request.user)
+
+        return {"msg": "success"}
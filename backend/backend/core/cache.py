@@ -0,0 +1,158 @@
+"""Per user cache of list responses.
+
+Every user has a generation counter which is part of the cache key of the user's list responses.
+Any write of the user's objects bumps the counter, so the old entries are never read again and
+simply expire, no matter which filters they were cached for.
+
+The counter is kept in the default cache, which must be shared by every server process, e.g. redis or
+memcached: with a per process cache like LocMemCache, a write only bumps the counter of the process that
+served it and the other processes keep serving their stale lists. The list cache is therefore disabled in
+production, which has no shared cache configured, and `check_list_cache` fails `check --deploy` if it is
+enabled with a per process cache.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+
+
+# cache backends whose entries are not shared between processes
+PER_PROCESS_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+@dataclass
+class CachedResponse:
+    """Cached list response.
+
+    Attributes:
+        content (bytes): rendered json body.
+        etag (str): ETag of the list when it was cached.
+        last_modified (datetime | None): Last-Modified of the list when it was cached.
+    """
+
+    content: bytes
+    etag: str
+    last_modified: datetime | None
+
+
+def _generation_key(user_id: UUID) -> str:
+    return f"list_cache:generation:{user_id}"
+
+
+def get_generation(user_id: UUID) -> int:
+    """Get the current cache generation of a user.
+
+    A missing counter starts at the current time, so it never repeats a generation of an evicted counter.
+
+    Args:
+        user_id (UUID): user id.
+
+    Returns:
+        int: cache generation.
+    """
+    key = _generation_key(user_id)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def _bump_generation(user_id: UUID) -> None:
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id: UUID | None, using: str = "default") -> None:
+    """Drop the cached list responses of a user once the current transaction commits.
+
+    Args:
+        user_id (UUID | None): owner of the changed objects.
+        using (str, optional): database alias. Defaults to "default".
+    """
+    if user_id is None:
+        return
+    transaction.on_commit(lambda: _bump_generation(user_id), using=using)
+
+
+def list_cache_key(namespace: str, user_id: UUID, params: dict[str, Any]) -> str:
+    """Build the cache key of a list response.
+
+    Args:
+        namespace (str): name of the list, e.g. the model label.
+        user_id (UUID): user id.
+        params (dict[str, Any]): normalized filter of the list.
+
+    Returns:
+        str: cache key.
+    """
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode(), usedforsecurity=False).hexdigest()
+    return f"list_cache:{namespace}:{user_id}:{get_generation(user_id)}:{digest}"
+
+
+def get_cached_response(key: str) -> CachedResponse | None:
+    """Get a cached list response and count the hit or miss.
+
+    Args:
+        key (str): cache key from `list_cache_key`.
+
+    Returns:
+        CachedResponse | None: cached response, None on miss or when the cache is disabled.
+    """
+    if not settings.LIST_CACHE_ENABLED:
+        return None
+
+    cached = cache.get(key)
+    with _stats_lock:
+        _stats["hits" if cached is not None else "misses"] += 1
+    return cached
+
+
+def set_cached_response(key: str, cached: CachedResponse) -> None:
+    """Store a list response.
+
+    Args:
+        key (str): cache key from `list_cache_key`.
+        cached (CachedResponse): response to store.
+    """
+    if settings.LIST_CACHE_ENABLED:
+        cache.set(key, cached, timeout=settings.LIST_CACHE_TIMEOUT)
+
+
+def get_stats() -> dict[str, int]:
+    """Get the hit and miss counters of this process.
+
+    Returns:
+        dict[str, int]: hits and misses.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def check_list_cache(**kwargs: Any) -> list[checks.CheckMessage]:  # noqa: ARG001
+    """Deploy check: the list cache needs a default cache shared by the server processes."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.LIST_CACHE_ENABLED and backend in PER_PROCESS_CACHE_BACKENDS:
+        return [
+            checks.Error(
+                f"LIST_CACHE_ENABLED requires a default cache shared by the server processes, not {backend}.",
+                hint="Configure a shared cache like redis or memcached, or set DJANGO_LIST_CACHE_ENABLED=False.",
+                id="core.E001",
+            ),
+        ]
+    return []
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+from django.http import HttpResponse
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date
+from django.utils.http import parse_etags
+from django.utils.http import parse_http_date_safe
+from django.utils.http import quote_etag
+
+
+def object_validators(obj: Model) -> tuple[str, datetime]:
+    """Get the ETag and Last-Modified validators of one object.
+
+    The ETag carries the version of the object, so it also serves `If-Match` on writes.
+
+    Args:
+        obj (Model): object with `id`, `version` and `updated_at`.
+
+    Returns:
+        tuple[str, datetime]: strong ETag and last modified time.
+    """
+    return quote_etag(f"{obj.id.hex}-{obj.version}"), obj.updated_at  # type: ignore
+
+
+def queryset_validators(*querysets: QuerySet) -> tuple[str, datetime | None]:
+    """Get the ETag and Last-Modified validators of a list, from max(updated_at) and the row count.
+
+    Every write bumps `updated_at` and rows leaving the list change the count, so the validators change
+    whenever the content of the list does. Costs one aggregate query per queryset instead of reading the rows.
+
+    Args:
+        *querysets (QuerySet): filtered queryset of the list, and of any other rows the list is built from.
+
+    Returns:
+        tuple[str, datetime | None]: strong ETag and last modified time, None for an empty list.
+    """
+    tags = []
+    last_modified = None
+    for queryset in querysets:
+        result = queryset.aggregate(last_modified=Max("updated_at"), count=Count("pk"))
+        timestamp = result["last_modified"].timestamp() if result["last_modified"] is not None else 0
+        tags.append(f"{result['count']}-{timestamp:.6f}")
+        if result["last_modified"] is not None and (last_modified is None or result["last_modified"] > last_modified):
+            last_modified = result["last_modified"]
+
+    return quote_etag("-".join(tags)), last_modified
+
+
+def _opaque_tag(etag: str) -> str:
+    """Get the opaque part of an ETag, without the weak indicator."""
+    return etag.removeprefix("W/")
+
+
+def is_not_modified(request: HttpRequest, etag: str, last_modified: datetime | None) -> bool:
+    """Check If-None-Match, or If-Modified-Since when there is no If-None-Match, against the validators.
+
+    Args:
+        request (HttpRequest): HTTP request.
+        etag (str): current ETag.
+        last_modified (datetime | None): current last modified time.
+
+    Returns:
+        bool: True if the client copy is still fresh.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return "*" in etags or _opaque_tag(etag) in {_opaque_tag(tag) for tag in etags}
+
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since"))
+    if if_modified_since is not None and last_modified is not None:
+        return int(last_modified.timestamp()) <= if_modified_since
+
+    return False
+
+
+def is_precondition_failed(request: HttpRequest, etag: str) -> bool:
+    """Check If-Match against the current ETag.
+
+    The ETags name the version of an object, they are only made weak when the response is compressed, see
+    core/middleware.py. The weak form of the current ETag therefore matches as well. A request without
+    If-Match always passes.
+
+    Args:
+        request (HttpRequest): HTTP request.
+        etag (str): current ETag.
+
+    Returns:
+        bool: True if the client edited another version than the current one.
+    """
+    if_match = request.headers.get("If-Match")
+    if if_match is None:
+        return False
+
+    etags = parse_etags(if_match)
+    return "*" not in etags and _opaque_tag(etag) not in {_opaque_tag(tag) for tag in etags}
+
+
+def set_validator_headers(response: HttpResponse, etag: str, last_modified: datetime | None) -> None:
+    """Set ETag and Last-Modified headers on a response.
+
+    Args:
+        response (HttpResponse): response to update.
+        etag (str): current ETag.
+        last_modified (datetime | None): current last modified time.
+    """
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    response.headers["Vary"] = "Authorization"
+
+
+def not_modified_response(etag: str, last_modified: datetime | None) -> HttpResponseNotModified:
+    """Build a 304 response carrying the validators.
+
+    Args:
+        etag (str): current ETag.
+        last_modified (datetime | None): current last modified time.
+
+    Returns:
+        HttpResponseNotModified: 304 response without body.
+    """
+    response = HttpResponseNotModified()
+    set_validator_headers(response, etag, last_modified)
+    return response
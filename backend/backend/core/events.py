@@ -0,0 +1,249 @@
+"""In-process feed of the changes of every user, streamed to the clients by `/api/stream`, see config/stream.py.
+
+Writes publish an event once their transaction commits: `BaseModel.create`, `save` and `delete`, and the
+set-based writes of the apps. An event tells the action, the model and the ids of the changed objects,
+clients read the objects themselves, e.g. with `/api/sync`.
+
+Event ids increase within the process and start at the current time, so ids of a previous process are
+never repeated. The hub keeps the last `EVENTS_BUFFER_SIZE` events of all users: a client reconnecting with
+the id of the last event it received gets the events it missed, or a `reset` event if they are not
+buffered anymore, after which it has to sync again.
+
+The hub lives in one server process. With several processes, a client only gets the changes written by
+the process it is connected to.
+"""
+import asyncio
+import contextlib
+import threading
+import time
+from collections import defaultdict
+from collections import deque
+from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+RESET = "reset"
+
+
+@dataclass(frozen=True)
+class Event:
+    """Change of objects of one user.
+
+    Attributes:
+        id (int): event id, increasing within the process.
+        user_id (str): owner of the changed objects.
+        action (str): `CREATED`, `UPDATED`, `DELETED`, or `RESET` when the client has to sync again.
+        model (str): label of the model, e.g. "note.NoteModel". empty for `RESET`.
+        ids (tuple[str, ...]): ids of the changed objects.
+    """
+
+    id: int
+    user_id: str
+    action: str
+    model: str
+    ids: tuple[str, ...]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get the event as sent to the client."""
+        return {"id": self.id, "action": self.action, "model": self.model, "ids": list(self.ids)}
+
+
+class Subscription:
+    """Events of one user for one connected client, put from any thread and read from the client's event loop.
+
+    Attributes:
+        user_id (str): user id.
+        overflowed (bool): the client did not read fast enough and events were dropped.
+    """
+
+    def __init__(self, user_id: str, queue_size: int) -> None:
+        """Init the subscription on the running event loop."""
+        self.user_id = user_id
+        self.overflowed = False
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, event: Event) -> None:
+        """Queue an event, from any thread."""
+        with contextlib.suppress(RuntimeError):  # the loop is closed, the client is gone
+            self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float | None = None) -> Event | None:
+        """Wait for the next event.
+
+        Args:
+            timeout (float | None, optional): seconds to wait. Defaults to None, no limit.
+
+        Returns:
+            Event | None: next event, None after `timeout` seconds without one.
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def clear(self) -> None:
+        """Drop the queued events and the overflow."""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self.overflowed = False
+
+
+class EventHub:
+    """Publish the events of the users to their subscriptions and keep the last ones for resuming."""
+
+    def __init__(self, buffer_size: int, queue_size: int) -> None:
+        """Init the hub.
+
+        Args:
+            buffer_size (int): number of events of all users kept for resuming.
+            queue_size (int): number of events queued per subscription before it overflows.
+        """
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._last_id = time.time_ns() // 1_000_000
+        self._buffer: deque[Event] = deque(maxlen=buffer_size)
+        self._subscriptions: defaultdict[str, set[Subscription]] = defaultdict(set)
+
+    def publish(self, user_id: UUID | str, action: str, model: str, ids: Iterable[Any]) -> Event:
+        """Publish an event now, see `publish` to publish it once the transaction commits.
+
+        Args:
+            user_id (UUID | str): owner of the changed objects.
+            action (str): `CREATED`, `UPDATED` or `DELETED`.
+            model (str): label of the model.
+            ids (Iterable[Any]): ids of the changed objects.
+
+        Returns:
+            Event: published event.
+        """
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, str(user_id), action, model, tuple(str(pk) for pk in ids))
+            self._buffer.append(event)
+            for subscription in self._subscriptions.get(event.user_id, ()):
+                subscription.put(event)
+        return event
+
+    def subscribe(
+        self,
+        user_id: UUID | str,
+        last_event_id: int | None = None,
+    ) -> tuple[Subscription, list[Event] | None]:
+        """Subscribe to the events of a user. must be called on the event loop reading the subscription.
+
+        Args:
+            user_id (UUID | str): user id.
+            last_event_id (int | None, optional): id of the last event the client received. Defaults to None.
+
+        Returns:
+            tuple[Subscription, list[Event] | None]: the subscription, and the events of the user after
+                `last_event_id`, None if some of them may not be buffered anymore.
+        """
+        subscription = Subscription(str(user_id), self.queue_size)
+        with self._lock:
+            self._subscriptions[subscription.user_id].add(subscription)
+            if last_event_id is None:
+                return subscription, []
+
+            oldest_id = self._buffer[0].id if self._buffer else self._last_id + 1
+            if not oldest_id - 1 <= last_event_id <= self._last_id:
+                return subscription, None
+            return subscription, [
+                event for event in self._buffer if event.user_id == subscription.user_id and event.id > last_event_id
+            ]
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop the events of a subscription."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def reset_event(self, user_id: UUID | str) -> Event:
+        """Get a `RESET` event with the current event id, it is not published."""
+        with self._lock:
+            return Event(self._last_id, str(user_id), RESET, "", ())
+
+    def get_stats(self) -> dict[str, int]:
+        """Get the number of subscriptions and buffered events, and the last event id."""
+        with self._lock:
+            return {
+                "subscriptions": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+                "buffered": len(self._buffer),
+                "last_event_id": self._last_id,
+            }
+
+
+hub = EventHub(settings.EVENTS_BUFFER_SIZE, settings.EVENTS_QUEUE_SIZE)
+
+
+def publish(user_id: UUID | None, action: str, model: Any, ids: Iterable[Any], using: str = "default") -> None:
+    """Publish an event of a user once the current transaction commits.
+
+    Args:
+        user_id (UUID | None): owner of the changed objects. nothing is published for None.
+        action (str): `CREATED`, `UPDATED` or `DELETED`.
+        model (type[BaseModel]): model of the changed objects.
+        ids (Iterable[Any]): ids of the changed objects. nothing is published if empty.
+        using (str, optional): database alias. Defaults to "default".
+    """
+    ids = list(ids)
+    if user_id is None or not ids:
+        return
+    label = model.model_label
+    transaction.on_commit(lambda: hub.publish(user_id, action, label, ids), using=using)
+
+
+async def listen(
+    user_id: UUID | str,
+    last_event_id: int | None = None,
+    heartbeat: float | None = None,
+) -> AsyncIterator[Event | None]:
+    """Yield the events of a user, first the ones missed since `last_event_id`, until the iterator is closed.
+
+    A `RESET` event is yielded instead of the missed events if they are not buffered anymore, and when the
+    client did not read fast enough.
+
+    Args:
+        user_id (UUID | str): user id.
+        last_event_id (int | None, optional): id of the last event the client received. Defaults to None.
+        heartbeat (float | None, optional): yield None after this many seconds without event. Defaults to None.
+
+    Yields:
+        Event | None: next event, None for a heartbeat.
+    """
+    subscription, missed = hub.subscribe(user_id, last_event_id)
+    try:
+        if missed is None:
+            yield hub.reset_event(user_id)
+        else:
+            for event in missed:
+                yield event
+
+        while True:
+            event = await subscription.get(heartbeat)
+            if subscription.overflowed:
+                subscription.clear()
+                yield hub.reset_event(user_id)
+            else:
+                yield event
+    finally:
+        hub.unsubscribe(subscription)
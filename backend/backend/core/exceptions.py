@@ -32,3 +32,15 @@ class Http404NotFoundException(APIException):
     status_code = status.HTTP_404_NOT_FOUND
     message = "Not Found"
     default_detail = "Not Found"
+
+
+class Http412PreconditionFailedException(APIException):
+    """base exception for Precondition Failed."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    message = "Precondition Failed"
+    default_detail = "Precondition Failed"
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised by `BaseModel.save` when the row was changed by someone else since it was loaded."""
@@ -0,0 +1,120 @@
+"""Custom model fields."""
+import lzma
+import zlib
+from typing import Any
+
+from django.db import models
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+
+# header byte: high nibble is the format version, low nibble the codec
+HEADER_RAW = 0x10
+HEADER_ZLIB = 0x11
+HEADER_LZMA = 0x12
+
+# texts below this many utf-8 bytes are stored raw by default
+DEFAULT_THRESHOLD = 1024
+
+CODECS = {
+    "zlib": (HEADER_ZLIB, lambda data: zlib.compress(data, 6)),
+    "lzma": (HEADER_LZMA, lambda data: lzma.compress(data, preset=6)),
+}
+DECOMPRESSORS = {
+    HEADER_RAW: lambda data: data,
+    HEADER_ZLIB: zlib.decompress,
+    HEADER_LZMA: lzma.decompress,
+}
+
+
+def compress_text(value: str, codec: str = "zlib", threshold: int = DEFAULT_THRESHOLD) -> bytes:
+    """Encode text into the stored format of CompressedTextField.
+
+    Args:
+        value (str): text to store.
+        codec (str, optional): "zlib" or "lzma". Defaults to "zlib".
+        threshold (int, optional): texts below this many utf-8 bytes are stored raw. Defaults to 1024.
+
+    Returns:
+        bytes: header byte followed by the raw or compressed utf-8 text.
+    """
+    data = value.encode()
+    if len(data) >= threshold:
+        header, compress = CODECS[codec]
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            return bytes([header]) + compressed
+    return bytes([HEADER_RAW]) + data
+
+
+def decompress_text(value: bytes | memoryview | str) -> str:
+    """Decode a value stored by CompressedTextField.
+
+    Values without a known header byte are returned as plain text, the way text columns were stored before
+    they were converted, see note/migrations/0005_compress_content.py.
+
+    Args:
+        value (bytes | memoryview | str): stored value.
+
+    Returns:
+        str: text.
+    """
+    if isinstance(value, str):
+        return value
+
+    data = bytes(value)
+    if data and data[0] in DECOMPRESSORS:
+        return DECOMPRESSORS[data[0]](data[1:]).decode()
+    return data.decode()
+
+
+class CompressedTextField(models.TextField):
+    """Text field stored as a blob, compressed with zlib or lzma above a size threshold.
+
+    Behaves like a TextField for schemas, forms and the ORM, the column is a binary column. The stored
+    value starts with a header byte for the format version and codec, see `compress_text`.
+
+    Attributes:
+        codec (str): "zlib" or "lzma".
+        threshold (int): texts below this many utf-8 bytes are stored raw.
+    """
+
+    def __init__(self, *args: Any, codec: str = "zlib", threshold: int = DEFAULT_THRESHOLD, **kwargs: Any) -> None:
+        """Init the field.
+
+        Args:
+            *args (Any): TextField arguments.
+            codec (str, optional): "zlib" or "lzma". Defaults to "zlib".
+            threshold (int, optional): texts below this many utf-8 bytes are stored raw. Defaults to 1024.
+            **kwargs (Any): TextField keyword arguments.
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.codec = codec
+        self.threshold = threshold
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self) -> tuple[str, str, list[Any], dict[str, Any]]:
+        """Deconstruct the field for migrations."""
+        name, path, args, kwargs = super().deconstruct()
+        if self.codec != "zlib":
+            kwargs["codec"] = self.codec
+        if self.threshold != DEFAULT_THRESHOLD:
+            kwargs["threshold"] = self.threshold
+        return name, path, args, kwargs
+
+    def db_type(self, connection: BaseDatabaseWrapper) -> str | None:
+        """Use the binary column type of the database."""
+        return models.BinaryField().db_type(connection)
+
+    def get_db_prep_value(self, value: Any, connection: BaseDatabaseWrapper, *, prepared: bool = False) -> Any:
+        """Compress the text."""
+        value = super().get_db_prep_value(value, connection, prepared=prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(compress_text(value, self.codec, self.threshold))
+
+    def from_db_value(self, value: Any, expression: Any, connection: BaseDatabaseWrapper) -> str | None:  # noqa: ARG002
+        """Decompress the stored value."""
+        if value is None:
+            return None
+        return decompress_text(value)
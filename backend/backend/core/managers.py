@@ -65,12 +65,7 @@ class UserManager(DjangoUserManager, Manager):
 
 
 class BaseModelManager(Manager):
-    """Base model manager for all models."""
+    """Base model manager for all models.
 
-    def get_queryset(self) -> QuerySet:
-        """Overwritten get_queryset method for soft delete.
-
-        Returns:
-            QuerySet: QuerySet object.
-        """
-        return super().get_queryset().exclude(is_delete=True)
+    Deleted records are not kept in the tables of `BaseModel`, so there is no soft delete predicate to add.
+    """
@@ -0,0 +1,171 @@
+"""Compression of api responses.
+
+gzip is always available, brotli when the optional `brotli` package is installed. Streaming responses
+are compressed chunk by chunk, with a flush after every chunk so streamed lines reach the client
+without waiting for the next ones.
+"""
+import logging
+import threading
+import zlib
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
+from typing import Any
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# content types which are never compressed
+UNCOMPRESSED_CONTENT_TYPES = ("text/event-stream",)
+
+_stats_lock = threading.Lock()
+_stats = {"responses": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def _record(bytes_in: int, bytes_out: int) -> None:
+    with _stats_lock:
+        _stats["responses"] += 1
+        _stats["bytes_in"] += bytes_in
+        _stats["bytes_out"] += bytes_out
+    logger.debug("compressed api response %d -> %d bytes (%.1fx)", bytes_in, bytes_out, bytes_in / max(bytes_out, 1))
+
+
+def get_stats() -> dict[str, Any]:
+    """Get the compression counters of this process.
+
+    Returns:
+        dict[str, Any]: compressed responses, bytes before and after compression and their ratio.
+    """
+    with _stats_lock:
+        stats: dict[str, Any] = dict(_stats)
+    stats["ratio"] = round(stats["bytes_in"] / stats["bytes_out"], 2) if stats["bytes_out"] else None
+    return stats
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Pick the content coding of a response from Accept-Encoding.
+
+    Args:
+        accept_encoding (str): Accept-Encoding request header.
+
+    Returns:
+        str | None: "br", "gzip" or None for identity.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [coding for coding in available if accepted.get(coding, accepted.get("*", 0.0)) > 0]
+    return max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*", 0.0)), default=None)
+
+
+class _Compressor:
+    """Incremental compressor of one response."""
+
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=5)  # type: ignore
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compress(self, data: bytes) -> bytes:
+        self.bytes_in += len(data)
+        if self._brotli is not None:
+            out = self._brotli.process(data) + self._brotli.flush()
+        else:
+            out = self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+        self.bytes_out += len(out)
+        return out
+
+    def finish(self) -> bytes:
+        out = self._brotli.finish() if self._brotli is not None else self._zlib.flush()
+        self.bytes_out += len(out)
+        _record(self.bytes_in, self.bytes_out)
+        return out
+
+    def compress_all(self, data: bytes) -> bytes:
+        return self.compress(data) + self.finish()
+
+
+class ApiCompressionMiddleware(MiddlewareMixin):
+    """Compress api responses with brotli or gzip.
+
+    Only paths under `/api/` are compressed, responses smaller than `API_COMPRESSION_MIN_SIZE` bytes,
+    responses which already have a Content-Encoding and event streams are left as they are. Event streams
+    are read by the browser as they arrive and are mostly heartbeats, see config/stream.py.
+
+    A strong ETag of a compressed response is made weak, like `GZipMiddleware` does, since the bytes differ
+    from the ones of the other encodings. The conditional requests compare the opaque part of the ETags
+    only, see core/conditional.py, so the weak form is accepted where the strong one is.
+    """
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        """Compress the response if the client accepts it."""
+        if not request.path.startswith("/api/") or response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith(UNCOMPRESSED_CONTENT_TYPES):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compressor = _Compressor(encoding)
+            if response.is_async:  # type: ignore
+                response.streaming_content = self._compress_async(response.streaming_content, compressor)  # type: ignore
+            else:
+                response.streaming_content = self._compress_sync(response.streaming_content, compressor)  # type: ignore
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < settings.API_COMPRESSION_MIN_SIZE:
+                return response
+
+            content = _Compressor(encoding).compress_all(response.content)
+            if len(content) >= len(response.content):
+                return response
+
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        etag = response.get("ETag")
+        if etag is not None and etag.startswith('"'):
+            response.headers["ETag"] = f"W/{etag}"
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compress_sync(content: Iterator[bytes], compressor: _Compressor) -> Iterator[bytes]:
+        for chunk in content:
+            yield compressor.compress(chunk)
+        yield compressor.finish()
+
+    @staticmethod
+    async def _compress_async(content: AsyncIterator[bytes], compressor: _Compressor) -> AsyncIterator[bytes]:
+        async for chunk in content:
+            yield compressor.compress(chunk)
+        yield compressor.finish()
@@ -1,14 +1,17 @@
 import uuid
-from datetime import datetime
 from typing import Any
 from typing import ClassVar
 
-import pytz
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
+from django.utils.functional import classproperty
 
+from . import events
+from .cache import invalidate_user
+from .exceptions import ConcurrentUpdateError
 from .managers import BaseModelManager
 from .managers import UserManager
 
@@ -75,7 +78,6 @@ class User(AbstractUser):
         """
         self.is_delete = True
         self.is_active = False
-        self.deleted_at = datetime.now(tz=pytz.timezone("Asia/Taipei"))
         self.save()
 
 
@@ -83,18 +85,21 @@ class BaseModel(models.Model):
     """Base model for all database models in the application.
 
     This abstract base model defines common fields and methods for other database models.
-    It includes fields for tracking creation and modification timestamps, user associations,
-    and soft deletion status. The model is tied to a company.
+    It includes fields for tracking creation and modification timestamps and user associations.
+    The model is tied to a company.
 
     Attributes:
         created_at (DateTimeField): The timestamp when the record was created.
         created_by_user (ForeignKey): The user who created the record.
         updated_at (DateTimeField): The timestamp when the record was last updated.
         updated_by_user (ForeignKey): The user who last updated the record.
-        is_delete (BooleanField): Indicates if the record is marked as deleted.
-        deleted_by_user (ForeignKey): The user who marked the record as deleted.
+        version (PositiveIntegerField): Incremented by every save, used for optimistic concurrency control.
         company (ForeignKey): The associated company.
 
+    Managers:
+        objects (BaseModelManager): the records. deleted records are not kept in the table, models which need
+            them, e.g. for sync, move them to a tombstone table on delete.
+
     Methods:
         save(self, user: AbstractBaseUser, *args: list[Any], **kwargs: dict[Any, Any]):
             Saves the model instance, updating the modified timestamp and associating the user who updated it.
@@ -103,7 +108,19 @@ class BaseModel(models.Model):
             Creates and saves a new model instance, associating the user who created it.
 
         delete(self, user: AbstractBaseUser) -> None:
-            Marks the model instance as deleted, associating the user who marked it as deleted.
+            Deletes the model instance.
+
+        asave, acreate, adelete:
+            Async counterparts of save, create and delete.
+
+        get_dirty_fields(self) -> list[str] | None:
+            Gets the fields changed since the object was loaded, save writes only those.
+
+        snapshot_loaded_values(self, values: dict[str, Any] | None = None) -> None:
+            Remembers field values as the loaded ones, e.g. after the object is written by other means than save.
+
+        model_label (str):
+            Label of the model, on the class and its objects.
     """
 
     id = models.UUIDField(
@@ -129,15 +146,7 @@ class BaseModel(models.Model):
         blank=True,
         related_name="%(class)s_updated_by_user",
     )
-    is_delete = models.BooleanField(default=False)
-    deleted_at = models.DateTimeField(null=True, blank=True, default=None)
-    deleted_by_user = models.ForeignKey(
-        User,
-        on_delete=models.DO_NOTHING,
-        null=True,
-        blank=True,
-        related_name="%(class)s_deleted_by_user",
-    )
+    version = models.PositiveIntegerField(default=1)
 
     objects = BaseModelManager()
 
@@ -149,12 +158,18 @@ class BaseModel(models.Model):
 
         This method saves or updates the object and sets the 'updated_by_user' field to the specified user.
         Additionally, any extra keyword arguments provided will be applied to the object.
+        Only the fields changed since the object was loaded are written, and nothing at all if none changed.
+        The UPDATE only matches the row if its version is still the loaded one, and increments it.
+        The cached list responses of the owner are invalidated and the change is published, see core/events.py.
 
         Args:
             user (AbstractBaseUser): The user responsible for the update.
             *args (list[Any]): Additional positional arguments.
             **kwargs (dict[Any, Any]): Additional keyword arguments to be applied to the object.
 
+        Raises:
+            ConcurrentUpdateError: if the row was changed or deleted since the object was loaded.
+
         Returns:
             None
 
@@ -162,13 +177,42 @@ class BaseModel(models.Model):
         for k, v in kwargs.items():
             setattr(self, k, v)
         self.updated_by_user = user
-        super().save(*args, **kwargs)  # type: ignore
+
+        if not self._state.adding and "update_fields" not in kwargs:
+            dirty_fields = self.get_dirty_fields()
+            if dirty_fields is not None:
+                if not dirty_fields:
+                    return
+                kwargs["update_fields"] = [*dirty_fields, "updated_at", "updated_by_user", "version"]  # type: ignore
+
+        adding = self._state.adding
+        expected_version = getattr(self, "_loaded_values", {}).get("version", self.__dict__.get("version"))
+        if not self._state.adding and expected_version is not None:
+            self._expected_version = expected_version
+            self.version = expected_version + 1
+        try:
+            super().save(*args, **kwargs)  # type: ignore
+        except ConcurrentUpdateError:
+            self.version = expected_version
+            raise
+        finally:
+            self._expected_version = None
+        self.snapshot_loaded_values()
+        invalidate_user(self.created_by_user_id, using=self._state.db)  # type: ignore
+        events.publish(
+            self.created_by_user_id,  # type: ignore
+            events.CREATED if adding else events.UPDATED,
+            type(self),
+            [self.pk],
+            using=self._state.db,  # type: ignore
+        )
 
     def create(self, user: AbstractBaseUser, *args: list[Any], **kwargs: dict[Any, Any]):
         """Create a new object with user information.
 
         This method creates a new object and sets the 'created_by_user' and 'updated_by_user' fields to the specified user.
         Additionally, any extra keyword arguments provided will be applied to the object.
+        The cached list responses of the owner are invalidated and the change is published, see core/events.py.
 
         Args:
             user (AbstractBaseUser): The user responsible for creating the object.
@@ -184,24 +228,133 @@ class BaseModel(models.Model):
         self.created_by_user = user
         self.updated_by_user = user
         super().save(*args, **kwargs)  # type: ignore
+        self.snapshot_loaded_values()
+        invalidate_user(self.created_by_user_id, using=self._state.db)  # type: ignore
+        events.publish(self.created_by_user_id, events.CREATED, type(self), [self.pk], using=self._state.db)  # type: ignore
+
+    @classproperty
+    def model_label(cls) -> str:
+        """Label of the model, e.g. "note.NoteModel", used to name it in tombstones, events and cache keys."""
+        return cls._meta.label
+
+    @classmethod
+    def from_db(cls, db: str | None, field_names: list[str], values: list[Any]) -> "BaseModel":
+        """Load the object and remember the loaded field values, see `get_dirty_fields`."""
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_loaded_values(dict(zip(field_names, values, strict=True)))
+        return instance
+
+    def _do_update(  # noqa: PLR0913
+        self,
+        base_qs: Any,
+        using: Any,
+        pk_val: Any,
+        values: Any,
+        update_fields: Any,
+        forced_update: Any,
+    ) -> bool:
+        expected_version = getattr(self, "_expected_version", None)
+        if expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)  # type: ignore
+
+        if not super()._do_update(  # type: ignore
+            base_qs.filter(version=expected_version),
+            using,
+            pk_val,
+            values,
+            update_fields,
+            forced_update,
+        ):
+            raise ConcurrentUpdateError(f"{self._meta.label} {pk_val} is not at version {expected_version} anymore")
+        return True
+
+    def _get_field_values(self) -> dict[str, Any]:
+        return {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def snapshot_loaded_values(self, values: dict[str, Any] | None = None) -> None:
+        """Remember field values as the loaded ones, `get_dirty_fields` compares against them.
 
-    def delete(self, user: AbstractBaseUser) -> None:
-        """Marks this object as deleted and assigns the user responsible for the deletion. (soft delete).
+        Args:
+            values (dict[str, Any] | None, optional): values by attribute name. Defaults to None, the current values.
+        """
+        self._loaded_values = self._get_field_values() if values is None else values
+
+    def get_dirty_fields(self) -> list[str] | None:
+        """Get the fields changed since the object was loaded or last saved.
+
+        `updated_at`, `updated_by_user` and `version` are not tracked, they change on every save anyway.
+
+        Returns:
+            list[str] | None: attribute names of the changed fields, None if the object was not loaded from the database.
+        """
+        loaded_values = getattr(self, "_loaded_values", None)
+        if loaded_values is None:
+            return None
 
-        The `delete` method sets the `is_delete` flag to True, indicating that the object is deleted,
-        and records the `user` responsible for the deletion. After making these changes, it saves
-        the object.
+        return [
+            attname
+            for attname, value in self._get_field_values().items()
+            if attname not in ("updated_at", "updated_by_user_id", "version")
+            and (attname not in loaded_values or value != loaded_values[attname])
+        ]
+
+    def delete(self, user: AbstractBaseUser) -> None:  # noqa: ARG002
+        """Deletes this object and its row. (hard delete).
+
+        Models whose deleted rows are still needed, e.g. to tell sync clients about the delete, override it to
+        keep a tombstone of the row first. The cached list responses of the owner are invalidated and the delete
+        is published, see core/events.py.
 
         Args:
             user (AbstractBaseUser): The user who is initiating the deletion.
 
         Returns:
             None: This method doesn't return a value.
+        """
+        pk = self.pk
+        super().delete()
+        invalidate_user(self.created_by_user_id, using=self._state.db)  # type: ignore
+        events.publish(self.created_by_user_id, events.DELETED, type(self), [pk], using=self._state.db)  # type: ignore
+
+    async def asave(self, user: AbstractBaseUser, *args: list[Any], **kwargs: dict[Any, Any]):
+        """Async version of `save`, runs it in the thread sensitive executor like the async ORM of django.
+
+        Args:
+            user (AbstractBaseUser): The user responsible for the update.
+            *args (list[Any]): Additional positional arguments.
+            **kwargs (dict[Any, Any]): Additional keyword arguments to be applied to the object.
+
+        Returns:
+            None
 
-        Note:
-            The `save` method is called internally to persist the changes.
         """
-        self.is_delete = True
-        self.deleted_by_user = user
-        self.deleted_at = datetime.now(tz=pytz.timezone("Asia/Taipei"))
-        self.save(user)
+        await sync_to_async(self.save)(user, *args, **kwargs)
+
+    async def acreate(self, user: AbstractBaseUser, *args: list[Any], **kwargs: dict[Any, Any]):
+        """Async version of `create`, runs it in the thread sensitive executor like the async ORM of django.
+
+        Args:
+            user (AbstractBaseUser): The user responsible for creating the object.
+            *args (list[Any]): Additional positional arguments.
+            **kwargs (dict[Any, Any]): Additional keyword arguments to be applied to the object.
+
+        Returns:
+            None
+
+        """
+        await sync_to_async(self.create)(user, *args, **kwargs)
+
+    async def adelete(self, user: AbstractBaseUser) -> None:
+        """Async version of `delete`, runs it in the thread sensitive executor like the async ORM of django.
+
+        Args:
+            user (AbstractBaseUser): The user who is initiating the deletion.
+
+        Returns:
+            None: This method doesn't return a value.
+        """
+        await sync_to_async(self.delete)(user)
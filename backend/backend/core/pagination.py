@@ -0,0 +1,109 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from django.db.models import Q
+from django.db.models.query import QuerySet
+
+from core.exceptions import Http400BadRequestException
+
+
+KEYSET_ORDERING = ("-created_at", "-id")
+
+
+def encode_cursor(created_at: datetime, pk: UUID) -> str:
+    """Encode the position of a row into an opaque cursor.
+
+    Args:
+        created_at (datetime): created_at value of the last row of the page.
+        pk (UUID): primary key of the last row of the page.
+
+    Returns:
+        str: url safe cursor string.
+    """
+    raw = f"{created_at.isoformat()}|{pk.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): cursor string from the client.
+
+    Raises:
+        Http400BadRequestException: if the cursor is malformed.
+
+    Returns:
+        tuple[datetime, UUID]: created_at and primary key of the last row of the previous page.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(hex=pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise Http400BadRequestException("Invalid cursor") from err
+
+
+def encode_sync_token(updated_at: datetime) -> str:
+    """Encode the high water mark of a sync into an opaque token.
+
+    Args:
+        updated_at (datetime): latest updated_at value sent to the client.
+
+    Returns:
+        str: url safe token string.
+    """
+    return base64.urlsafe_b64encode(updated_at.isoformat().encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> datetime:
+    """Decode a token created by `encode_sync_token`.
+
+    Args:
+        token (str): token string from the client.
+
+    Raises:
+        Http400BadRequestException: if the token is malformed.
+
+    Returns:
+        datetime: latest updated_at value the client has seen.
+    """
+    try:
+        updated_at = datetime.fromisoformat(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise Http400BadRequestException("Invalid sync token") from err
+    if updated_at.tzinfo is None:
+        raise Http400BadRequestException("Invalid sync token")
+    return updated_at
+
+
+def keyset_paginate(queryset: QuerySet, cursor: str | None, limit: int) -> tuple[list[dict[str, Any]], str | None]:
+    """Slice a values() queryset with keyset pagination on (created_at, id).
+
+    Rows are ordered newest first, same as the `-created_at` Meta ordering, with id as tie breaker.
+    Unlike OFFSET, the cost of a page does not depend on how deep the client has scrolled.
+
+    Args:
+        queryset (QuerySet): values() queryset to paginate. must select created_at and id.
+        cursor (str | None): cursor returned with the previous page, None for the first page.
+        limit (int): max number of rows in the page.
+
+    Returns:
+        tuple[list[dict[str, Any]], str | None]: rows of the page and the cursor of the next page, None if last page.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+
+    if cursor is not None:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(queryset[: limit + 1])
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
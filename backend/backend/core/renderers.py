@@ -0,0 +1,81 @@
+"""Json rendering of api responses.
+
+orjson is used when it is installed, the standard library json module otherwise.
+Both produce the same values: types orjson does not handle the way django does (datetime, date, time, Decimal, ...)
+are passed to `NinjaJSONEncoder.default`, so e.g. datetimes keep django's millisecond precision and "Z" suffix.
+"""
+import json
+from functools import cache
+from typing import Any
+
+from django.http import HttpRequest
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+from pydantic import TypeAdapter
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+_encoder = NinjaJSONEncoder()
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize data to compact json.
+
+    Args:
+        data (Any): data to serialize.
+
+    Returns:
+        bytes: utf-8 encoded json.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(data, cls=NinjaJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONRenderer(BaseRenderer):
+    """Response renderer of the api, see `dumps`."""
+
+    media_type = "application/json"
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> bytes:  # noqa: ARG002
+        """Render the response data as json.
+
+        Args:
+            request (HttpRequest): HTTP request.
+            data (Any): response data.
+            response_status (int): status code of the response.
+
+        Returns:
+            bytes: json response body.
+        """
+        return dumps(data)
+
+
+@cache
+def _type_adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def render_json(schema: Any, data: Any) -> bytes:
+    """Validate data against a response schema and render it the way the api renders responses.
+
+    Used where the response body is built outside of ninja, e.g. to cache it.
+
+    Args:
+        schema (Any): response schema, e.g. `list[GetNoteListItemSchema]`.
+        data (Any): response data.
+
+    Returns:
+        bytes: json response body.
+    """
+    adapter = _type_adapter(schema)
+    return dumps(adapter.dump_python(adapter.validate_python(data)))
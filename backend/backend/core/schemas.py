@@ -1,4 +1,12 @@
+from typing import Any
+
 from ninja import Schema
+from pydantic import PrivateAttr
+from pydantic import SerializerFunctionWrapHandler
+from pydantic import ValidationInfo
+from pydantic import model_serializer
+from pydantic import model_validator
+from pydantic.functional_validators import ModelWrapValidatorHandler
 
 
 class Http400BadRequestSchema(Schema):
@@ -25,12 +33,58 @@ class Http404NotFoundSchema(Schema):
     detail: str = "Not Found"
 
 
+class Http412PreconditionFailedSchema(Schema):
+    """Base schema for 412 response."""
+
+    detail: str = "Precondition Failed"
+
+
 class BaseResponseSchema(Schema):
     """Base schema for response."""
 
     msg: str
 
 
+class SparseSchema(Schema):
+    """Base schema for sparse fieldsets. only the fields present in the validated data are dumped.
+
+    Used with `.values(*fields)` querysets, where missing keys mean "not selected" rather than None.
+    """
+
+    _selected_fields: set[str] | None = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _track_selected_fields(
+        cls,
+        values: Any,
+        handler: ModelWrapValidatorHandler,
+        info: ValidationInfo,  # noqa: ARG003
+    ) -> Any:
+        source = getattr(values, "_obj", values)
+        obj = handler(values)
+        if isinstance(source, dict):
+            obj.select_fields(
+                {name for name, field in cls.model_fields.items() if name in source or (field.alias or name) in source},
+            )
+        return obj
+
+    def select_fields(self, names: set[str]) -> None:
+        """Dump only the named fields.
+
+        Args:
+            names (set[str]): names of the fields to dump.
+        """
+        self._selected_fields = names
+
+    @model_serializer(mode="wrap")
+    def _dump_selected_fields(self, handler: SerializerFunctionWrapHandler) -> dict[str, Any]:
+        data = handler(self)
+        if self._selected_fields is None:
+            return data
+        return {k: v for k, v in data.items() if k in self._selected_fields}
+
+
 class UserRigisterRequestSchema(Schema):
     """User register request schema."""
 
@@ -0,0 +1,80 @@
+"""In-process periodic tasks.
+
+A task runs in a daemon thread of the server process, every `interval` seconds. It is meant for cheap,
+idempotent maintenance, e.g. purging deleted rows: every server process runs its own copy, and a run that
+fails is logged and retried at the next interval.
+"""
+import logging
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+_tasks: dict[str, "PeriodicTask"] = {}
+_tasks_lock = threading.Lock()
+
+
+class PeriodicTask:
+    """Run a function every `interval` seconds in a daemon thread.
+
+    Attributes:
+        name (str): task name, also the thread name.
+        interval (float): seconds between the end of a run and the start of the next one.
+        func (Callable[[], Any]): function to run.
+        last_result (Any): return value of the last successful run.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Any]) -> None:
+        """Init the task, it is not started."""
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.last_result: Any = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> None:
+        """Start the thread. the first run is one interval after the start."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Ask the thread to stop after the current run."""
+        self._stop.set()
+
+    def run_once(self) -> None:
+        """Run the function once, log and swallow its exception."""
+        try:
+            self.last_result = self.func()
+        except Exception:
+            logger.exception("periodic task %s failed", self.name)
+        finally:
+            close_old_connections()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+def start_periodic_task(name: str, interval: float, func: Callable[[], Any]) -> PeriodicTask | None:
+    """Start a periodic task once per process.
+
+    Args:
+        name (str): task name. a task with the same name is started only once.
+        interval (float): seconds between runs. 0 or less disables the task.
+        func (Callable[[], Any]): function to run.
+
+    Returns:
+        PeriodicTask | None: the running task, None if it is disabled.
+    """
+    if interval <= 0:
+        return None
+
+    with _tasks_lock:
+        if name not in _tasks:
+            _tasks[name] = PeriodicTask(name, interval, func)
+            _tasks[name].start()
+        return _tasks[name]
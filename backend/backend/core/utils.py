@@ -3,7 +3,5 @@ BASE_EXCLUDE_FIELD = [
     "created_by_user",
     "updated_at",
     "updated_by_user",
-    "is_delete",
-    "deleted_at",
-    "deleted_by_user",
+    "version",
 ]
@@ -1,22 +1,56 @@
+import logging
+from collections.abc import AsyncIterator
+from datetime import timedelta
 from typing import Any
 from uuid import UUID
 
 from asgiref.sync import sync_to_async
+from core import events
 from core import schemas as core_schemas
+from core.apis import AsyncBaseEditApiController
+from core.apis import BaseEditApiController
+from core.cache import invalidate_user
+from core.exceptions import Http400BadRequestException
 from core.exceptions import Http401UnauthorizedException
 from core.exceptions import Http404NotFoundException
-from core.apis import BaseEditApiController
-from django.core.handlers.asgi import ASGIRequest
+from core.exceptions import Http412PreconditionFailedException
+from core.pagination import decode_sync_token
+from core.pagination import encode_sync_token
+from core.pagination import keyset_paginate
+from core.renderers import dumps
+from core.renderers import render_json
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import AnonymousUser
-
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from ninja import Query
 from ninja_extra import api_controller
 from ninja_extra import route
 from ninja_extra.permissions import IsAuthenticated
 from ninja_jwt.authentication import AsyncJWTAuth
 
+from . import diff
 from . import models
+from . import previews
+from . import retention
+from . import revisions
 from . import schemas
+from . import search
+from . import tombstones
+from .counters import CounterDeltas
+from .counters import NoteState
+from .counters import get_summary as get_note_summary
+from .importer import NoteImporter
+
+
+logger = logging.getLogger(__name__)
 
 
 @api_controller(
@@ -25,11 +59,16 @@ from . import schemas
     tags=["note_books"],
     permissions=[IsAuthenticated],
 )
-class NoteBookController(BaseEditApiController):
+class NoteBookController(AsyncBaseEditApiController):
     """NoteBook api controller."""
 
     Model = models.NoteBookModel
 
+    GetModelResponseSchema = schemas.GetNoteBookResponseSchema
+    ListModelResponseSchema = schemas.GetNoteBookListItemSchema
+
+    list_fields = "title"
+
     @route.post(
         "",
         response={
@@ -39,18 +78,64 @@ class NoteBookController(BaseEditApiController):
     )
     async def create(self, request: ASGIRequest, body: schemas.PostNoteBookRequestSchema) -> schemas.PostNoteBookResponseSchema:
         """Create note book."""
-        return await sync_to_async(super().create)(request=request, body=body)
+        return await super().create(request=request, body=body)
 
     @route.get(
         "",
         response={
-            200: list[schemas.GetNoteBookResponseSchema],
+            200: list[schemas.GetNoteBookListItemSchema],
+            400: core_schemas.Http400BadRequestSchema,
             401: core_schemas.Http401UnauthorizedSchema,
         },
     )
-    async def get_all(self, request: ASGIRequest) -> list[schemas.GetNoteBookResponseSchema]:
-        """Get all note books."""
-        return await sync_to_async(super().get_all)(request=request)
+    async def get_all(
+        self,
+        request: ASGIRequest,
+        fields: str | None = None,
+        *,
+        with_counts: bool = False,
+    ) -> list[schemas.GetNoteBookListItemSchema]:
+        """Get all note books. `fields` selects a comma separated subset of the fields.
+
+        `with_counts=true` adds the number of live notes of every note book as `note_count`, read from the
+        note counters instead of counting the notes.
+        """
+        if not with_counts:
+            return await super().get_all(request=request, fields=fields)
+
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        model = self.Model.objects.filter(created_by_user_id=request.user.id)  # type: ignore
+        counters = models.NoteCounterModel.objects.filter(user_id=request.user.id)  # type: ignore
+        value_fields = self.get_value_fields(fields)
+
+        def render() -> bytes:
+            response = model.values(*value_fields).annotate(
+                note_count=Coalesce(Subquery(counters.filter(note_book_id=OuterRef("id")).values("count")[:1]), 0),
+            )
+            return render_json(list[schemas.GetNoteBookListItemSchema], list(response))
+
+        return await sync_to_async(self.cached_list_response)(
+            request,
+            {"fields": value_fields, "with_counts": True},
+            (model, counters),
+            render,
+        )
+
+    @route.get(
+        "/summary",
+        response={
+            200: schemas.NoteBookSummarySchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def summary(self, request: ASGIRequest) -> schemas.NoteBookSummarySchema:
+        """Get the note counts of all notes, notes not in any note book, archive and trash."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        return await sync_to_async(get_note_summary)(request.user.id)  # type: ignore
 
     @route.get(
         "/{pk}",
@@ -62,7 +147,7 @@ class NoteBookController(BaseEditApiController):
     )
     async def get(self, request: ASGIRequest, pk: UUID) -> schemas.GetNoteBookResponseSchema:
         """Get all note in note book."""
-        return await sync_to_async(super().get)(request=request, pk=pk)
+        return await super().get(request=request, pk=pk)
 
     @route.put(
         "/{pk}",
@@ -70,11 +155,12 @@ class NoteBookController(BaseEditApiController):
             200: schemas.PutNoteBookResponseSchema,
             401: core_schemas.Http401UnauthorizedSchema,
             404: core_schemas.Http404NotFoundSchema,
+            412: core_schemas.Http412PreconditionFailedSchema,
         },
     )
     async def update(self, request: ASGIRequest, pk: UUID, body: schemas.PutNoteBookRequestSchema) -> schemas.PutNoteBookResponseSchema:
         """Update note book."""
-        return await sync_to_async(super().update)(request=request, pk=pk, body=body)
+        return await super().update(request=request, pk=pk, body=body)
 
     @route.delete(
         "/{pk}",
@@ -84,9 +170,43 @@ class NoteBookController(BaseEditApiController):
             404: core_schemas.Http404NotFoundSchema,
         },
     )
-    async def delete(self, request: ASGIRequest, pk: UUID) -> dict[Any, Any]:
-        """Delete note book."""
-        return await sync_to_async(super().delete)(request=request, pk=pk)
+    async def delete(self, request: ASGIRequest, pk: UUID, *, trash_notes: bool = False) -> dict[Any, Any]:
+        """Delete note book. its notes are moved to "not in any note book", and to the trash with `trash_notes=true`.
+
+        The notes are moved with one UPDATE. Restoring the note book puts them back in it.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        try:
+            model = await self.Model.objects.aget(  # type: ignore
+                id=pk,
+            )
+        except self.Model.DoesNotExist as err:  # type: ignore
+            raise Http404NotFoundException from err
+
+        await sync_to_async(model.delete)(request.user, trash_notes=trash_notes)
+
+        return {"msg": "success"}
+
+    @route.post(
+        "/{pk}/restore",
+        response={
+            200: schemas.GetNoteBookResponseSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+            404: core_schemas.Http404NotFoundSchema,
+        },
+    )
+    async def restore(self, request: ASGIRequest, pk: UUID) -> schemas.GetNoteBookResponseSchema:
+        """Restore a deleted note book from the tombstone table, with the notes it had when it was deleted."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        note_book = await sync_to_async(tombstones.restore_note_book)(pk, request.user)
+        if note_book is None:
+            raise Http404NotFoundException
+
+        return note_book
 
 
 @api_controller(
@@ -95,11 +215,19 @@ class NoteBookController(BaseEditApiController):
     tags=["notes"],
     permissions=[IsAuthenticated],
 )
-class NoteController(BaseEditApiController):
+class NoteController(AsyncBaseEditApiController):
     """Note api controller."""
 
     Model = models.NoteModel
 
+    GetModelResponseSchema = schemas.GetNoteResponseSchema
+    ListModelResponseSchema = schemas.GetNoteListItemSchema
+
+    list_fields = ",".join(models.NOTE_LIST_FIELDS)
+
+    export_chunk_size = 2000
+    import_chunk_size = 1000
+
     @route.post(
         "",
         response={
@@ -121,42 +249,334 @@ class NoteController(BaseEditApiController):
             note_book_id=note_book_id,
         )
 
-        await sync_to_async(model.create)(request.user)
+        await model.acreate(request.user)
 
         return model
 
     @route.get(
         "",
         response={
-            200: list[schemas.GetNoteResponseSchema],
+            200: list[schemas.GetNoteListItemSchema] | schemas.GetNotePageResponseSchema,
+            400: core_schemas.Http400BadRequestSchema,
             401: core_schemas.Http401UnauthorizedSchema,
         },
     )
-    async def get_all(self, request: ASGIRequest, filter: Query[schemas.GetNoteFilterSchema]) -> list[schemas.GetNoteResponseSchema]:
-        """Get all notes."""
+    async def get_all(
+        self,
+        request: ASGIRequest,
+        filters: Query[schemas.GetNoteFilterSchema],
+    ) -> list[schemas.GetNoteListItemSchema] | schemas.GetNotePageResponseSchema:
+        """Get all notes.
+
+        Without `limit` every matching note is returned as a list. With `limit` the notes are returned
+        page by page, pass `next_cursor` of the previous page as `cursor` to get the next one.
+        `fields` selects a comma separated subset of the fields, e.g. `fields=title,note_book` for the sidebar.
+        Notes are listed with the preview of their content, never with the content itself.
+        """
         if isinstance(request.user, AnonymousUser):
             raise Http401UnauthorizedException
 
-        if filter.all:
+        if filters.all:
             filter_dict = {}
-        elif filter.is_archived or filter.is_trash:
+        elif filters.is_archived or filters.is_trash:
             filter_dict = {
-                "is_archived": filter.is_archived,
-                "is_trash": filter.is_trash,
+                "is_archived": filters.is_archived,
+                "is_trash": filters.is_trash,
             }
         else:
             filter_dict = {
-                "note_book_id": filter.note_book_id,
+                "note_book_id": filters.note_book_id,
             }
 
-        model = await sync_to_async(self.Model.objects.filter)(  # type: ignore
+        model = self.Model.objects.filter(  # type: ignore
             created_by_user_id=request.user.id,  # type: ignore
             **filter_dict,  # type: ignore
         )
 
-        response = await sync_to_async(model.values)()
+        value_fields = self.get_value_fields(filters.fields)
+        if value_fields and filters.limit is not None:
+            value_fields.append("created_at")
+
+        def render() -> bytes:
+            response = model.values(*value_fields)
+
+            if filters.limit is not None:
+                items, next_cursor = keyset_paginate(response, filters.cursor, filters.limit)
+                return render_json(schemas.GetNotePageResponseSchema, {"items": items, "next_cursor": next_cursor})
+
+            return render_json(list[schemas.GetNoteListItemSchema], list(response))
+
+        params = {**filter_dict, "limit": filters.limit, "cursor": filters.cursor, "fields": value_fields}
+
+        return await sync_to_async(self.cached_list_response)(request, params, model, render)
+
+    @route.get(
+        "/search",
+        response={
+            200: list[schemas.SearchNoteResponseSchema],
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def search(
+        self,
+        request: ASGIRequest,
+        filters: Query[schemas.SearchNoteFilterSchema],
+    ) -> list[schemas.SearchNoteResponseSchema]:
+        """Full text search over note title and content, best match first.
+
+        Returns the fields of the list with a snippet of the content around the match instead of the content,
+        get the content with `GET /notes/{pk}`.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        note_ids = await sync_to_async(search.search_note_ids)(
+            request.user.id,  # type: ignore
+            filters.q,
+            limit=filters.limit,
+            offset=filters.offset,
+        )
+
+        model = self.Model.objects.filter(  # type: ignore
+            id__in=note_ids,
+            created_by_user_id=request.user.id,  # type: ignore
+        )
+        notes = {note["id"]: note async for note in model.values()}
+        for note in notes.values():
+            note["snippet"] = previews.snippet(note.pop("content"), filters.q)
+
+        return [notes[note_id] for note_id in note_ids if note_id in notes]
+
+    @route.get(
+        "/export",
+        response={
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def export(self, request: ASGIRequest) -> StreamingHttpResponse:
+        """Export every note book and note of the user as newline delimited json.
+
+        The rows are streamed in chunks of `export_chunk_size`, so memory stays flat whatever the size of the corpus.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        response = StreamingHttpResponse(
+            self.export_lines(request.user.id),  # type: ignore
+            content_type="application/x-ndjson",
+        )
+        response["Content-Disposition"] = 'attachment; filename="notes.ndjson"'
+        return response
+
+    async def export_lines(self, user_id: UUID) -> AsyncIterator[bytes]:
+        """Yield the export lines of a user, note books first.
+
+        Args:
+            user_id (UUID): owner of the notes.
+
+        Yields:
+            bytes: one json line per note book or note.
+        """
+        note_books = models.NoteBookModel.objects.filter(created_by_user_id=user_id).values()
+        async for note_book in note_books.aiterator(chunk_size=self.export_chunk_size):
+            yield render_json(schemas.ExportNoteBookLineSchema, note_book) + b"\n"
+
+        notes = (
+            self.Model.objects.filter(created_by_user_id=user_id)  # type: ignore
+            .annotate(note_book_title=F("note_book__title"))
+            .values()
+        )
+        async for note in notes.aiterator(chunk_size=self.export_chunk_size):
+            yield render_json(schemas.ExportNoteLineSchema, note) + b"\n"
+
+    @route.post(
+        "/import",
+        response={
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def import_notes(self, request: ASGIRequest) -> StreamingHttpResponse:
+        """Import notes from a newline delimited json body, e.g. an export.
+
+        The body is read line by line and inserted in chunks of `import_chunk_size`. The response is
+        newline delimited json too: an error line per invalid input line, a progress line per chunk and
+        a summary line at the end.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        importer = NoteImporter(request.user, request, chunk_size=self.import_chunk_size)  # type: ignore
+        return StreamingHttpResponse(self.import_lines(importer), content_type="application/x-ndjson")
+
+    async def import_lines(self, importer: NoteImporter) -> AsyncIterator[bytes]:
+        """Run an import chunk by chunk and yield its report.
+
+        Args:
+            importer (NoteImporter): importer reading the request body.
+
+        Yields:
+            bytes: one json line per error, per chunk and for the summary.
+        """
+        while (records := await sync_to_async(importer.import_chunk)()) is not None:
+            for record in records:
+                yield dumps(record) + b"\n"
+            logger.info("note import of user %s: %s", importer.user.id, records[-1])  # type: ignore
+
+        yield dumps(importer.summary()) + b"\n"
+
+    @route.post(
+        "/bulk",
+        response={
+            200: schemas.BulkNoteResponseSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def bulk(self, request: ASGIRequest, body: schemas.BulkNoteRequestSchema) -> schemas.BulkNoteResponseSchema:
+        """Patch, move, archive or trash many notes in one request."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        results = await sync_to_async(self.apply_bulk_operations)(request.user, body.operations)
+
+        return {"results": results}
+
+    @transaction.atomic
+    def apply_bulk_operations(
+        self,
+        user: AbstractBaseUser,
+        operations: list[schemas.BulkNoteOperationSchema],
+    ) -> list[dict[str, Any]]:
+        """Apply bulk note operations in one transaction.
+
+        Changes of the same note are merged in order, then notes with identical changes are updated
+        together with one `QuerySet.update`, so the number of queries depends on the number of distinct
+        changes rather than on the number of notes.
+
+        Args:
+            user (AbstractBaseUser): user applying the changes. only the user's notes are touched.
+            operations (list[schemas.BulkNoteOperationSchema]): operations from the request.
+
+        Returns:
+            list[dict[str, Any]]: result of every operation, in request order.
+        """
+        changes_by_id: dict[UUID, dict[str, Any]] = {}
+        for operation in operations:
+            changes_by_id.setdefault(operation.id, {}).update(operation.changes.model_dump())
+
+        states = {
+            pk: NoteState(*state)
+            for pk, *state in self.Model.objects.filter(  # type: ignore
+                id__in=changes_by_id,
+                created_by_user_id=user.id,  # type: ignore
+            ).values_list("id", *NoteState._fields)
+        }
+        status, groups = self.group_bulk_changes(user, changes_by_id, states)
+
+        retitled_ids = self.record_bulk_retitles(groups)
+        self.update_bulk_groups(user, groups)
+        self.move_bulk_counters(user, groups, states)
+        search.reindex_notes(retitled_ids)
+        if groups:
+            invalidate_user(user.id)  # type: ignore
+            updated_ids = [pk for ids in groups.values() for pk in ids]
+            events.publish(user.id, events.UPDATED, self.Model, updated_ids)  # type: ignore
+
+        return [{"id": operation.id, "status": status[operation.id]} for operation in operations]
+
+    def group_bulk_changes(
+        self,
+        user: AbstractBaseUser,
+        changes_by_id: dict[UUID, dict[str, Any]],
+        states: dict[UUID, NoteState],
+    ) -> tuple[dict[UUID, str], dict[tuple[tuple[str, Any], ...], list[UUID]]]:
+        """Check the merged changes of every note and group the notes with identical changes.
+
+        Args:
+            user (AbstractBaseUser): user applying the changes.
+            changes_by_id (dict[UUID, dict[str, Any]]): merged changes by note id.
+            states (dict[UUID, NoteState]): counted state of the user's notes among them.
+
+        Returns:
+            tuple[dict[UUID, str], dict[tuple[tuple[str, Any], ...], list[UUID]]]: status by note id, and the
+                ids of the notes to update by their sorted changes.
+        """
+        owned_note_book_ids = set(
+            models.NoteBookModel.objects.filter(
+                id__in={changes.get("note_book_id") for changes in changes_by_id.values()} - {None},
+                created_by_user_id=user.id,  # type: ignore
+            ).values_list("id", flat=True),
+        )
+
+        status: dict[UUID, str] = {}
+        groups: dict[tuple[tuple[str, Any], ...], list[UUID]] = {}
+        for pk, changes in changes_by_id.items():
+            if pk not in states:
+                status[pk] = "not_found"
+            elif changes.get("note_book_id") not in (None, *owned_note_book_ids):
+                status[pk] = "note_book_not_found"
+            else:
+                status[pk] = "ok"
+                if changes:
+                    groups.setdefault(tuple(sorted(changes.items())), []).append(pk)
+        return status, groups
+
+    def record_bulk_retitles(self, groups: dict[tuple[tuple[str, Any], ...], list[UUID]]) -> list[UUID]:
+        """Record a revision of every note whose title changes, before the update.
+
+        Returns:
+            list[UUID]: ids of the notes with a title change, to reindex after the update.
+        """
+        new_titles = {pk: dict(changes)["title"] for changes, ids in groups.items() if "title" in dict(changes) for pk in ids}
+        previous = self.Model.objects.filter(id__in=new_titles).values(  # type: ignore
+            "id",
+            "title",
+            "content",
+            "version",
+            "updated_at",
+            "updated_by_user_id",
+        )
+        for note in previous:
+            if note["title"] != new_titles[note["id"]]:
+                revisions.record_revision(note["id"], note["content"], note)
+        return list(new_titles)
+
+    def update_bulk_groups(self, user: AbstractBaseUser, groups: dict[tuple[tuple[str, Any], ...], list[UUID]]) -> None:
+        """Update the notes of every group of identical changes with one query."""
+        now = timezone.now()
+        for changes, ids in groups.items():
+            self.Model.objects.filter(id__in=ids).update(  # type: ignore
+                **dict(changes),
+                updated_by_user=user,
+                updated_at=now,
+                version=F("version") + 1,
+            )
+
+    def move_bulk_counters(
+        self,
+        user: AbstractBaseUser,
+        groups: dict[tuple[tuple[str, Any], ...], list[UUID]],
+        states: dict[UUID, NoteState],
+    ) -> None:
+        """Move the updated notes between the counters of their note book, archive and trash."""
+        deltas = CounterDeltas()
+        for changes, ids in groups.items():
+            for pk in ids:
+                deltas.move(states[pk], states[pk]._replace(**{k: v for k, v in changes if k in NoteState._fields}))
+        deltas.apply(user.id)  # type: ignore
+
+    @route.delete(
+        "/trash",
+        response={
+            200: schemas.EmptyTrashResponseSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def empty_trash(self, request: ASGIRequest) -> schemas.EmptyTrashResponseSchema:
+        """Delete every trashed note of the user at once, see note/retention.py."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
 
-        return await sync_to_async(list)(response)
+        return {"deleted": await sync_to_async(retention.empty_trash)(request.user)}
 
     @route.get(
         "/{pk}",
@@ -168,7 +588,7 @@ class NoteController(BaseEditApiController):
     )
     async def get(self, request: ASGIRequest, pk: UUID) -> schemas.GetNoteResponseSchema:
         """Get note."""
-        return await sync_to_async(super().get)(request=request, pk=pk)
+        return await super().get(request=request, pk=pk)
 
     @route.put(
         "/{pk}",
@@ -176,6 +596,7 @@ class NoteController(BaseEditApiController):
             200: schemas.PutNoteResponseSchema,
             401: core_schemas.Http401UnauthorizedSchema,
             404: core_schemas.Http404NotFoundSchema,
+            412: core_schemas.Http412PreconditionFailedSchema,
         },
     )
     async def update(self, request: ASGIRequest, pk: UUID, body: schemas.PutNoteRequestSchema) -> schemas.PutNoteResponseSchema:
@@ -187,17 +608,20 @@ class NoteController(BaseEditApiController):
         note_book_id = request_body.pop("note_book")
 
         try:
-            model = await sync_to_async(self.Model.objects.get)(  # type: ignore
+            model = await self.Model.objects.aget(  # type: ignore
                 id=pk,
             )
         except self.Model.DoesNotExist as err:  # type: ignore
             raise Http404NotFoundException from err
 
+        self.check_precondition(request, model)
+
         for k, v in request_body.items():
             setattr(model, k, v)
 
         model.note_book_id = note_book_id
-        await sync_to_async(model.save)(request.user)
+        await model.asave(request.user)
+        self.set_object_validators(model)
 
         return model
 
@@ -211,7 +635,26 @@ class NoteController(BaseEditApiController):
     )
     async def delete(self, request: ASGIRequest, pk: UUID) -> dict[Any, Any]:
         """Delete note."""
-        return await sync_to_async(super().delete)(request=request, pk=pk)
+        return await super().delete(request=request, pk=pk)
+
+    @route.post(
+        "/{pk}/restore",
+        response={
+            200: schemas.GetNoteResponseSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+            404: core_schemas.Http404NotFoundSchema,
+        },
+    )
+    async def restore(self, request: ASGIRequest, pk: UUID) -> schemas.GetNoteResponseSchema:
+        """Restore a deleted note from the tombstone table, into its note book if that still exists."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        note = await sync_to_async(tombstones.restore_note)(pk, request.user)
+        if note is None:
+            raise Http404NotFoundException
+
+        return note
 
     @route.patch(
         "/{pk}",
@@ -219,6 +662,7 @@ class NoteController(BaseEditApiController):
             200: schemas.PutNoteResponseSchema,
             401: core_schemas.Http401UnauthorizedSchema,
             404: core_schemas.Http404NotFoundSchema,
+            412: core_schemas.Http412PreconditionFailedSchema,
         },
     )
     async def patch(self, request: ASGIRequest, pk: UUID, body: schemas.PatchNoteRequestSchema) -> schemas.PutNoteResponseSchema:
@@ -230,26 +674,123 @@ class NoteController(BaseEditApiController):
         request_body["note_book_id"] = request_body.pop("note_book")
 
         try:
-            model = await sync_to_async(self.Model.objects.get)(  # type: ignore
+            model = await self.Model.objects.aget(  # type: ignore
                 id=pk,
             )
         except self.Model.DoesNotExist as err:  # type: ignore
             raise Http404NotFoundException
 
+        self.check_precondition(request, model)
+
         for k, v in request_body.items():
             if v is not None and getattr(model, k) != v:
                 setattr(model, k, v)
 
-        await sync_to_async(model.save)(request.user)
+        await model.asave(request.user)
+        self.set_object_validators(model)
 
         return model
 
+    @route.patch(
+        "/{pk}/content",
+        response={
+            200: schemas.PatchNoteContentResponseSchema,
+            400: core_schemas.Http400BadRequestSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+            404: core_schemas.Http404NotFoundSchema,
+            412: core_schemas.Http412PreconditionFailedSchema,
+        },
+    )
+    async def patch_content(
+        self,
+        request: ASGIRequest,
+        pk: UUID,
+        body: schemas.PatchNoteContentRequestSchema,
+    ) -> schemas.PatchNoteContentResponseSchema:
+        """Edit the content of a note with an edit script instead of sending the whole content.
+
+        The edits are applied only if `base_hash` is the hash of the current content, 412 otherwise.
+        The response carries the new hash, not the content.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        try:
+            model = await self.Model.objects.aget(  # type: ignore
+                id=pk,
+                created_by_user_id=request.user.id,  # type: ignore
+            )
+        except self.Model.DoesNotExist as err:  # type: ignore
+            raise Http404NotFoundException from err
+
+        self.check_precondition(request, model)
+        if diff.content_hash(model.content) != body.base_hash:
+            raise Http412PreconditionFailedException
+
+        try:
+            model.content = diff.apply_edits(model.content, body.edits)
+        except diff.EditError as err:
+            raise Http400BadRequestException(str(err)) from err
+
+        await model.asave(request.user)
+        self.set_object_validators(model)
+
+        return {"id": model.id, "content_hash": diff.content_hash(model.content), "length": len(model.content)}
+
+    @route.get(
+        "/{pk}/revisions",
+        response={
+            200: list[schemas.NoteRevisionListItemSchema],
+            401: core_schemas.Http401UnauthorizedSchema,
+            404: core_schemas.Http404NotFoundSchema,
+        },
+    )
+    async def get_revisions(self, request: ASGIRequest, pk: UUID) -> list[schemas.NoteRevisionListItemSchema]:
+        """Get the revisions of a note, newest first, without their content."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        if not await self.Model.objects.filter(id=pk, created_by_user_id=request.user.id).aexists():  # type: ignore
+            raise Http404NotFoundException
+
+        return [revision async for revision in models.NoteRevisionModel.objects.filter(note_id=pk).defer("data")]
+
+    @route.get(
+        "/{pk}/revisions/{number}",
+        response={
+            200: schemas.NoteRevisionResponseSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+            404: core_schemas.Http404NotFoundSchema,
+        },
+    )
+    async def get_revision(self, request: ASGIRequest, pk: UUID, number: int) -> schemas.NoteRevisionResponseSchema:
+        """Get a revision of a note with its content, rebuilt from the nearest snapshot."""
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        try:
+            model = await self.Model.objects.aget(  # type: ignore
+                id=pk,
+                created_by_user_id=request.user.id,  # type: ignore
+            )
+        except self.Model.DoesNotExist as err:  # type: ignore
+            raise Http404NotFoundException from err
+
+        result = await sync_to_async(revisions.materialize_revision)(model, number)
+        if result is None:
+            raise Http404NotFoundException
+
+        revision, content = result
+        revision.content = content
+        return revision
+
     @route.patch(
         "/set_note_book_none/{pk}",
         response={
             200: schemas.PutNoteResponseSchema,
             401: core_schemas.Http401UnauthorizedSchema,
             404: core_schemas.Http404NotFoundSchema,
+            412: core_schemas.Http412PreconditionFailedSchema,
         },
     )
     async def set_note_book_none(self, request: ASGIRequest, pk: UUID) -> schemas.PutNoteResponseSchema:
@@ -258,14 +799,146 @@ class NoteController(BaseEditApiController):
             raise Http401UnauthorizedException
 
         try:
-            model = await sync_to_async(self.Model.objects.get)(  # type: ignore
+            model = await self.Model.objects.aget(  # type: ignore
                 id=pk,
             )
         except self.Model.DoesNotExist as err:  # type: ignore
             raise Http404NotFoundException
 
+        self.check_precondition(request, model)
+
         model.note_book_id = None
 
-        await sync_to_async(model.save)(request.user)
+        await model.asave(request.user)
+        self.set_object_validators(model)
 
         return model
+
+
+@api_controller(
+    "/sync",
+    auth=AsyncJWTAuth(),
+    tags=["sync"],
+    permissions=[IsAuthenticated],
+)
+class SyncController:
+    """Delta sync api controller."""
+
+    @route.get(
+        "",
+        response={
+            200: schemas.SyncResponseSchema,
+            400: core_schemas.Http400BadRequestSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def sync(self, request: ASGIRequest, since: str | None = None) -> schemas.SyncResponseSchema:
+        """Get the note books and notes created, updated or deleted since the token of the previous sync.
+
+        Without a token every note book and note is returned. Deleted ones are read from the tombstone table,
+        see note/tombstones.py, by (user, model, deleted_at) the same way the live ones are by updated_at.
+        The returned token is the latest `updated_at` sent, pass it as `since` on the next sync.
+        A token older than the retention of deleted rows is answered like no token with `reset` set,
+        the client must drop its copy, since deletes it missed may have been purged.
+
+        `updated_at` is set when a save starts, not when its transaction commits, so a slow write can commit
+        with an `updated_at` before the token of a sync that ran meanwhile. The changes are therefore read
+        from `SYNC_SAFETY_WINDOW` seconds before the token: writes committing within that time after they
+        started are never missed. Changes of the window are sent again on the next sync, each object once,
+        clients apply them by id and version.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        user_id = request.user.id  # type: ignore
+        changes: dict[str, Any] = {}
+        latest = [decode_sync_token(since)] if since is not None else []
+        reset = bool(latest) and latest[0] < retention.purge_horizon()
+        if reset:
+            since, latest = None, []
+
+        window_start = latest[0] - timedelta(seconds=settings.SYNC_SAFETY_WINDOW) if latest else None
+        for key, model in (("note_books", models.NoteBookModel), ("notes", models.NoteModel)):
+            queryset = model.objects.filter(created_by_user_id=user_id).order_by("updated_at")
+            if since is not None:
+                queryset = queryset.filter(updated_at__gt=window_start)
+
+            changes[key] = [obj async for obj in queryset]
+            tombstones = (
+                [
+                    row
+                    async for row in models.TombstoneModel.objects.filter(
+                        user_id=user_id,
+                        model=model.model_label,
+                        deleted_at__gt=window_start,
+                    ).values_list("id", "deleted_at")
+                ]
+                if since is not None
+                else []
+            )
+            changes[f"deleted_{key}"] = [pk for pk, _ in tombstones]
+            latest += [obj.updated_at for obj in changes[key]] + [deleted_at for _, deleted_at in tombstones]
+
+        return {**changes, "token": encode_sync_token(max(latest)) if latest else None, "reset": reset}
+
+
+@api_controller(
+    "/workspace",
+    auth=AsyncJWTAuth(),
+    tags=["workspace"],
+    permissions=[IsAuthenticated],
+)
+class WorkspaceController(BaseEditApiController):
+    """Workspace api controller."""
+
+    Model = models.NoteModel
+
+    @route.get(
+        "",
+        response={
+            200: schemas.WorkspaceResponseSchema,
+            401: core_schemas.Http401UnauthorizedSchema,
+        },
+    )
+    async def get_workspace(self, request: ASGIRequest) -> schemas.WorkspaceResponseSchema:
+        """Get the note books and the note metadata of every sidebar bucket in one request.
+
+        The notes are read with one scan of the user's notes and grouped in python, the buckets follow the
+        filters of `GET /notes`. Note content is not included, get it with `GET /notes/{pk}`.
+        """
+        if isinstance(request.user, AnonymousUser):
+            raise Http401UnauthorizedException
+
+        note_books = models.NoteBookModel.objects.filter(created_by_user_id=request.user.id)  # type: ignore
+        notes = self.Model.objects.filter(created_by_user_id=request.user.id)  # type: ignore
+
+        def render() -> bytes:
+            note_book_rows = list(note_books.order_by("title").values())
+            note_rows = list(
+                notes.order_by("title", "id").values("id", "title", "note_book_id", "is_archived", "is_trash"),
+            )
+
+            buckets: dict[str, list[UUID]] = {
+                "all": [],
+                "not_in_any": [],
+                "archive": [],
+                "trash": [],
+                **{str(note_book["id"]): [] for note_book in note_book_rows},
+            }
+            for note in note_rows:
+                buckets["all"].append(note["id"])
+                if note["note_book_id"] is None:
+                    buckets["not_in_any"].append(note["id"])
+                elif str(note["note_book_id"]) in buckets:
+                    buckets[str(note["note_book_id"])].append(note["id"])
+                if note["is_archived"] and not note["is_trash"]:
+                    buckets["archive"].append(note["id"])
+                if note["is_trash"] and not note["is_archived"]:
+                    buckets["trash"].append(note["id"])
+
+            return render_json(
+                schemas.WorkspaceResponseSchema,
+                {"note_books": note_book_rows, "notes": note_rows, "buckets": buckets},
+            )
+
+        return await sync_to_async(self.cached_list_response)(request, {"workspace": True}, (notes, note_books), render)
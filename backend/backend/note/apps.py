@@ -1,4 +1,16 @@
+from typing import Any
+
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_search_index(sender: AppConfig, using: str = "default", **kwargs: Any) -> None:  # noqa: ARG001
+    """Create the full text search index table after migrate, and index the existing notes into a new table."""
+    from .search import ensure_search_index
+    from .search import rebuild_search_index
+
+    if ensure_search_index(using=using):
+        rebuild_search_index(using=using)
 
 
 class NoteConfig(AppConfig):
@@ -6,3 +18,7 @@ class NoteConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "note"
+
+    def ready(self) -> None:
+        """Connect signal handlers."""
+        post_migrate.connect(create_search_index, sender=self)
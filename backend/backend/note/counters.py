@@ -0,0 +1,180 @@
+"""Denormalized note counters of the sidebar.
+
+Every user has one counter row per note book, plus one with `note_book = NULL` for the notes not in any
+note book. A row counts the live notes of the bucket, and the archived and trashed ones among them:
+    - all: sum of `count`.
+    - note book / not in any: `count` of the row.
+    - archive: sum of `archived_count` (archived, not trashed).
+    - trash: sum of `trash_count` (trashed, not archived).
+which are the same buckets as the note list filters, so reading them costs O(#note books).
+
+Rows are kept up to date by `NoteModel.create` / `NoteModel.save`, by the tombstone moves of delete and
+restore, see note/tombstones.py, and by the bulk paths, in the same transaction as the note change.
+`recount_notes` rebuilds them from the notes.
+"""
+from collections import Counter
+from collections import defaultdict
+from typing import Any
+from typing import NamedTuple
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+COUNTED_FIELDS = ("note_book_id", "is_archived", "is_trash")
+
+
+class NoteState(NamedTuple):
+    """Counted fields of a note."""
+
+    note_book_id: UUID | None
+    is_archived: bool
+    is_trash: bool
+
+
+def note_state(note: Any) -> NoteState:
+    """Get the counted fields of a note.
+
+    Args:
+        note (NoteModel): note instance.
+
+    Returns:
+        NoteState: counted fields.
+    """
+    return NoteState(*(getattr(note, field) for field in COUNTED_FIELDS))
+
+
+class CounterDeltas:
+    """Counter changes of one user, applied with one UPDATE per touched row."""
+
+    def __init__(self) -> None:
+        """Init empty deltas."""
+        self._deltas: defaultdict[UUID | None, Counter[str]] = defaultdict(Counter)
+
+    def add(self, state: NoteState | None, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) the contribution of a note.
+
+        Args:
+            state (NoteState | None): counted fields of the note, None if the note does not exist.
+            sign (int): 1 or -1.
+        """
+        if state is None:
+            return
+
+        deltas = self._deltas[state.note_book_id]
+        deltas["count"] += sign
+        if state.is_archived and not state.is_trash:
+            deltas["archived_count"] += sign
+        if state.is_trash and not state.is_archived:
+            deltas["trash_count"] += sign
+
+    def move(self, old: NoteState | None, new: NoteState | None) -> None:
+        """Add the change of a note from one state to another.
+
+        Args:
+            old (NoteState | None): counted fields before the change, None for a new note.
+            new (NoteState | None): counted fields after the change.
+        """
+        if old != new:
+            self.add(old, -1)
+            self.add(new, 1)
+
+    def apply(self, user_id: UUID | None, using: str = "default") -> None:
+        """Write the deltas to the counter rows of a user.
+
+        Args:
+            user_id (UUID | None): owner of the notes.
+            using (str, optional): database alias. Defaults to "default".
+        """
+        from .models import NoteCounterModel
+
+        if user_id is None:
+            return
+
+        now = timezone.now()
+        for note_book_id, deltas in self._deltas.items():
+            changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+            if not changes:
+                continue
+
+            counters = NoteCounterModel.objects.using(using).filter(user_id=user_id, note_book_id=note_book_id)
+            if not counters.update(**changes, updated_at=now):
+                NoteCounterModel.objects.using(using).get_or_create(user_id=user_id, note_book_id=note_book_id)
+                counters.update(**changes, updated_at=now)
+
+        self._deltas.clear()
+
+
+def get_summary(user_id: UUID, using: str = "default") -> dict[str, int]:
+    """Get the sidebar counts of a user.
+
+    Args:
+        user_id (UUID): owner of the notes.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        dict[str, int]: all, not_in_any, archive and trash counts.
+    """
+    from .models import NoteCounterModel
+
+    return (
+        NoteCounterModel.objects.using(using)
+        .filter(user_id=user_id)
+        .aggregate(
+            all=Coalesce(Sum("count"), 0),
+            not_in_any=Coalesce(Sum("count", filter=Q(note_book__isnull=True)), 0),
+            archive=Coalesce(Sum("archived_count"), 0),
+            trash=Coalesce(Sum("trash_count"), 0),
+        )
+    )
+
+
+@transaction.atomic
+def recount_notes(user_id: UUID | None = None) -> int:
+    """Rebuild the counter rows from the notes with one grouped query.
+
+    Args:
+        user_id (UUID | None, optional): only rebuild the rows of this user. Defaults to None, every user.
+
+    Returns:
+        int: number of counter rows written.
+    """
+    from .models import NoteCounterModel
+    from .models import NoteModel
+
+    notes = NoteModel.objects.all()
+    counters = NoteCounterModel.objects.all()
+    if user_id is not None:
+        notes = notes.filter(created_by_user_id=user_id)
+        counters = counters.filter(user_id=user_id)
+
+    rows = (
+        notes.filter(created_by_user__isnull=False)
+        .order_by()
+        .values("created_by_user_id", "note_book_id")
+        .annotate(
+            count=Count("id"),
+            archived_count=Count("id", filter=Q(is_archived=True, is_trash=False)),
+            trash_count=Count("id", filter=Q(is_trash=True, is_archived=False)),
+        )
+    )
+
+    counters.delete()
+    return len(
+        NoteCounterModel.objects.bulk_create(
+            NoteCounterModel(
+                user_id=row["created_by_user_id"],
+                note_book_id=row["note_book_id"],
+                count=row["count"],
+                archived_count=row["archived_count"],
+                trash_count=row["trash_count"],
+            )
+            for row in rows
+        ),
+    )
@@ -0,0 +1,84 @@
+"""Edit scripts of note content.
+
+An edit script is a list of insert and delete operations. Offsets are in unicode code points (python
+string indices) and every operation applies to the result of the previous ones. The script is checked
+against the sha256 of the content it was made for, so it is never applied to another version.
+"""
+import hashlib
+from collections.abc import Iterable
+from typing import Any
+
+
+class EditError(ValueError):
+    """Raised when an edit does not fit the content."""
+
+
+def content_hash(content: str) -> str:
+    """Get the hash an edit script refers to.
+
+    Args:
+        content (str): note content.
+
+    Returns:
+        str: hex sha256 of the utf-8 content.
+    """
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def apply_edits(content: str, edits: Iterable[Any]) -> str:
+    """Apply an edit script.
+
+    Args:
+        content (str): base content.
+        edits (Iterable[Any]): operations with `op` ("insert" or "delete"), `offset`, and `text` or `length`,
+            validated by NoteContentEditSchema.
+
+    Raises:
+        EditError: if an operation is out of the content.
+
+    Returns:
+        str: edited content.
+    """
+    for edit in edits:
+        if edit.offset > len(content):
+            raise EditError(f"Offset {edit.offset} is out of the content")
+
+        if edit.op == "insert":
+            content = content[: edit.offset] + edit.text + content[edit.offset :]
+        else:
+            if edit.offset + edit.length > len(content):
+                raise EditError(f"Delete of {edit.length} at {edit.offset} is out of the content")
+            content = content[: edit.offset] + content[edit.offset + edit.length :]
+
+    return content
+
+
+def make_edits(old: str, new: str) -> list[dict[str, Any]]:
+    """Make the edit script from one content to another, at most a delete and an insert.
+
+    Only the middle between the common prefix and the common suffix is sent, which is the typical
+    shape of an editor change.
+
+    Args:
+        old (str): base content.
+        new (str): edited content.
+
+    Returns:
+        list[dict[str, Any]]: edit script.
+    """
+    prefix = 0
+    max_prefix = min(len(old), len(new))
+    while prefix < max_prefix and old[prefix] == new[prefix]:
+        prefix += 1
+
+    suffix = 0
+    max_suffix = min(len(old), len(new)) - prefix
+    while suffix < max_suffix and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]:
+        suffix += 1
+
+    edits: list[dict[str, Any]] = []
+    if len(old) - prefix - suffix:
+        edits.append({"op": "delete", "offset": prefix, "length": len(old) - prefix - suffix})
+    if len(new) - prefix - suffix:
+        edits.append({"op": "insert", "offset": prefix, "text": new[prefix : len(new) - suffix]})
+    return edits
@@ -0,0 +1,173 @@
+"""Import of notes from newline delimited json."""
+import itertools
+import json
+from collections.abc import Iterable
+from typing import Any
+from uuid import UUID
+
+from core import events
+from core.cache import invalidate_user
+from django.contrib.auth.models import AbstractBaseUser
+from django.db import transaction
+from pydantic import ValidationError
+
+from . import counters
+from . import models
+from . import schemas
+from . import search
+
+
+class NoteImporter:
+    """Import notes from newline delimited json, one fixed size chunk at a time.
+
+    Every line is validated against ImportNoteLineSchema. Lines of another type (e.g. the note book lines of
+    an export) are skipped. The notes of a chunk are inserted with one `bulk_create` in one transaction,
+    so memory is bounded by the chunk size and a bad line only fails itself.
+
+    Attributes:
+        user (AbstractBaseUser): owner of the imported notes.
+        chunk_size (int): number of lines per chunk.
+        imported (int): number of imported notes so far.
+        failed (int): number of invalid lines so far.
+        note_books_created (int): number of note books created so far.
+    """
+
+    def __init__(self, user: AbstractBaseUser, lines: Iterable[bytes], chunk_size: int = 1000) -> None:
+        """Init the importer.
+
+        Args:
+            user (AbstractBaseUser): owner of the imported notes.
+            lines (Iterable[bytes]): newline delimited json lines, e.g. the request itself.
+            chunk_size (int, optional): number of lines per chunk. Defaults to 1000.
+        """
+        self.user = user
+        self.chunk_size = chunk_size
+        self.imported = 0
+        self.failed = 0
+        self.note_books_created = 0
+
+        self._lines = enumerate(lines, start=1)
+        self._line_number = 0
+        self._exhausted = False
+        self._note_book_ids: dict[str, UUID] | None = None
+        self._owned_note_book_ids: set[UUID] = set()
+
+    def summary(self) -> dict[str, Any]:
+        """Get the final report of the import.
+
+        Returns:
+            dict[str, Any]: number of imported notes, invalid lines and created note books.
+        """
+        return {
+            "done": True,
+            "imported": self.imported,
+            "failed": self.failed,
+            "note_books_created": self.note_books_created,
+        }
+
+    def import_chunk(self) -> list[dict[str, Any]] | None:
+        """Read, validate and insert the next chunk of lines.
+
+        Returns:
+            list[dict[str, Any]] | None: an error record per invalid line and a progress record, None when done.
+        """
+        if self._exhausted:
+            return None
+
+        records: list[dict[str, Any]] = []
+        lines: list[schemas.ImportNoteLineSchema] = []
+
+        chunk = list(itertools.islice(self._lines, self.chunk_size))
+        self._exhausted = len(chunk) < self.chunk_size
+
+        for line_number, raw in chunk:
+            self._line_number = line_number
+            if not raw.strip():
+                continue
+            try:
+                data = json.loads(raw)
+                if data.get("type", "note") != "note":
+                    continue
+                line = schemas.ImportNoteLineSchema.model_validate(data)
+            except (ValueError, AttributeError, ValidationError) as err:
+                self.failed += 1
+                records.append({"line": line_number, "error": str(err)})
+                continue
+
+            if line.note_book_title is None and line.note_book is not None:
+                self._load_note_books()
+                if line.note_book not in self._owned_note_book_ids:
+                    self.failed += 1
+                    records.append({"line": line_number, "error": "Note book not found"})
+                    continue
+
+            lines.append(line)
+
+        if lines:
+            self._insert(lines)
+
+        records.append({"line": self._line_number, "imported": self.imported})
+        return records
+
+    @transaction.atomic
+    def _insert(self, lines: list[schemas.ImportNoteLineSchema]) -> None:
+        note_book_ids = self._resolve_note_books({line.note_book_title for line in lines} - {None})
+
+        notes = []
+        for line in lines:
+            data = line.dict()
+            note_book_id = data.pop("note_book")
+            note_book_title = data.pop("note_book_title")
+            notes.append(
+                models.NoteModel(
+                    **data,
+                    note_book_id=note_book_ids[note_book_title] if note_book_title is not None else note_book_id,
+                    created_by_user=self.user,
+                    updated_by_user=self.user,
+                ),
+            )
+
+        for note in notes:
+            note.update_summary()
+        models.NoteModel.objects.bulk_create(notes)
+
+        deltas = counters.CounterDeltas()
+        for note in notes:
+            deltas.add(counters.note_state(note), 1)
+        deltas.apply(self.user.id)  # type: ignore
+
+        search.index_new_notes(notes)
+        invalidate_user(self.user.id)  # type: ignore
+        events.publish(self.user.id, events.CREATED, models.NoteModel, [note.id for note in notes])  # type: ignore
+
+        self.imported += len(notes)
+
+    def _load_note_books(self) -> dict[str, UUID]:
+        if self._note_book_ids is None:
+            self._note_book_ids = {}
+            for note_book_id, title in models.NoteBookModel.objects.filter(
+                created_by_user_id=self.user.id,  # type: ignore
+            ).values_list("id", "title"):
+                self._note_book_ids.setdefault(title, note_book_id)
+                self._owned_note_book_ids.add(note_book_id)
+        return self._note_book_ids
+
+    def _resolve_note_books(self, titles: set[str]) -> dict[str, UUID]:
+        self._load_note_books()
+
+        missing = [
+            models.NoteBookModel(title=title, created_by_user=self.user, updated_by_user=self.user)
+            for title in sorted(titles - self._note_book_ids.keys())
+        ]
+        models.NoteBookModel.objects.bulk_create(missing)
+        events.publish(
+            self.user.id,  # type: ignore
+            events.CREATED,
+            models.NoteBookModel,
+            [note_book.id for note_book in missing],
+        )
+        self._note_book_ids.update({note_book.title: note_book.id for note_book in missing})  # type: ignore
+        self._owned_note_book_ids.update(note_book.id for note_book in missing)
+        self.note_books_created += len(missing)
+
+        return self._note_book_ids
@@ -0,0 +1,51 @@
+from typing import Any
+
+from core.cache import invalidate_user
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import transaction
+
+from note.models import NoteModel
+from note.previews import ContentSummary
+
+
+class Command(BaseCommand):
+    """Derive the preview, character count and word count of existing notes from their content, in batches."""
+
+    help = "Derive the preview, character count and word count of existing notes from their content, in batches."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument("--batch-size", type=int, default=500, help="Notes per batch. Defaults to 500.")
+        parser.add_argument("--database", default="default", help="Database alias. Defaults to 'default'.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command.
+
+        The derived fields are written with `bulk_update`, which does not
+        touch `updated_at` or `version`, so clients do not see the notes as changed. The cached lists of the owners
+        are invalidated.
+        """
+        using = options["database"]
+        batch_size = options["batch_size"]
+        notes = NoteModel.objects.using(using).only("id", "content", "created_by_user_id").order_by("id")
+
+        updated = 0
+        last_id = None
+        while True:
+            batch = list((notes if last_id is None else notes.filter(id__gt=last_id))[:batch_size])
+            if not batch:
+                break
+
+            for note in batch:
+                note.update_summary()
+            with transaction.atomic(using=using):
+                NoteModel.objects.using(using).bulk_update(batch, ContentSummary._fields)
+                for user_id in {note.created_by_user_id for note in batch}:  # type: ignore
+                    invalidate_user(user_id, using=using)
+
+            updated += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Updated {updated} notes.")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} notes."))
@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+import random
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+from core.models import User
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.core.management.base import CommandParser
+from django.db import transaction
+from django.db.models import Q
+from django.test import AsyncClient
+from django.test import Client
+from django.test import override_settings
+from ninja_jwt.tokens import AccessToken
+
+from note import counters
+from note import search
+from note.models import NoteModel
+
+
+# 1000 made up words, picked with a zipf like distribution so there are common and rare terms
+WORDS = [
+    "".join(syllables)
+    for syllables in itertools.product(("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa"), repeat=3)
+]
+WORD_WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+# short enough to be stored uncompressed, so `icontains` matches the same text as the index, see core/fields.py
+WORDS_PER_NOTE = 40
+SEED_BATCH_SIZE = 5000
+# concurrent clients of the concurrency benchmark
+CONCURRENCY_LEVELS = (1, 10, 100)
+
+
+class Command(BaseCommand):
+    """Seed notes for a benchmark user and time the compared paths of the note api.
+
+    Benchmarks:
+        search: the full-text index against `icontains` on title and content, for a common, a rare and two terms.
+        lists: `GET /notes` with and without `limit`, with the list cache disabled and enabled.
+        concurrency: requests per second of `GET /notes/{id}` and `GET /notes?limit=50` through the ASGI handler,
+            for 1, 10 and 100 concurrent clients.
+    """
+
+    help = "Seed notes for a benchmark user and time the compared paths of the note api."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument("benchmark", choices=["search", "lists", "concurrency"], help="Paths to compare.")
+        parser.add_argument("--notes", type=int, default=10000, help="Notes of the benchmark user. Defaults to 10000.")
+        parser.add_argument("--repeat", type=int, default=50, help="Runs of every path, per client. Defaults to 50.")
+        parser.add_argument(
+            "--email",
+            default="benchmark@example.com",
+            help="Benchmark user, created if missing. Defaults to 'benchmark@example.com'.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command.
+
+        The notes are only added up to `--notes`, so the corpus of a previous run is reused.
+        """
+        if options["repeat"] < 2:  # noqa: PLR2004
+            raise CommandError("--repeat must be at least 2.")
+
+        user, _ = User.objects.get_or_create(email=options["email"])
+        self.seed(user, options["notes"])
+        getattr(self, f"benchmark_{options['benchmark']}")(user, options["repeat"])
+
+    def seed(self, user: User, count: int) -> None:
+        """Add random notes to the user until it has `count`, with their counters and index rows."""
+        rng = random.Random(count)
+        missing = count - NoteModel.objects.filter(created_by_user_id=user.id).count()
+        while missing > 0:
+            notes = [
+                NoteModel(
+                    title=" ".join(rng.choices(WORDS, WORD_WEIGHTS, k=3)),
+                    content=" ".join(rng.choices(WORDS, WORD_WEIGHTS, k=WORDS_PER_NOTE)),
+                    created_by_user=user,
+                    updated_by_user=user,
+                )
+                for _ in range(min(missing, SEED_BATCH_SIZE))
+            ]
+            for note in notes:
+                note.update_summary()
+
+            with transaction.atomic():
+                NoteModel.objects.bulk_create(notes)
+                deltas = counters.CounterDeltas()
+                for note in notes:
+                    deltas.add(counters.note_state(note), 1)
+                deltas.apply(user.id)
+                search.index_new_notes(notes)
+
+            missing -= len(notes)
+            self.stdout.write(f"Seeded {count - missing} notes.")
+
+    def measure(self, name: str, func: Callable[[], Any], repeat: int) -> None:
+        """Run `func` `repeat` times and write its median and 99th percentile duration."""
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append((time.perf_counter() - start) * 1000)
+
+        p99 = statistics.quantiles(durations, n=100, method="inclusive")[98]
+        self.stdout.write(f"{name}: p50 {statistics.median(durations):.2f} ms, p99 {p99:.2f} ms")
+
+    def benchmark_search(self, user: User, repeat: int) -> None:
+        """Time the first page of a search with the index and with `icontains`."""
+
+        def icontains(query: str) -> list[Any]:
+            notes = NoteModel.objects.filter(created_by_user_id=user.id)
+            for term in query.split():
+                notes = notes.filter(Q(title__icontains=term) | Q(content__icontains=term))
+            return list(notes.values_list("id", flat=True)[:20])
+
+        for label, query in (
+            ("common term", WORDS[0]),
+            ("rare term", WORDS[-1]),
+            ("two terms", f"{WORDS[1]} {WORDS[2]}"),
+        ):
+            self.measure(f"index {label}", lambda query=query: search.search_note_ids(user.id, query, limit=20), repeat)
+            self.measure(f"icontains {label}", lambda query=query: icontains(query), repeat)
+
+    def api_get(self, client: Client, path: str) -> None:
+        """GET an api path through the whole request handling, like a client would."""
+        response = client.get(path)
+        if response.status_code != 200:  # noqa: PLR2004
+            raise CommandError(f"GET {path}: {response.status_code} {response.content[:200]!r}")
+
+    def benchmark_lists(self, user: User, repeat: int) -> None:
+        """Time the note lists uncached and from the list cache, see core/cache.py."""
+        client = Client(headers={"Authorization": f"Bearer {AccessToken.for_user(user)}"})
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for path in ("/api/notes", "/api/notes?limit=50"):
+                for enabled in (False, True):
+                    with override_settings(LIST_CACHE_ENABLED=enabled):
+                        self.api_get(client, path)
+                        label = "cached" if enabled else "uncached"
+                        self.measure(f"{label} GET {path}", lambda path=path: self.api_get(client, path), repeat)
+
+    def benchmark_concurrency(self, user: User, repeat: int) -> None:
+        """Time the note detail and a list page with concurrent clients on the async controllers."""
+        note_id = NoteModel.objects.filter(created_by_user_id=user.id).values_list("id", flat=True).first()
+        # headers given to the AsyncClient itself are dropped by Django 4.2.8, so every request passes them
+        client = AsyncClient()
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+        async def api_get(path: str) -> float:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            if response.status_code != 200:  # noqa: PLR2004
+                raise CommandError(f"GET {path}: {response.status_code} {response.content[:200]!r}")
+            return (time.perf_counter() - start) * 1000
+
+        async def run_client(path: str) -> list[float]:
+            return [await api_get(path) for _ in range(repeat)]
+
+        async def run(path: str, concurrency: int) -> tuple[list[float], float]:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(run_client(path) for _ in range(concurrency)))
+            return [duration for durations in results for duration in durations], time.perf_counter() - start
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for path in (f"/api/notes/{note_id}", "/api/notes?limit=50"):
+                asyncio.run(run(path, 1))
+                for concurrency in CONCURRENCY_LEVELS:
+                    durations, elapsed = asyncio.run(run(path, concurrency))
+                    p99 = statistics.quantiles(durations, n=100, method="inclusive")[98]
+                    self.stdout.write(
+                        f"{concurrency} clients GET {path}: {len(durations) / elapsed:.1f} req/s, "
+                        f"p50 {statistics.median(durations):.2f} ms, p99 {p99:.2f} ms",
+                    )
@@ -0,0 +1,29 @@
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+from django.utils import timezone
+
+from note.revisions import compact_revisions
+
+
+class Command(BaseCommand):
+    """Delete old delta revisions of notes, the periodic snapshots are kept."""
+
+    help = "Delete old delta revisions of notes, the periodic snapshots are kept."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Keep every revision of the last days. Defaults to 30.",
+        )
+        parser.add_argument("--database", default="default", help="Database alias. Defaults to 'default'.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command."""
+        count = compact_revisions(timezone.now() - timedelta(days=options["days"]), using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} revisions."))
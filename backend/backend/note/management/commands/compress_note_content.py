@@ -0,0 +1,46 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import transaction
+
+from note.models import NoteModel
+
+
+class Command(BaseCommand):
+    """Store the content of existing notes again with the current codec and threshold of the field, in batches."""
+
+    help = "Store the content of existing notes again with the current codec and threshold of the field, in batches."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument("--batch-size", type=int, default=500, help="Notes per batch. Defaults to 500.")
+        parser.add_argument("--database", default="default", help="Database alias. Defaults to 'default'.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command.
+
+        Rows are compressed when they are written, so a change of the codec or threshold of `NoteModel.content`
+        only applies to new writes. The content is read and written back through the field with `bulk_update`,
+        which does not touch `updated_at` or `version`. The existing content was converted by migration
+        0005_compress_content.
+        """
+        using = options["database"]
+        batch_size = options["batch_size"]
+        notes = NoteModel.objects.using(using).only("id", "content").order_by("id")
+
+        updated = 0
+        last_id = None
+        while True:
+            batch = list((notes if last_id is None else notes.filter(id__gt=last_id))[:batch_size])
+            if not batch:
+                break
+
+            with transaction.atomic(using=using):
+                NoteModel.objects.using(using).bulk_update(batch, ["content"])
+
+            updated += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Updated {updated} notes.")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} notes."))
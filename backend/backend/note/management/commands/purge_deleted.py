@@ -0,0 +1,46 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from note.retention import purge_deleted
+from note.retention import purge_horizon
+
+
+class Command(BaseCommand):
+    """Purge the tombstones of the notes and note books deleted longer ago than the retention period, in batches."""
+
+    help = "Purge the tombstones of the notes and note books deleted longer ago than the retention period, in batches."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Purge rows deleted before the last days. Defaults to RETENTION_DELETED_DAYS.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows per batch. Defaults to RETENTION_BATCH_SIZE.",
+        )
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches per model.")
+        parser.add_argument("--database", default="default", help="Database alias. Defaults to 'default'.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command."""
+        results = purge_deleted(
+            before=purge_horizon(options["days"]),
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            using=options["database"],
+        )
+        for result in results:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Purged {result.purged} {result.label} rows in {result.seconds:.2f}s "
+                    f"({result.rate:.0f} rows/s), {result.remaining} remaining.",
+                ),
+            )
@@ -0,0 +1,21 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from note.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Rebuild the full text search index of notes."""
+
+    help = "Rebuild the full text search index of notes."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument("--database", default="default", help="Database alias. Defaults to 'default'.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command."""
+        count = rebuild_search_index(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} notes."))
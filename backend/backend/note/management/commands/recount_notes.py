@@ -0,0 +1,22 @@
+from typing import Any
+from uuid import UUID
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from note.counters import recount_notes
+
+
+class Command(BaseCommand):
+    """Recompute the note counters from the notes."""
+
+    help = "Recompute the note counters from the notes."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments."""
+        parser.add_argument("--user", type=UUID, default=None, help="Only repair the counters of this user id.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ARG002
+        """Run the command."""
+        count = recount_notes(user_id=options["user"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} note counters."))
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("note", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notebookmodel",
+            index=models.Index(fields=["created_by_user", "updated_at"], name="note_notebo_created_e39b40_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notemodel",
+            index=models.Index(fields=["created_by_user", "updated_at"], name="note_notemo_created_e3b9d0_idx"),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def count_notes(apps, schema_editor):
+    """Fill the counters of the existing notes, the ones not soft deleted, like the `recount_notes` command."""
+    NoteModel = apps.get_model("note", "NoteModel")
+    NoteCounterModel = apps.get_model("note", "NoteCounterModel")
+    using = schema_editor.connection.alias
+
+    rows = (
+        NoteModel.objects.using(using)
+        .filter(created_by_user__isnull=False, is_delete=False)
+        .order_by()
+        .values("created_by_user_id", "note_book_id")
+        .annotate(
+            count=Count("id"),
+            archived_count=Count("id", filter=Q(is_archived=True, is_trash=False)),
+            trash_count=Count("id", filter=Q(is_trash=True, is_archived=False)),
+        )
+    )
+    NoteCounterModel.objects.using(using).bulk_create(
+        NoteCounterModel(
+            user_id=row["created_by_user_id"],
+            note_book_id=row["note_book_id"],
+            count=row["count"],
+            archived_count=row["archived_count"],
+            trash_count=row["trash_count"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("note", "0002_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NoteCounterModel",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("count", models.IntegerField(default=0)),
+                ("archived_count", models.IntegerField(default=0)),
+                ("trash_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "note_book",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="counters",
+                        to="note.notebookmodel",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="note_counters",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Note Counter",
+                "verbose_name_plural": "Note Counters",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="notecountermodel",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("note_book__isnull", False)),
+                fields=("user", "note_book"),
+                name="note_counter_unique_note_book",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="notecountermodel",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("note_book__isnull", True)), fields=("user",), name="note_counter_unique_not_in_any"
+            ),
+        ),
+        migrations.RunPython(count_notes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("note", "0003_note_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notebookmodel",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notemodel",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
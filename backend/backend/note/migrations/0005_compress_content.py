@@ -0,0 +1,70 @@
+import core.fields
+from django.db import migrations
+from django.db import models
+
+
+BATCH_SIZE = 500
+
+
+def _copy_content(apps, schema_editor, source, target):
+    """Copy the content between the text and the compressed column in batches, the fields convert the value."""
+    NoteModel = apps.get_model("note", "NoteModel")
+    notes = NoteModel.objects.using(schema_editor.connection.alias).only("id", source).order_by("id")
+
+    batch = []
+    for note in notes.iterator(chunk_size=BATCH_SIZE):
+        setattr(note, target, getattr(note, source))
+        batch.append(note)
+        if len(batch) == BATCH_SIZE:
+            NoteModel.objects.using(schema_editor.connection.alias).bulk_update(batch, [target])
+            batch = []
+    if batch:
+        NoteModel.objects.using(schema_editor.connection.alias).bulk_update(batch, [target])
+
+
+def compress_content(apps, schema_editor):
+    _copy_content(apps, schema_editor, "content", "compressed_content")
+
+
+def decompress_content(apps, schema_editor):
+    _copy_content(apps, schema_editor, "compressed_content", "content")
+
+
+class Migration(migrations.Migration):
+    """Store the note content compressed, see `CompressedTextField`.
+
+    The binary column is added next to the text column and filled in Python, so every row gets the header byte
+    and text is never cast to binary by the database. Then the text column is dropped and the new one renamed.
+    """
+
+    dependencies = [
+        ("note", "0004_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notemodel",
+            name="compressed_content",
+            field=core.fields.CompressedTextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="notemodel",
+            name="content",
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(compress_content, decompress_content),
+        migrations.RemoveField(
+            model_name="notemodel",
+            name="content",
+        ),
+        migrations.RenameField(
+            model_name="notemodel",
+            old_name="compressed_content",
+            new_name="content",
+        ),
+        migrations.AlterField(
+            model_name="notemodel",
+            name="content",
+            field=core.fields.CompressedTextField(),
+        ),
+    ]
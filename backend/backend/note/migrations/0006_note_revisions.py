@@ -0,0 +1,61 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:22
+
+import core.fields
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("note", "0005_compress_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NoteRevisionModel",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("number", models.PositiveIntegerField()),
+                ("version", models.PositiveIntegerField()),
+                ("title", models.CharField(max_length=255)),
+                ("is_snapshot", models.BooleanField(default=False)),
+                ("data", core.fields.CompressedTextField()),
+                ("updated_at", models.DateTimeField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "note",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="revisions", to="note.notemodel"
+                    ),
+                ),
+                (
+                    "updated_by_user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Note Revision",
+                "verbose_name_plural": "Note Revisions",
+                "ordering": ["-number"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="noterevisionmodel",
+            constraint=models.UniqueConstraint(fields=("note", "number"), name="note_revision_unique_number"),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+from note.previews import summarize
+
+
+BATCH_SIZE = 500
+
+
+def summarize_content(apps, schema_editor):
+    """Derive the preview and counts of the existing notes in batches, like `NoteModel.update_summary`."""
+    NoteModel = apps.get_model("note", "NoteModel")
+    notes = NoteModel.objects.using(schema_editor.connection.alias).only("id", "content").order_by("id")
+
+    batch = []
+    for note in notes.iterator(chunk_size=BATCH_SIZE):
+        note.preview, note.char_count, note.word_count = summarize(note.content)
+        batch.append(note)
+        if len(batch) == BATCH_SIZE:
+            NoteModel.objects.using(schema_editor.connection.alias).bulk_update(
+                batch, ["preview", "char_count", "word_count"]
+            )
+            batch = []
+    if batch:
+        NoteModel.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ["preview", "char_count", "word_count"]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("note", "0006_note_revisions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notemodel",
+            name="char_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="notemodel",
+            name="preview",
+            field=models.CharField(blank=True, default="", editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name="notemodel",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(summarize_content, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,207 @@
+import json
+from itertools import islice
+
+import core.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.core import serializers
+from django.db import migrations
+from django.db import models
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+SOFT_DELETE_FIELDS = ("id", "is_delete", "deleted_at", "deleted_by_user")
+
+
+def _recount_notes(apps, using):
+    """Rebuild the note counters from the live notes, the ones not soft deleted, see note/counters.py."""
+    NoteModel = apps.get_model("note", "NoteModel")
+    NoteCounterModel = apps.get_model("note", "NoteCounterModel")
+
+    rows = (
+        NoteModel.objects.using(using)
+        .filter(created_by_user__isnull=False, is_delete=False)
+        .order_by()
+        .values("created_by_user_id", "note_book_id")
+        .annotate(
+            count=Count("id"),
+            archived_count=Count("id", filter=Q(is_archived=True, is_trash=False)),
+            trash_count=Count("id", filter=Q(is_trash=True, is_archived=False)),
+        )
+    )
+    NoteCounterModel.objects.using(using).all().delete()
+    NoteCounterModel.objects.using(using).bulk_create(
+        NoteCounterModel(
+            user_id=row["created_by_user_id"],
+            note_book_id=row["note_book_id"],
+            count=row["count"],
+            archived_count=row["archived_count"],
+            trash_count=row["trash_count"],
+        )
+        for row in rows
+    )
+
+
+def bury_soft_deleted(apps, schema_editor):
+    """Move the soft deleted notes and note books to tombstones, as `delete` does from now on, see note/tombstones.py.
+
+    The live notes of a deleted note book are moved to "not in any note book" first. The tombstone keeps the
+    row serialized without the soft delete fields, so it can still be restored.
+    """
+    using = schema_editor.connection.alias
+    NoteBookModel = apps.get_model("note", "NoteBookModel")
+    NoteModel = apps.get_model("note", "NoteModel")
+    TombstoneModel = apps.get_model("note", "TombstoneModel")
+
+    NoteModel.objects.using(using).filter(
+        is_delete=False,
+        note_book__in=NoteBookModel.objects.using(using).filter(is_delete=True).values("pk"),
+    ).update(note_book=None, updated_at=timezone.now(), version=F("version") + 1)
+
+    for model, label in ((NoteModel, "note.NoteModel"), (NoteBookModel, "note.NoteBookModel")):
+        fields = [field.name for field in model._meta.concrete_fields if field.name not in SOFT_DELETE_FIELDS]
+        deleted = model.objects.using(using).filter(is_delete=True)
+        objs = deleted.order_by("pk").iterator(chunk_size=BATCH_SIZE)
+        while batch := list(islice(objs, BATCH_SIZE)):
+            TombstoneModel.objects.using(using).bulk_create(
+                TombstoneModel(
+                    id=obj.pk,
+                    model=label,
+                    user_id=obj.created_by_user_id,
+                    deleted_at=obj.deleted_at or obj.updated_at,
+                    deleted_by_user_id=obj.deleted_by_user_id,
+                    data=serializers.serialize("json", [obj], fields=fields),
+                )
+                for obj in batch
+            )
+        deleted.delete()
+
+    _recount_notes(apps, using)
+
+
+def unbury(apps, schema_editor):
+    """Move the tombstones back to soft deleted rows, note books first for the foreign keys of the notes."""
+    using = schema_editor.connection.alias
+    NoteBookModel = apps.get_model("note", "NoteBookModel")
+    NoteModel = apps.get_model("note", "NoteModel")
+    TombstoneModel = apps.get_model("note", "TombstoneModel")
+
+    for model, label in ((NoteBookModel, "note.NoteBookModel"), (NoteModel, "note.NoteModel")):
+        tombstones = (
+            TombstoneModel.objects.using(using).filter(model=label).order_by("pk").iterator(chunk_size=BATCH_SIZE)
+        )
+        while batch := list(islice(tombstones, BATCH_SIZE)):
+            objs = []
+            for tombstone in batch:
+                fields = json.loads(tombstone.data)[0]["fields"]
+                obj = model(
+                    pk=tombstone.pk,
+                    is_delete=True,
+                    deleted_at=tombstone.deleted_at,
+                    deleted_by_user_id=tombstone.deleted_by_user_id,
+                    **{model._meta.get_field(name).attname: value for name, value in fields.items()},
+                )
+                objs.append(obj)
+            if model is NoteModel:
+                note_book_ids = {obj.note_book_id for obj in objs} - {None}
+                existing = set(
+                    map(
+                        str,
+                        NoteBookModel.objects.using(using).filter(pk__in=note_book_ids).values_list("pk", flat=True),
+                    )
+                )
+                for obj in objs:
+                    if obj.note_book_id is not None and str(obj.note_book_id) not in existing:
+                        obj.note_book_id = None
+            model.objects.using(using).bulk_create(objs)
+
+    _recount_notes(apps, using)
+
+
+class Migration(migrations.Migration):
+    """Keep deleted notes and note books as tombstones instead of soft deleted rows."""
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("note", "0007_note_summary"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="noterevisionmodel",
+            name="note",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="revisions",
+                to="note.notemodel",
+            ),
+        ),
+        migrations.CreateModel(
+            name="TombstoneModel",
+            fields=[
+                ("id", models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ("model", models.CharField(max_length=100)),
+                ("deleted_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("data", core.fields.CompressedTextField()),
+                (
+                    "deleted_by_user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tombstone",
+                "verbose_name_plural": "Tombstones",
+                "indexes": [
+                    models.Index(fields=["user", "model", "deleted_at"], name="note_tombst_user_id_31d251_idx"),
+                    models.Index(fields=["deleted_at"], name="note_tombst_deleted_65176a_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(bury_soft_deleted, unbury),
+        migrations.RemoveField(
+            model_name="notebookmodel",
+            name="deleted_at",
+        ),
+        migrations.RemoveField(
+            model_name="notebookmodel",
+            name="deleted_by_user",
+        ),
+        migrations.RemoveField(
+            model_name="notebookmodel",
+            name="is_delete",
+        ),
+        migrations.RemoveField(
+            model_name="notemodel",
+            name="deleted_at",
+        ),
+        migrations.RemoveField(
+            model_name="notemodel",
+            name="deleted_by_user",
+        ),
+        migrations.RemoveField(
+            model_name="notemodel",
+            name="is_delete",
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("note", "0008_tombstones"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="notebookmodel",
+            name="note_notebo_id_745055_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="notemodel",
+            name="note_notemo_id_e8de50_idx",
+        ),
+        migrations.AddIndex(
+            model_name="notebookmodel",
+            index=models.Index(fields=["created_by_user", "-created_at"], include=("title",), name="notebook_list_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notebookmodel",
+            index=models.Index(fields=["created_by_user", "title"], name="notebook_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notemodel",
+            index=models.Index(
+                fields=["created_by_user", "-created_at", "-id"],
+                include=(
+                    "title",
+                    "preview",
+                    "char_count",
+                    "word_count",
+                    "is_archived",
+                    "is_trash",
+                    "note_book",
+                    "other_user_permission",
+                ),
+                name="note_list_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notemodel",
+            index=models.Index(
+                fields=["created_by_user", "note_book", "-created_at", "-id"],
+                include=(
+                    "title",
+                    "preview",
+                    "char_count",
+                    "word_count",
+                    "is_archived",
+                    "is_trash",
+                    "other_user_permission",
+                ),
+                name="note_book_list_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notemodel",
+            index=models.Index(
+                condition=models.Q(("is_archived", True)),
+                fields=["created_by_user", "-created_at", "-id"],
+                include=(
+                    "title",
+                    "preview",
+                    "char_count",
+                    "word_count",
+                    "is_archived",
+                    "is_trash",
+                    "note_book",
+                    "other_user_permission",
+                ),
+                name="note_archive_list_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notemodel",
+            index=models.Index(
+                condition=models.Q(("is_trash", True)),
+                fields=["created_by_user", "-created_at", "-id"],
+                include=(
+                    "title",
+                    "preview",
+                    "char_count",
+                    "word_count",
+                    "is_archived",
+                    "is_trash",
+                    "note_book",
+                    "other_user_permission",
+                ),
+                name="note_trash_list_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notemodel",
+            index=models.Index(
+                fields=["created_by_user", "title", "id"],
+                include=("note_book", "is_archived", "is_trash"),
+                name="note_workspace_idx",
+            ),
+        ),
+    ]
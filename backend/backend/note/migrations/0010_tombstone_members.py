@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 03:23
+
+import core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("note", "0009_note_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tombstonemodel",
+            name="members",
+            field=core.fields.CompressedTextField(blank=True, default=""),
+        ),
+    ]
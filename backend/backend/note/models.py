@@ -1,7 +1,22 @@
+import uuid
+from typing import Any
 from typing import ClassVar
 
+from core.fields import CompressedTextField
 from core.models import BaseModel
+from core.models import User
+from django.contrib.auth.models import AbstractBaseUser
 from django.db import models
+from django.db import router
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters
+from . import previews
+from . import revisions
+from . import search
+from . import tombstones
 
 
 # Create your models here.
@@ -22,8 +37,14 @@ class NoteBookModel(BaseModel):
         verbose_name: ClassVar = "Note Book"
         verbose_name_plural: ClassVar = "Note Books"
         ordering: ClassVar = ["-created_at"]
+        # one index per query shape of note/apis.py, checked by note/tests.py
         indexes: ClassVar = [
-            models.Index(fields=["id"]),
+            # list, in Meta ordering
+            models.Index(fields=["created_by_user", "-created_at"], include=["title"], name="notebook_list_idx"),
+            # workspace, by title
+            models.Index(fields=["created_by_user", "title"], name="notebook_title_idx"),
+            # sync and list validators
+            models.Index(fields=["created_by_user", "updated_at"]),
         ]
 
     def __str__(self) -> str:
@@ -34,6 +55,34 @@ class NoteBookModel(BaseModel):
         """
         return self.title
 
+    def delete(self, user: AbstractBaseUser, *, trash_notes: bool = False) -> None:
+        """Move the note book to the tombstone table, its notes to "not in any note book", see note/tombstones.py.
+
+        Args:
+            user (AbstractBaseUser): The user who is initiating the deletion.
+            trash_notes (bool, optional): also move the notes to the trash. Defaults to False.
+        """
+        using = router.db_for_write(type(self), instance=self)
+        tombstones.bury_note_books(
+            NoteBookModel.objects.using(using).filter(pk=self.pk),
+            user,
+            trash_notes=trash_notes,
+            using=using,
+        )
+
+
+# fields of the note list besides the index keys, the default `fields` of `NoteController.get_all`
+NOTE_LIST_FIELDS = [
+    "title",
+    "preview",
+    "char_count",
+    "word_count",
+    "is_archived",
+    "is_trash",
+    "note_book",
+    "other_user_permission",
+]
+
 
 class NoteModel(BaseModel):
     """Note model.
@@ -41,12 +90,18 @@ class NoteModel(BaseModel):
     Attributes:
         title (str): note title.
         content (str): note content.
+        preview (str): start of the content, derived from it on save, see note/previews.py.
+        char_count (int): number of characters of the content, derived from it on save.
+        word_count (int): number of words of the content, derived from it on save.
         is_archived (bool): is archived.
         is_pinned (bool): is pinned.
     """
 
     title = models.CharField(max_length=255)
-    content = models.TextField()
+    content = CompressedTextField()
+    preview = models.CharField(max_length=previews.PREVIEW_LENGTH, blank=True, default="", editable=False)
+    char_count = models.PositiveIntegerField(default=0, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     is_archived = models.BooleanField(default=False)
     is_trash = models.BooleanField(default=False)
 
@@ -70,8 +125,42 @@ class NoteModel(BaseModel):
         verbose_name: ClassVar = "Note"
         verbose_name_plural: ClassVar = "Notes"
         ordering: ClassVar = ["-created_at"]
+        # one index per query shape of note/apis.py, checked by note/tests.py. the list indexes follow the
+        # keyset ordering and include the list fields, so lists are read from the index alone on postgres
         indexes: ClassVar = [
-            models.Index(fields=["id"]),
+            # list of all notes
+            models.Index(
+                fields=["created_by_user", "-created_at", "-id"],
+                include=NOTE_LIST_FIELDS,
+                name="note_list_idx",
+            ),
+            # list of a note book, or of the notes not in any note book. note_book is a key column already
+            models.Index(
+                fields=["created_by_user", "note_book", "-created_at", "-id"],
+                include=[field for field in NOTE_LIST_FIELDS if field != "note_book"],
+                name="note_book_list_idx",
+            ),
+            # archive and trash lists, a small part of the notes
+            models.Index(
+                fields=["created_by_user", "-created_at", "-id"],
+                include=NOTE_LIST_FIELDS,
+                condition=Q(is_archived=True),
+                name="note_archive_list_idx",
+            ),
+            models.Index(
+                fields=["created_by_user", "-created_at", "-id"],
+                include=NOTE_LIST_FIELDS,
+                condition=Q(is_trash=True),
+                name="note_trash_list_idx",
+            ),
+            # workspace, by title
+            models.Index(
+                fields=["created_by_user", "title", "id"],
+                include=["note_book", "is_archived", "is_trash"],
+                name="note_workspace_idx",
+            ),
+            # sync and list validators
+            models.Index(fields=["created_by_user", "updated_at"]),
         ]
 
     def __str__(self) -> str:
@@ -81,3 +170,217 @@ class NoteModel(BaseModel):
             str: string representation.
         """
         return self.title
+
+    def save(self, user: AbstractBaseUser, *args: list[Any], **kwargs: dict[Any, Any]):
+        """Save the note, update the note counters and refresh its full text search index row.
+
+        Nothing is written if no field changed, the index row only if the title or content did.
+        A change of the title or content records the previous state as a revision, see note/revisions.py.
+        A change of the content also updates the preview and counts derived from it.
+        """
+        dirty_fields = self.get_dirty_fields()
+        if dirty_fields == [] and "update_fields" not in kwargs:
+            return
+
+        if "update_fields" in kwargs:
+            if "content" in kwargs["update_fields"]:
+                self.update_summary()
+                kwargs["update_fields"] = [*kwargs["update_fields"], *previews.ContentSummary._fields]  # type: ignore
+        elif dirty_fields is None or "content" in dirty_fields:
+            self.update_summary()
+
+        loaded_values = getattr(self, "_loaded_values", {})
+        using = router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            if all(field in loaded_values for field in counters.COUNTED_FIELDS):
+                old_state = counters.NoteState(*(loaded_values[field] for field in counters.COUNTED_FIELDS))
+            elif not self._state.adding:
+                old_state = (
+                    NoteModel.objects.using(using).filter(pk=self.pk).values_list(*counters.COUNTED_FIELDS).first()
+                )
+                old_state = counters.NoteState(*old_state) if old_state is not None else None
+            else:
+                old_state = None
+
+            previous = None
+            if not self._state.adding and (dirty_fields is None or {"title", "content"} & set(dirty_fields)):
+                previous = self._get_previous_revision_state(loaded_values, using)
+
+            super().save(user, *args, **kwargs)
+            self._update_counters(old_state, using)
+            if previous is not None and (previous["title"], previous["content"]) != (self.title, self.content):
+                revisions.record_revision(self.id, self.content, previous, using=using)
+            if dirty_fields is None or {"title", "content"} & set(dirty_fields):
+                search.index_note(self, using=using)
+
+    def create(self, user: AbstractBaseUser, *args: list[Any], **kwargs: dict[Any, Any]):
+        """Create the note, update the note counters and add it to the full text search index."""
+        self.update_summary()
+        using = router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().create(user, *args, **kwargs)
+            self._update_counters(None, using)
+            search.index_note(self, using=using)
+
+    def delete(self, user: AbstractBaseUser) -> None:
+        """Move the note to the tombstone table, update the note counters and remove its search index row."""
+        using = router.db_for_write(type(self), instance=self)
+        tombstones.bury_notes(NoteModel.objects.using(using).filter(pk=self.pk), user, using=using)
+
+    def update_summary(self) -> None:
+        """Derive `preview`, `char_count` and `word_count` from the content.
+
+        Called by `save` and `create`, must be called before inserting notes with `bulk_create`.
+        """
+        self.preview, self.char_count, self.word_count = previews.summarize(self.content)
+
+    def _get_previous_revision_state(self, loaded_values: dict[str, Any], using: str) -> dict[str, Any] | None:
+        fields = ("title", "content", "version", "updated_at", "updated_by_user_id")
+        if all(field in loaded_values for field in fields):
+            return {field: loaded_values[field] for field in fields}
+        return NoteModel.objects.using(using).filter(pk=self.pk).values(*fields).first()
+
+    def _update_counters(self, old_state: counters.NoteState | None, using: str) -> None:
+        deltas = counters.CounterDeltas()
+        deltas.move(old_state, counters.note_state(self))
+        deltas.apply(self.created_by_user_id, using=using)  # type: ignore
+
+
+class NoteCounterModel(models.Model):
+    """Note counters of a user's note book, see note/counters.py.
+
+    Attributes:
+        user (User): owner of the notes.
+        note_book (NoteBookModel | None): note book, None for the notes not in any note book.
+        count (int): live notes.
+        archived_count (int): archived, not trashed, live notes.
+        trash_count (int): trashed, not archived, live notes.
+        updated_at (datetime): last change of the counters.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="note_counters")
+    note_book = models.ForeignKey(
+        NoteBookModel,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="counters",
+    )
+    count = models.IntegerField(default=0)
+    archived_count = models.IntegerField(default=0)
+    trash_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta class."""
+
+        verbose_name: ClassVar = "Note Counter"
+        verbose_name_plural: ClassVar = "Note Counters"
+        constraints: ClassVar = [
+            models.UniqueConstraint(
+                fields=["user", "note_book"],
+                condition=Q(note_book__isnull=False),
+                name="note_counter_unique_note_book",
+            ),
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=Q(note_book__isnull=True),
+                name="note_counter_unique_not_in_any",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """String representation.
+
+        Returns:
+            str: string representation.
+        """
+        return f"{self.user_id} {self.note_book_id}: {self.count}"  # type: ignore
+
+
+class NoteRevisionModel(models.Model):
+    """Previous state of a note, see note/revisions.py.
+
+    Attributes:
+        id (UUID): revision id.
+        note (NoteModel): revised note.
+        number (int): revision number, 0 for the first revision of the note.
+        version (int): version of the note this revision was.
+        title (str): title of the note.
+        is_snapshot (bool): `data` is the full content, otherwise a reverse delta.
+        data (str): full content or json edit script to the content from the next revision.
+        updated_at (datetime): when this version of the note was written.
+        updated_by_user (User | None): who wrote this version of the note.
+        created_at (datetime): when the revision was recorded.
+    """
+
+    id = models.UUIDField(primary_key=True, unique=True, default=uuid.uuid4, editable=False)
+    # kept while the note is in the tombstone table, deleted when the tombstone is purged
+    note = models.ForeignKey(NoteModel, on_delete=models.DO_NOTHING, db_constraint=False, related_name="revisions")
+    number = models.PositiveIntegerField()
+    version = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    is_snapshot = models.BooleanField(default=False)
+    data = CompressedTextField()
+    updated_at = models.DateTimeField()
+    updated_by_user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Meta class."""
+
+        verbose_name: ClassVar = "Note Revision"
+        verbose_name_plural: ClassVar = "Note Revisions"
+        ordering: ClassVar = ["-number"]
+        constraints: ClassVar = [
+            models.UniqueConstraint(fields=["note", "number"], name="note_revision_unique_number"),
+        ]
+
+    def __str__(self) -> str:
+        """String representation.
+
+        Returns:
+            str: string representation.
+        """
+        return f"{self.note_id} #{self.number}"  # type: ignore
+
+
+class TombstoneModel(models.Model):
+    """Deleted note or note book, moved out of its table, see note/tombstones.py.
+
+    Attributes:
+        id (UUID): id of the deleted object.
+        model (str): label of the model of the deleted object, e.g. "note.NoteModel".
+        user (User | None): owner of the deleted object.
+        deleted_at (datetime): when the object was deleted.
+        deleted_by_user (User | None): who deleted the object.
+        data (str): the deleted row serialized as json, to restore it.
+        members (str): for a note book, json of the ids of its notes at the delete, `{"notes": [...], "trashed": [...]}`,
+            to put them back in the note book on restore.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    model = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True, related_name="+")
+    deleted_at = models.DateTimeField(default=timezone.now)
+    deleted_by_user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True, related_name="+")
+    data = CompressedTextField()
+    members = CompressedTextField(blank=True, default="")
+
+    class Meta:
+        """Meta class."""
+
+        verbose_name: ClassVar = "Tombstone"
+        verbose_name_plural: ClassVar = "Tombstones"
+        indexes: ClassVar = [
+            models.Index(fields=["user", "model", "deleted_at"]),
+            models.Index(fields=["deleted_at"]),
+        ]
+
+    def __str__(self) -> str:
+        """String representation.
+
+        Returns:
+            str: string representation.
+        """
+        return f"{self.model} {self.id}"
@@ -0,0 +1,63 @@
+"""Denormalized summary of note content.
+
+`NoteModel` stores a short preview and the character and word counts of its content, so lists never load
+note bodies. They are derived whenever the content is written, see `NoteModel.save`. Existing notes were
+backfilled by migration 0007_note_summary, the `backfill_note_previews` command derives them again, e.g.
+after a change of `PREVIEW_LENGTH`. Search results carry a snippet of the content around the first match
+instead of the preview, see `snippet`.
+"""
+from typing import NamedTuple
+
+
+PREVIEW_LENGTH = 200
+# characters of content kept before the first match of a snippet
+SNIPPET_CONTEXT = 40
+
+
+class ContentSummary(NamedTuple):
+    """Derived fields of note content."""
+
+    preview: str
+    char_count: int
+    word_count: int
+
+
+def summarize(content: str) -> ContentSummary:
+    """Derive the preview and counts of note content.
+
+    The preview is the start of the content with runs of whitespace, line breaks included, collapsed to one space.
+
+    Args:
+        content (str): note content.
+
+    Returns:
+        ContentSummary: preview, number of characters and number of whitespace separated words.
+    """
+    words = content.split()
+    preview = ""
+    for word in words:
+        preview = f"{preview} {word}" if preview else word
+        if len(preview) >= PREVIEW_LENGTH:
+            break
+    return ContentSummary(preview[:PREVIEW_LENGTH], len(content), len(words))
+
+
+def snippet(content: str, query: str) -> str:
+    """Cut the content around the first term of a search query found in it.
+
+    The snippet starts at the word boundary up to `SNIPPET_CONTEXT` characters before the match, and is
+    formatted like the preview. Without match in the content, e.g. when only the title matched, it is the preview.
+
+    Args:
+        content (str): note content.
+        query (str): search terms.
+
+    Returns:
+        str: snippet, starting with an ellipsis if the content before it is cut.
+    """
+    lowered = content.lower()
+    positions = [position for term in query.split() if (position := lowered.find(term.lower())) >= 0]
+    boundary = max(min(positions, default=0) - SNIPPET_CONTEXT, 0)
+    start = boundary and max(content.rfind(" ", 0, boundary), content.rfind("\n", 0, boundary)) + 1
+    preview = summarize(content[start:]).preview
+    return f"…{preview}" if start else preview
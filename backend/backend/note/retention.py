@@ -0,0 +1,147 @@
+"""Retention of deleted notes and note books.
+
+Deleted rows are kept as tombstones, see note/tombstones.py, so sync can send the deleted ids to the other
+clients of the user and the rows can be restored. Once a row has been deleted for `RETENTION_DELETED_DAYS`,
+its tombstone is purged, in batches of `RETENTION_BATCH_SIZE` rows with one short transaction per batch.
+A sync token older than that horizon may have missed purged deletes, so such a sync starts over, see
+`SyncController.sync`.
+
+Purging runs with the `purge_deleted` command, or every `RETENTION_PURGE_INTERVAL` seconds in the
+server process, see core/tasks.py.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from uuid import UUID
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.db import transaction
+from django.utils import timezone
+
+from . import tombstones
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PurgeResult:
+    """Result of purging the deleted rows of one model.
+
+    Attributes:
+        label (str): model label.
+        purged (int): number of hard deleted rows.
+        remaining (int): number of deleted rows older than the horizon still in the table.
+        seconds (float): time spent.
+    """
+
+    label: str
+    purged: int
+    remaining: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Purged rows per second."""
+        return self.purged / self.seconds if self.seconds else 0.0
+
+
+def purge_horizon(days: int | None = None) -> datetime:
+    """Get the time before which deleted rows are purged.
+
+    Args:
+        days (int | None, optional): retention in days. Defaults to None, `RETENTION_DELETED_DAYS`.
+
+    Returns:
+        datetime: purge horizon.
+    """
+    return timezone.now() - timedelta(days=settings.RETENTION_DELETED_DAYS if days is None else days)
+
+
+def _purge_tombstones(model: Any, ids: list[UUID], using: str) -> None:
+    from .models import NoteModel
+    from .models import NoteRevisionModel
+    from .models import TombstoneModel
+
+    if model is NoteModel:
+        NoteRevisionModel.objects.using(using).filter(note_id__in=ids).delete()
+    TombstoneModel.objects.using(using).filter(id__in=ids).delete()
+
+
+def purge_deleted(
+    before: datetime | None = None,
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+    using: str = "default",
+) -> list[PurgeResult]:
+    """Purge the tombstones of the notes and note books deleted before the horizon, and the revisions of the notes.
+
+    Every batch is purged in its own transaction, so locks are held briefly and an interrupted purge
+    keeps the batches already done.
+
+    Args:
+        before (datetime | None, optional): purge horizon. Defaults to None, `purge_horizon()`.
+        batch_size (int | None, optional): rows per batch. Defaults to None, `RETENTION_BATCH_SIZE`.
+        max_batches (int | None, optional): max batches per model. Defaults to None, no limit.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        list[PurgeResult]: result of the notes and of the note books.
+    """
+    from .models import NoteBookModel
+    from .models import NoteModel
+    from .models import TombstoneModel
+
+    before = before or purge_horizon()
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+
+    results = []
+    for model in (NoteModel, NoteBookModel):
+        expired = TombstoneModel.objects.using(using).filter(model=model.model_label, deleted_at__lt=before)
+        start = time.monotonic()
+        purged = batches = 0
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic(using=using):
+                ids = list(expired.order_by("id").values_list("id", flat=True)[:batch_size])
+                if not ids:
+                    break
+                _purge_tombstones(model, ids, using)
+            purged += len(ids)
+            batches += 1
+
+        result = PurgeResult(model.model_label, purged, expired.count(), time.monotonic() - start)
+        logger.info(
+            "purged %s %s rows (%.0f rows/s), %s remaining",
+            result.purged,
+            result.label,
+            result.rate,
+            result.remaining,
+        )
+        results.append(result)
+
+    return results
+
+
+def empty_trash(user: AbstractBaseUser, using: str = "default") -> int:
+    """Delete every trashed note of a user at once.
+
+    The notes are moved to the tombstone table with one INSERT and one DELETE, see note/tombstones.py.
+
+    Args:
+        user (AbstractBaseUser): owner of the notes.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        int: number of deleted notes.
+    """
+    from .models import NoteModel
+
+    return tombstones.bury_notes(
+        NoteModel.objects.using(using).filter(created_by_user_id=user.id, is_trash=True),  # type: ignore
+        user,
+        using=using,
+    )
@@ -0,0 +1,121 @@
+"""Revision history of notes.
+
+Every save that changes the title or the content of a note records the previous state as a revision,
+numbered 0, 1, 2, ... per note. A revision stores the title and either:
+    - a snapshot: the full content, every `NOTE_REVISION_SNAPSHOT_INTERVAL`-th revision.
+    - a reverse delta: the edit script from the next revision (or the live note) back to its content.
+To materialize a revision, start from the nearest snapshot above it, or the live note, and apply the
+deltas down to it, so at most `NOTE_REVISION_SNAPSHOT_INTERVAL - 1` deltas are applied. Deltas are never
+rewritten, a new revision only adds a row.
+"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any
+from uuid import UUID
+
+from django.conf import settings
+from django.db.models import Max
+
+from . import diff
+
+
+def record_revision(note_id: UUID, content: str, previous: dict[str, Any], using: str = "default") -> Any:
+    """Record the previous state of a note which was just saved.
+
+    Args:
+        note_id (UUID): note id.
+        content (str): content of the note after the save.
+        previous (dict[str, Any]): title, content, version, updated_at and updated_by_user_id before the save.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        NoteRevisionModel: new revision.
+    """
+    from .models import NoteRevisionModel
+
+    last_number = (
+        NoteRevisionModel.objects.using(using).filter(note_id=note_id).aggregate(number=Max("number"))["number"]
+    )
+    number = 0 if last_number is None else last_number + 1
+    is_snapshot = number % settings.NOTE_REVISION_SNAPSHOT_INTERVAL == 0
+
+    return NoteRevisionModel.objects.using(using).create(
+        note_id=note_id,
+        number=number,
+        version=previous["version"],
+        title=previous["title"],
+        is_snapshot=is_snapshot,
+        data=previous["content"] if is_snapshot else json.dumps(diff.make_edits(content, previous["content"])),
+        updated_at=previous["updated_at"],
+        updated_by_user_id=previous["updated_by_user_id"],
+    )
+
+
+def materialize_revision(note: Any, number: int, using: str = "default") -> tuple[Any, str] | None:
+    """Get a revision of a note and its content.
+
+    Args:
+        note (NoteModel): live note.
+        number (int): revision number.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        tuple[NoteRevisionModel, str] | None: revision and its content, None if it does not exist (anymore).
+    """
+    from .models import NoteRevisionModel
+
+    revisions = NoteRevisionModel.objects.using(using).filter(note_id=note.id)
+    anchor = (
+        revisions.filter(number__gt=number, is_snapshot=True)
+        .order_by("number")
+        .values_list("number", flat=True)
+        .first()
+    )
+    chain = revisions.filter(number__gte=number)
+    if anchor is not None:
+        chain = chain.filter(number__lte=anchor)
+    chain = list(chain.order_by("-number"))
+
+    if not chain or chain[-1].number != number:
+        return None
+    if chain[-1].is_snapshot:
+        return chain[-1], chain[-1].data
+
+    if chain[0].is_snapshot:
+        content = chain.pop(0).data
+        expected = anchor
+    else:
+        content = note.content
+        expected = chain[0].number + 1
+
+    for revision in chain:
+        if revision.number != expected - 1:
+            return None
+        edits = [SimpleNamespace(**{"text": None, "length": None, **edit}) for edit in json.loads(revision.data)]
+        content = diff.apply_edits(content, edits)
+        expected = revision.number
+
+    return chain[-1], content
+
+
+def compact_revisions(before: datetime, note_id: UUID | None = None, using: str = "default") -> int:
+    """Delete the delta revisions recorded before a time, the snapshots are kept.
+
+    Revisions are materialized downwards from the snapshot above them, so removing the oldest deltas
+    of a note never breaks the newer ones.
+
+    Args:
+        before (datetime): delete deltas recorded before this time.
+        note_id (UUID | None, optional): only compact the revisions of this note. Defaults to None, every note.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        int: number of deleted revisions.
+    """
+    from .models import NoteRevisionModel
+
+    revisions = NoteRevisionModel.objects.using(using).filter(is_snapshot=False, created_at__lt=before)
+    if note_id is not None:
+        revisions = revisions.filter(note_id=note_id)
+    return revisions.delete()[0]
@@ -1,13 +1,22 @@
+from datetime import datetime
 from typing import ClassVar
+from typing import Literal
 from uuid import UUID
 
+from core.schemas import SparseSchema
 from core.utils import BASE_EXCLUDE_FIELD
+from ninja import Field
 from ninja import ModelSchema
 from ninja import Schema
+from pydantic import model_validator
 
 from . import models
 
 
+# derived from the content on save, never sent by the client
+NOTE_DERIVED_FIELDS = ["preview", "char_count", "word_count"]
+
+
 class PostNoteBookRequestSchema(ModelSchema):
     """Post note book request schema."""
 
@@ -48,12 +57,32 @@ class GetNoteBookResponseSchema(ModelSchema):
         exclude = BASE_EXCLUDE_FIELD
 
 
+class GetNoteBookListItemSchema(ModelSchema, SparseSchema):
+    """Get note book list item schema. only the selected fields are dumped."""
+
+    note_count: int | None = None
+
+    class Meta:
+        model = models.NoteBookModel
+        exclude = BASE_EXCLUDE_FIELD
+        fields_optional = ["title"]
+
+
+class NoteBookSummarySchema(Schema):
+    """Note book summary schema. note counts of the sidebar buckets."""
+
+    all: int
+    not_in_any: int
+    archive: int
+    trash: int
+
+
 class PostNoteRequestSchema(ModelSchema):
     """Post note request schema."""
 
     class Meta:
         model = models.NoteModel
-        exclude = ["id"] + BASE_EXCLUDE_FIELD
+        exclude = ["id"] + BASE_EXCLUDE_FIELD + NOTE_DERIVED_FIELDS
 
 
 class PostNoteResponseSchema(ModelSchema):
@@ -69,7 +98,7 @@ class PutNoteRequestSchema(ModelSchema):
 
     class Meta:
         model = models.NoteModel
-        exclude = ["id"] + BASE_EXCLUDE_FIELD
+        exclude = ["id"] + BASE_EXCLUDE_FIELD + NOTE_DERIVED_FIELDS
 
 
 class PutNoteResponseSchema(ModelSchema):
@@ -89,8 +118,21 @@ class GetNoteFilterSchema(Schema):
     is_archived: bool = False
     is_trash: bool = False
 
+    limit: int = Field(None, ge=1, le=500)  # type: ignore
+    cursor: str = None  # type: ignore
+
+    fields: str = None  # type: ignore
+
     class Meta:
-        fields_optional = ["note_book_id", "is_archived", "is_trash"]
+        fields_optional = ["note_book_id", "is_archived", "is_trash", "limit", "cursor", "fields"]
+
+
+class SearchNoteFilterSchema(Schema):
+    """Search note request schema."""
+
+    q: str = Field(..., min_length=1, max_length=255)
+    limit: int = Field(20, ge=1, le=100)
+    offset: int = Field(0, ge=0)
 
 
 class GetNoteResponseSchema(ModelSchema):
@@ -101,15 +143,207 @@ class GetNoteResponseSchema(ModelSchema):
         exclude = BASE_EXCLUDE_FIELD
 
 
+class GetNoteListItemSchema(ModelSchema, SparseSchema):
+    """Get note list item schema. only the selected fields are dumped.
+
+    Carries the preview of the content instead of the content, get the content with `GET /notes/{pk}`.
+    """
+
+    class Meta:
+        model = models.NoteModel
+        exclude = ["content"] + BASE_EXCLUDE_FIELD
+        fields_optional = [
+            "title",
+            "preview",
+            "char_count",
+            "word_count",
+            "is_archived",
+            "is_trash",
+            "note_book",
+            "other_user_permission",
+        ]
+
+
+class SearchNoteResponseSchema(ModelSchema):
+    """Search note response schema. the fields of the list and a snippet of the content around the match."""
+
+    snippet: str
+
+    class Meta:
+        model = models.NoteModel
+        exclude = ["content"] + BASE_EXCLUDE_FIELD
+
+
+class GetNotePageResponseSchema(Schema):
+    """Get note page response schema."""
+
+    items: list[GetNoteListItemSchema]
+    next_cursor: str | None = None
+
+
 class PatchNoteRequestSchema(ModelSchema):
     """Patch note request schema."""
 
     class Meta:
         model = models.NoteModel
-        exclude = ["id"] + BASE_EXCLUDE_FIELD
+        exclude = ["id"] + BASE_EXCLUDE_FIELD + NOTE_DERIVED_FIELDS
         fields_optional = ["title", "content", "is_archived", "is_trash", "is_pinned"]
 
 
+class ExportNoteBookLineSchema(GetNoteBookResponseSchema):
+    """Export note book line schema."""
+
+    type: str = "note_book"
+
+
+class ExportNoteLineSchema(GetNoteResponseSchema):
+    """Export note line schema."""
+
+    type: str = "note"
+    note_book_title: str | None = None
+
+
+class SyncNoteBookSchema(GetNoteBookResponseSchema):
+    """Sync note book schema. the version and update time let the client order and apply the change."""
+
+    version: int
+    updated_at: datetime
+
+
+class SyncNoteSchema(GetNoteResponseSchema):
+    """Sync note schema. the version and update time let the client order and apply the change."""
+
+    version: int
+    updated_at: datetime
+
+
+class SyncResponseSchema(Schema):
+    """Sync response schema. changes of the user since the token, and the token for the next sync.
+
+    `reset` means the response is the full state, not the changes since the token.
+    """
+
+    note_books: list[SyncNoteBookSchema]
+    notes: list[SyncNoteSchema]
+    deleted_note_books: list[UUID]
+    deleted_notes: list[UUID]
+    token: str | None
+    reset: bool = False
+
+
+class WorkspaceNoteSchema(ModelSchema):
+    """Workspace note schema. note metadata without the content."""
+
+    class Meta:
+        model = models.NoteModel
+        fields = ["id", "title", "note_book", "is_archived", "is_trash"]
+
+
+class WorkspaceResponseSchema(Schema):
+    """Workspace response schema.
+
+    `buckets` maps "all", "not_in_any", "archive", "trash" and every note book id to the ids of its notes.
+    """
+
+    note_books: list[GetNoteBookResponseSchema]
+    notes: list[WorkspaceNoteSchema]
+    buckets: dict[str, list[UUID]]
+
+
+class NoteContentEditSchema(Schema):
+    """Note content edit schema. one operation of an edit script, see note/diff.py."""
+
+    op: Literal["insert", "delete"]
+    offset: int = Field(..., ge=0)
+    text: str = None  # type: ignore
+    length: int = Field(None, ge=0)  # type: ignore
+
+    @model_validator(mode="after")
+    def check_operation(self) -> "NoteContentEditSchema":
+        """Require `text` for an insert and a `length` of at least 1 for a delete."""
+        if self.op == "insert" and self.text is None:
+            raise ValueError("insert requires text")
+        if self.op == "delete" and not self.length:
+            raise ValueError("delete requires a length of at least 1")
+        return self
+
+
+class PatchNoteContentRequestSchema(Schema):
+    """Patch note content request schema. `base_hash` is the sha256 of the content the edits were made for."""
+
+    base_hash: str = Field(..., min_length=64, max_length=64)
+    edits: list[NoteContentEditSchema] = Field(..., max_length=1000)
+
+
+class PatchNoteContentResponseSchema(Schema):
+    """Patch note content response schema. the new hash to base the next edits on."""
+
+    id: UUID
+    content_hash: str
+    length: int
+
+
+class NoteRevisionListItemSchema(ModelSchema):
+    """Note revision list item schema."""
+
+    class Meta:
+        model = models.NoteRevisionModel
+        fields = ["number", "version", "title", "updated_at", "updated_by_user"]
+
+
+class NoteRevisionResponseSchema(NoteRevisionListItemSchema):
+    """Note revision response schema. the revision with its materialized content."""
+
+    content: str
+
+
+class ImportNoteLineSchema(PostNoteRequestSchema):
+    """Import note line schema. the note book is resolved, or created, by title."""
+
+    note_book_title: str | None = Field(None, max_length=255)
+
+
+class BulkNoteChangesSchema(SparseSchema):
+    """Bulk note changes schema. only the fields sent by the client are applied."""
+
+    title: str = Field(None, max_length=255)  # type: ignore
+    note_book_id: UUID | None = None
+    is_archived: bool = None  # type: ignore
+    is_trash: bool = None  # type: ignore
+
+
+class BulkNoteOperationSchema(Schema):
+    """Bulk note operation schema."""
+
+    id: UUID
+    changes: BulkNoteChangesSchema
+
+
+class BulkNoteRequestSchema(Schema):
+    """Bulk note request schema."""
+
+    operations: list[BulkNoteOperationSchema] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkNoteResultSchema(Schema):
+    """Bulk note result schema. status is "ok", "not_found" or "note_book_not_found"."""
+
+    id: UUID
+    status: str
+
+
+class BulkNoteResponseSchema(Schema):
+    """Bulk note response schema."""
+
+    results: list[BulkNoteResultSchema]
+
+
+class EmptyTrashResponseSchema(Schema):
+    """Empty trash response schema."""
+
+    deleted: int
+
+
 class GetNoteByNoteBookRequestSchema(Schema):
     """Get note by note book request schema."""
 
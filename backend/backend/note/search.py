@@ -0,0 +1,255 @@
+"""Full text search index of notes.
+
+The index lives in a side table next to `note_notemodel`:
+    - sqlite: FTS5 virtual table, ranked with bm25.
+    - postgresql: tsvector column with a GIN index, ranked with ts_rank.
+
+Rows are written by `NoteModel.create` / `NoteModel.save` and removed when a note is deleted.
+
+The owner is part of the lookup on both databases, so a search only reads the index entries of one user:
+    - sqlite: `user_id` is an indexed column of the FTS5 table and the match expression requires it, FTS5
+      intersects its doclist with the ones of the terms. the owner filter is never evaluated row by row.
+    - postgresql: the GIN index of the document and the btree index of `user_id` are combined by a bitmap
+      AND. the GIN lookup still reads the postings of every user for the terms, which stays cheap because
+      they are compact, and only the rows of the user are fetched.
+
+The statements are literals naming `SEARCH_TABLE`, nothing of the request is ever formatted into them.
+"""
+from typing import Any
+from uuid import UUID
+
+from django.db import connections
+from django.db import transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+
+SEARCH_TABLE = "note_notemodel_search"
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS note_notemodel_search USING fts5("
+    "note_id UNINDEXED, user_id, title, content, tokenize = 'unicode61')"
+)
+SQLITE_DROP = "DROP TABLE IF EXISTS note_notemodel_search"
+SQLITE_TABLE_SQL = "SELECT sql FROM sqlite_master WHERE name = %s"
+SQLITE_INSERT = "INSERT INTO note_notemodel_search (note_id, user_id, title, content) VALUES (%s, %s, %s, %s)"
+SQLITE_SEARCH = (
+    "SELECT note_id FROM note_notemodel_search WHERE note_notemodel_search MATCH %s "
+    "ORDER BY bm25(note_notemodel_search, 0, 0, 10.0, 1.0) LIMIT %s OFFSET %s"
+)
+
+POSTGRESQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS note_notemodel_search (note_id uuid PRIMARY KEY, user_id uuid, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS note_notemodel_search_document_idx ON note_notemodel_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS note_notemodel_search_user_id_idx ON note_notemodel_search (user_id)",
+)
+POSTGRESQL_TABLE_EXISTS = "SELECT to_regclass(%s) IS NOT NULL"
+POSTGRESQL_INSERT = (
+    "INSERT INTO note_notemodel_search (note_id, user_id, document) VALUES (%s, %s, "
+    "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))"
+)
+POSTGRESQL_UPSERT = (
+    f"{POSTGRESQL_INSERT} ON CONFLICT (note_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document"
+)
+POSTGRESQL_SEARCH = (
+    "SELECT note_id FROM note_notemodel_search, websearch_to_tsquery('simple', %s) AS query "
+    "WHERE user_id = %s AND document @@ query "
+    "ORDER BY ts_rank(document, query) DESC LIMIT %s OFFSET %s"
+)
+
+DELETE_NOTE = "DELETE FROM note_notemodel_search WHERE note_id = %s"
+DELETE_ALL = "DELETE FROM note_notemodel_search"
+
+
+def _create_sqlite_index(cursor: Any) -> bool:
+    """Create the FTS5 table, replace the one of the first version where `user_id` was not indexed."""
+    cursor.execute(SQLITE_TABLE_SQL, [SEARCH_TABLE])
+    row = cursor.fetchone()
+    if row is not None and "user_id UNINDEXED" not in row[0]:
+        return False
+
+    cursor.execute(SQLITE_DROP)
+    cursor.execute(SQLITE_CREATE)
+    return True
+
+
+def _create_postgresql_index(cursor: Any) -> bool:
+    cursor.execute(POSTGRESQL_TABLE_EXISTS, [SEARCH_TABLE])
+    if cursor.fetchone()[0]:
+        return False
+
+    for sql in POSTGRESQL_CREATE:
+        cursor.execute(sql)
+    return True
+
+
+def ensure_search_index(using: str = "default") -> bool:
+    """Create the search index table if it does not exist yet.
+
+    Args:
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        bool: True if the table was created, it is empty then, see `rebuild_search_index`.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            return _create_postgresql_index(cursor)
+        return _create_sqlite_index(cursor)
+
+
+def _db_uuid(connection: BaseDatabaseWrapper, value: UUID | None) -> Any:
+    """Convert uuid to the representation used by the note table (char(32) hex on sqlite)."""
+    if value is None:
+        return None
+    return value if connection.vendor == "postgresql" else value.hex
+
+
+def index_note(note: Any, using: str = "default") -> None:
+    """Write the index row of a note.
+
+    Args:
+        note (NoteModel): note to index.
+        using (str, optional): database alias. Defaults to "default".
+    """
+    connection = connections[using]
+    row = [_db_uuid(connection, note.id), _db_uuid(connection, note.created_by_user_id), note.title, note.content]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(POSTGRESQL_UPSERT, row)
+        else:
+            cursor.execute(DELETE_NOTE, row[:1])
+            cursor.execute(SQLITE_INSERT, row)
+
+
+def _insert_rows(connection: BaseDatabaseWrapper, rows: list[list[Any]]) -> None:
+    """Insert index rows of (note_id, user_id, title, content), converted with `_db_uuid`."""
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(POSTGRESQL_INSERT if connection.vendor == "postgresql" else SQLITE_INSERT, rows)
+
+
+def index_new_notes(notes: list[Any], using: str = "default") -> None:
+    """Add notes created with `bulk_create` to the index in one batch.
+
+    Args:
+        notes (list[NoteModel]): new notes, not in the index yet.
+        using (str, optional): database alias. Defaults to "default".
+    """
+    if not notes:
+        return
+
+    connection = connections[using]
+    _insert_rows(
+        connection,
+        [
+            [_db_uuid(connection, note.id), _db_uuid(connection, note.created_by_user_id), note.title, note.content]
+            for note in notes
+        ],
+    )
+
+
+def reindex_notes(note_ids: list[UUID], using: str = "default") -> None:
+    """Refresh the index rows of notes changed with `QuerySet.update`.
+
+    Args:
+        note_ids (list[UUID]): primary keys of the notes.
+        using (str, optional): database alias. Defaults to "default".
+    """
+    from .models import NoteModel
+
+    notes = NoteModel.objects.using(using).filter(id__in=note_ids).only("id", "title", "content", "created_by_user_id")
+    for note in notes:
+        index_note(note, using=using)
+
+
+def unindex_notes(note_ids: list[UUID], using: str = "default") -> None:
+    """Remove notes from the index.
+
+    Args:
+        note_ids (list[UUID]): primary keys of the notes.
+        using (str, optional): database alias. Defaults to "default".
+    """
+    if not note_ids:
+        return
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.executemany(DELETE_NOTE, [[_db_uuid(connection, note_id)] for note_id in note_ids])
+
+
+def _sqlite_quote(term: str) -> str:
+    """Quote a term so FTS5 operators in it are matched literally."""
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _sqlite_match_expression(user_id: UUID, query: str) -> str:
+    """Match the notes of the user where every term of the query is in the title or the content."""
+    terms = " ".join(_sqlite_quote(term) for term in query.split())
+    return f"user_id : {_sqlite_quote(user_id.hex)} AND {{title content}} : ({terms})"
+
+
+def search_note_ids(user_id: UUID, query: str, limit: int, offset: int = 0, using: str = "default") -> list[UUID]:
+    """Search the notes of a user, best match first.
+
+    Args:
+        user_id (UUID): owner of the notes.
+        query (str): search terms. every term must match.
+        limit (int): max number of results.
+        offset (int, optional): number of results to skip. Defaults to 0.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        list[UUID]: primary keys of the matching notes ordered by rank.
+    """
+    if not query.split():
+        return []
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(POSTGRESQL_SEARCH, [query, user_id, limit, offset])
+        else:
+            cursor.execute(SQLITE_SEARCH, [_sqlite_match_expression(user_id, query), limit, offset])
+        rows = cursor.fetchall()
+
+    return [row[0] if isinstance(row[0], UUID) else UUID(row[0]) for row in rows]
+
+
+def rebuild_search_index(using: str = "default", chunk_size: int = 2000) -> int:
+    """Drop every index row and index all notes again, in batches of `chunk_size` notes, in one transaction.
+
+    The content is read through the ORM, which decompresses it, see core/fields.py.
+
+    Args:
+        using (str, optional): database alias. Defaults to "default".
+        chunk_size (int, optional): number of notes per batch. Defaults to 2000.
+
+    Returns:
+        int: number of indexed notes.
+    """
+    from .models import NoteModel
+
+    ensure_search_index(using=using)
+
+    connection = connections[using]
+    notes = NoteModel.objects.using(using).values_list("id", "created_by_user_id", "title", "content")
+    count = 0
+    rows: list[list[Any]] = []
+
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(DELETE_ALL)
+
+        for note_id, user_id, title, content in notes.iterator(chunk_size=chunk_size):
+            rows.append([_db_uuid(connection, note_id), _db_uuid(connection, user_id), title, content])
+            if len(rows) == chunk_size:
+                _insert_rows(connection, rows)
+                count += len(rows)
+                rows = []
+        _insert_rows(connection, rows)
+
+    return count + len(rows)
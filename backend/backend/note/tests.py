@@ -1,2 +1,712 @@
+import json
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from http import HTTPStatus
+from typing import Any
+from uuid import UUID
+from uuid import uuid4
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from core import cache
+from core.exceptions import ConcurrentUpdateError
+from core.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.test import Client
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+from ninja_jwt.tokens import AccessToken
+
+from . import counters
+from . import diff
+from . import retention
+from . import search
+from .models import NOTE_LIST_FIELDS
+from .models import NoteBookModel
+from .models import NoteCounterModel
+from .models import NoteModel
+from .models import NoteRevisionModel
+from .models import TombstoneModel
+
+
+# indexes named by django from the fields, see the migrations
+NOTE_SYNC_INDEX = "note_notemo_created_e3b9d0_idx"
+TOMBSTONE_SYNC_INDEX = "note_tombst_user_id_31d251_idx"
+NOTE_BOOK_FK_INDEX = "note_notemodel_note_book_id_766f1681"
+COUNTER_USER_FK_INDEX = "note_notecountermodel_user_id_b6d3fe67"
+# sqlite creates unique constraints as autoindexes of the table
+REVISION_UNIQUE_INDEXES = ("note_revision_unique_number", "sqlite_autoindex_note_noterevisionmodel_2")
+COUNTER_UNIQUE_INDEX = "note_counter_unique_note_book"
+
+
+def api_client(user: User) -> Client:
+    """Get a test client authenticated as the user."""
+    return Client(headers={"Authorization": f"Bearer {AccessToken.for_user(user)}"})
+
+
+async def read_streaming_content(response: StreamingHttpResponse) -> bytes:
+    """Read the body of a streaming response of an async view."""
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+class QueryPlanTest(TestCase):
+    """The hot queries of the note api must be served by their index, see the indexes of note/models.py.
+
+    The queries are built the same way as in note/apis.py and core/apis.py, and the plan must name one of
+    the expected indexes, on sqlite and postgres alike. On postgres sequential scans are disabled for the
+    test, so the planner picks an index whatever the size of the tables.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a user with a note book and a note."""
+        cls.user = User.objects.create_user(email="plan@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        NoteModel(title="note", content="content", note_book=cls.note_book).create(cls.user)
+
+    def setUp(self) -> None:
+        """Disable sequential scans on postgres."""
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_uses_index(self, queryset: QuerySet, *names: str) -> None:
+        """Assert the plan of the queryset reads one of the indexes."""
+        plan = queryset.explain()
+        assert any(name in plan for name in names), f"none of {names} in plan:\n{plan}"
+
+    def notes(self) -> QuerySet:
+        """Get the notes of the user."""
+        return NoteModel.objects.filter(created_by_user_id=self.user.id)
+
+    def test_note_list(self) -> None:
+        """`GET /notes`, with and without `limit`, and its validators."""
+        fields = ["id", *NOTE_LIST_FIELDS]
+        self.assert_uses_index(self.notes().values(*fields), "note_list_idx")
+        self.assert_uses_index(
+            self.notes().values(*fields, "created_at").order_by("-created_at", "-id")[:51],
+            "note_list_idx",
+        )
+        created_at = datetime(2024, 1, 1, tzinfo=UTC)
+        self.assert_uses_index(
+            self.notes()
+            .values(*fields, "created_at")
+            .order_by("-created_at", "-id")
+            .filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=uuid4()))[:51],
+            "note_list_idx",
+        )
+        self.assert_uses_index(
+            self.notes().values(*fields).filter(note_book_id=self.note_book.id),
+            "note_book_list_idx",
+        )
+        self.assert_uses_index(self.notes().values(*fields).filter(note_book_id=None), "note_book_list_idx")
+        self.assert_uses_index(
+            self.notes().values(*fields).filter(is_archived=True, is_trash=False),
+            "note_archive_list_idx",
+        )
+        self.assert_uses_index(
+            self.notes().values(*fields).filter(is_archived=False, is_trash=True),
+            "note_trash_list_idx",
+        )
+        self.assert_uses_index(
+            self.notes().values(*fields).filter(is_archived=True, is_trash=True),
+            "note_archive_list_idx",
+            "note_trash_list_idx",
+        )
+        self.assert_uses_index(
+            self.notes().order_by().annotate(last_modified=Max("updated_at"), count=Count("pk")),
+            "note_list_idx",
+            "note_book_list_idx",
+            NOTE_SYNC_INDEX,
+        )
+
+    def test_workspace_and_sync(self) -> None:
+        """`GET /workspace` and `GET /sync`."""
+        self.assert_uses_index(
+            self.notes().order_by("title", "id").values("id", "title", "note_book_id", "is_archived", "is_trash"),
+            "note_workspace_idx",
+        )
+        self.assert_uses_index(
+            NoteBookModel.objects.filter(created_by_user_id=self.user.id).order_by("title").values(),
+            "notebook_title_idx",
+        )
+        since = datetime(2024, 1, 1, tzinfo=UTC)
+        self.assert_uses_index(self.notes().filter(updated_at__gt=since).order_by("updated_at"), NOTE_SYNC_INDEX)
+        self.assert_uses_index(
+            TombstoneModel.objects.filter(
+                user_id=self.user.id,
+                model="note.NoteModel",
+                deleted_at__gt=since,
+            ).values_list("id", "deleted_at"),
+            TOMBSTONE_SYNC_INDEX,
+        )
+
+    def test_note_book_list(self) -> None:
+        """`GET /notebooks`, with and without counts, and `GET /notebooks/summary`."""
+        self.assert_uses_index(
+            NoteBookModel.objects.filter(created_by_user_id=self.user.id).values("id", "title"),
+            "notebook_list_idx",
+        )
+        self.assert_uses_index(
+            NoteCounterModel.objects.filter(user_id=self.user.id, note_book_id=self.note_book.id),
+            COUNTER_UNIQUE_INDEX,
+        )
+        self.assert_uses_index(
+            NoteCounterModel.objects.filter(user_id=self.user.id),
+            COUNTER_USER_FK_INDEX,
+            COUNTER_UNIQUE_INDEX,
+        )
+
+    def test_note_details(self) -> None:
+        """Queries by note: revisions and moving the notes of a deleted note book."""
+        note = self.notes().first()
+        self.assert_uses_index(
+            NoteRevisionModel.objects.filter(note_id=note.id).order_by("-number"),
+            *REVISION_UNIQUE_INDEXES,
+        )
+        self.assert_uses_index(
+            NoteModel.objects.filter(note_book__in=NoteBookModel.objects.filter(id=self.note_book.id).values("pk")),
+            NOTE_BOOK_FK_INDEX,
+        )
+
+
+class PatchContentTest(TestCase):
+    """`PATCH /notes/{pk}/content` only edits the notes of the user."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a note and a second user."""
+        cls.owner = User.objects.create_user(email="owner@example.com", password=None)
+        cls.other = User.objects.create_user(email="other@example.com", password=None)
+        cls.note = NoteModel(title="note", content="content")
+        cls.note.create(cls.owner)
+
+    def patch_content(self, user: User, edits: list[dict[str, Any]] | None = None) -> int:
+        """Send the edits, by default an insert at the start of the note, as `user`, get the status code."""
+        edits = edits if edits is not None else [{"op": "insert", "offset": 0, "text": "new "}]
+        body = {"base_hash": diff.content_hash("content"), "edits": edits}
+        response = api_client(user).patch(f"/api/notes/{self.note.id}/content", body, content_type="application/json")
+        return response.status_code
+
+    def test_other_user_gets_404(self) -> None:
+        """The note of another user is not found, and neither changed nor revised."""
+        assert self.patch_content(self.other) == HTTPStatus.NOT_FOUND
+        self.note.refresh_from_db()
+        assert self.note.content == "content"
+        assert not NoteRevisionModel.objects.filter(note_id=self.note.id).exists()
+
+    def test_owner_edits(self) -> None:
+        """The owner's edit is applied."""
+        assert self.patch_content(self.owner) == HTTPStatus.OK
+        self.note.refresh_from_db()
+        assert self.note.content == "new content"
+
+    def test_incomplete_edits_rejected(self) -> None:
+        """An insert without text and a delete of nothing are rejected before the note is read."""
+        for edit in (
+            {"op": "insert", "offset": 0},
+            {"op": "delete", "offset": 0},
+            {"op": "delete", "offset": 0, "length": 0},
+        ):
+            assert self.patch_content(self.owner, [edit]) == HTTPStatus.UNPROCESSABLE_ENTITY, edit
+        self.note.refresh_from_db()
+        assert (self.note.content, self.note.version) == ("content", 1)
+
+
+class BulkNoteTest(TestCase):
+    """`POST /notes/bulk` changes the notes of the user only, and moves their counters."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create two notes and a note book of the user, and a note and a note book of another user."""
+        cls.user = User.objects.create_user(email="bulk@example.com", password=None)
+        cls.other = User.objects.create_user(email="bulk-other@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        cls.other_note_book = NoteBookModel(title="other note book")
+        cls.other_note_book.create(cls.other)
+        cls.notes = [NoteModel(title=f"note {i}", content="content", note_book=cls.note_book) for i in range(2)]
+        for note in cls.notes:
+            note.create(cls.user)
+        cls.other_note = NoteModel(title="other note", content="content")
+        cls.other_note.create(cls.other)
+
+    def bulk(self, *operations: tuple[NoteModel, dict]) -> Any:
+        """Send the changes of every (note, changes) operation in one request as the user."""
+        body = {"operations": [{"id": str(note.id), "changes": changes} for note, changes in operations]}
+        return api_client(self.user).post("/api/notes/bulk", body, content_type="application/json")
+
+    def statuses(self, response: Any) -> list[str]:
+        """Get the status of every operation of a bulk response."""
+        assert response.status_code == HTTPStatus.OK, response.content
+        return [result["status"] for result in response.json()["results"]]
+
+    def test_operations(self) -> None:
+        """Rename, move, archive and trash, the changes of the same note are merged in order."""
+        first, second = self.notes
+        response = self.bulk(
+            (first, {"title": "renamed"}),
+            (first, {"note_book_id": None}),
+            (second, {"is_archived": True}),
+            (second, {"is_trash": True}),
+        )
+        assert self.statuses(response) == ["ok", "ok", "ok", "ok"]
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.title, first.note_book_id, first.version) == ("renamed", None, 2)
+        assert (second.is_archived, second.is_trash, second.note_book_id) == (True, True, self.note_book.id)
+        assert NoteRevisionModel.objects.filter(note_id=first.id, title="note 0").exists()
+
+    def test_foreign_note_not_found(self) -> None:
+        """The note of another user is reported as not found and left alone."""
+        response = self.bulk((self.other_note, {"title": "stolen"}), (self.notes[0], {"title": "renamed"}))
+        assert self.statuses(response) == ["not_found", "ok"]
+        self.other_note.refresh_from_db()
+        assert self.other_note.title == "other note"
+
+    def test_foreign_note_book_not_found(self) -> None:
+        """A note can not be moved to the note book of another user."""
+        response = self.bulk((self.notes[0], {"note_book_id": str(self.other_note_book.id)}))
+        assert self.statuses(response) == ["note_book_not_found"]
+        self.notes[0].refresh_from_db()
+        assert self.notes[0].note_book_id == self.note_book.id
+
+    def test_nulls_rejected(self) -> None:
+        """Only `note_book_id` may be null, it moves the note out of its note book."""
+        for field in ("title", "is_archived", "is_trash"):
+            response = self.bulk((self.notes[0], {field: None}))
+            assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, field
+        self.notes[0].refresh_from_db()
+        assert self.notes[0].version == 1
+
+    def test_trash_moves_counters(self) -> None:
+        """Trashing notes in bulk moves them from the note book count to the trash count."""
+        assert self.statuses(self.bulk(*((note, {"is_trash": True}) for note in self.notes))) == ["ok", "ok"]
+
+        counter = NoteCounterModel.objects.get(user=self.user, note_book=self.note_book)
+        assert (counter.count, counter.archived_count, counter.trash_count) == (2, 0, 2)
+        response = api_client(self.user).get("/api/notebooks/summary")
+        assert response.json() == {"all": 2, "not_in_any": 0, "archive": 0, "trash": 2}
+
+
+class ConditionalRequestTest(TestCase):
+    """GETs of notes and note books carry validators, and a fresh client copy gets a 304."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a note book with a note."""
+        cls.user = User.objects.create_user(email="conditional@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        cls.note = NoteModel(title="note", content="content", note_book=cls.note_book)
+        cls.note.create(cls.user)
+
+    def assert_not_modified(self, path: str) -> None:
+        """Assert a GET of the path with the ETag of a first GET gets a 304 without body."""
+        client = api_client(self.user)
+        response = client.get(path)
+        assert response.status_code == HTTPStatus.OK
+        assert response["Last-Modified"]
+
+        response = client.get(path, headers={"If-None-Match": response["ETag"]})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert not response.content
+
+    def test_detail(self) -> None:
+        """`GET /notes/{pk}` and `GET /notebooks/{pk}`."""
+        self.assert_not_modified(f"/api/notes/{self.note.id}")
+        self.assert_not_modified(f"/api/notebooks/{self.note_book.id}")
+
+    def test_list(self) -> None:
+        """`GET /notes`, with and without `limit`, and `GET /notebooks`."""
+        self.assert_not_modified("/api/notes")
+        self.assert_not_modified("/api/notes?limit=10")
+        self.assert_not_modified("/api/notebooks?with_counts=true")
+
+    def test_changed_object_is_sent(self) -> None:
+        """An ETag of a previous version does not match."""
+        client = api_client(self.user)
+        etag = client.get(f"/api/notes/{self.note.id}")["ETag"]
+        self.note.title = "renamed"
+        self.note.save(self.user)
+
+        response = client.get(f"/api/notes/{self.note.id}", headers={"If-None-Match": etag})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["title"] == "renamed"
+
+    @override_settings(API_COMPRESSION_MIN_SIZE=0)
+    def test_compressed(self) -> None:
+        """The weak ETag of a gzipped response gets a 304 too, and passes If-Match."""
+        note = NoteModel(title="long note", content="content " * 1000)
+        note.create(self.user)
+        client = api_client(self.user)
+        path = f"/api/notes/{note.id}"
+        gzip = {"Accept-Encoding": "gzip"}
+
+        for get_path in (path, "/api/notes"):
+            response = client.get(get_path, headers=gzip)
+            assert response["Content-Encoding"] == "gzip"
+            assert response["ETag"].startswith("W/")
+            response = client.get(get_path, headers={**gzip, "If-None-Match": response["ETag"]})
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        etag = client.get(path, headers=gzip)["ETag"]
+        response = client.patch(path, {"title": "renamed"}, content_type="application/json", headers={"If-Match": etag})
+        assert response.status_code == HTTPStatus.OK
+
+
+class OptimisticConcurrencyTest(TestCase):
+    """Writes of a stale version fail instead of overwriting the newer one, see `BaseModel.save`."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a note book with a note."""
+        cls.user = User.objects.create_user(email="concurrency@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        cls.note = NoteModel(title="note", content="content", note_book=cls.note_book)
+        cls.note.create(cls.user)
+
+    def test_stale_if_match(self) -> None:
+        """A PATCH with the ETag of a previous version gets a 412, one with the current ETag goes through."""
+        client = api_client(self.user)
+        path = f"/api/notes/{self.note.id}"
+        stale_etag = client.get(path)["ETag"]
+        self.note.title = "renamed"
+        self.note.save(self.user)
+
+        response = client.patch(
+            path,
+            {"title": "stale"},
+            content_type="application/json",
+            headers={"If-Match": stale_etag},
+        )
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+        self.note.refresh_from_db()
+        assert (self.note.title, self.note.version) == ("renamed", 2)
+
+        etag = client.get(path)["ETag"]
+        response = client.patch(path, {"title": "fresh"}, content_type="application/json", headers={"If-Match": etag})
+        assert response.status_code == HTTPStatus.OK
+        assert response["ETag"] != etag
+
+    def test_stale_instance(self) -> None:
+        """Saving an instance loaded before another save raises and keeps the newer row."""
+        first = NoteModel.objects.get(id=self.note.id)
+        second = NoteModel.objects.get(id=self.note.id)
+        first.title = "first"
+        first.save(self.user)
+
+        second.title = "second"
+        with self.assertRaises(ConcurrentUpdateError):  # noqa: PT027, the suite runs on the django test runner
+            second.save(self.user)
+        assert second.version == 1
+
+        self.note.refresh_from_db()
+        assert (self.note.title, self.note.version) == ("first", 2)
+
+    def test_unchanged_save(self) -> None:
+        """Saving an instance without changed fields writes nothing and keeps the version."""
+        note = NoteModel.objects.get(id=self.note.id)
+        with self.assertNumQueries(0):
+            note.save(self.user)
+
+        assert note.version == 1
+        self.note.refresh_from_db()
+        assert (self.note.version, self.note.updated_at) == (1, note.updated_at)
+
+
+@override_settings(LIST_CACHE_ENABLED=True)
+class ListCacheTest(TestCase):
+    """Cached lists are served again until a write of the user, and rendered again after it commits."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a note."""
+        cls.user = User.objects.create_user(email="cache@example.com", password=None)
+        cls.note = NoteModel(title="note", content="content")
+        cls.note.create(cls.user)
+
+    def titles(self, client: Client) -> list[str]:
+        """Get the titles of the note list."""
+        response = client.get("/api/notes")
+        assert response.status_code == HTTPStatus.OK
+        return [note["title"] for note in response.json()]
+
+    def test_write_invalidates(self) -> None:
+        """A PATCH drops the cached list once its transaction commits."""
+        client = api_client(self.user)
+        assert self.titles(client) == ["note"]
+        hits = cache.get_stats()["hits"]
+        assert self.titles(client) == ["note"]
+        assert cache.get_stats()["hits"] == hits + 1
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f"/api/notes/{self.note.id}", {"title": "renamed"}, content_type="application/json")
+        assert response.status_code == HTTPStatus.OK
+
+        assert self.titles(client) == ["renamed"]
+
+
+class ImportTest(TestCase):
+    """`POST /notes/import` reports every invalid line by number and imports the others."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a user with a note book, and a note book of another user."""
+        cls.user = User.objects.create_user(email="import@example.com", password=None)
+        cls.other = User.objects.create_user(email="import-other@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        cls.other_note_book = NoteBookModel(title="other note book")
+        cls.other_note_book.create(cls.other)
+
+    def import_lines(self, *lines: dict | bytes) -> list[dict[str, Any]]:
+        """Import the lines as the user and get the records of the response."""
+        body = b"\n".join(line if isinstance(line, bytes) else json.dumps(line).encode() for line in lines)
+        response = api_client(self.user).post("/api/notes/import", body, content_type="application/x-ndjson")
+        assert response.status_code == HTTPStatus.OK
+        return [json.loads(line) for line in async_to_sync(read_streaming_content)(response).splitlines()]
+
+    def test_errors_per_line(self) -> None:
+        """Invalid json and invalid notes fail alone, note book lines are skipped."""
+        records = self.import_lines(
+            {"title": "first", "content": "content"},
+            b"not json",
+            {"title": "x" * 256, "content": "content"},
+            {"type": "note_book", "title": "ignored"},
+            {"title": "second", "content": "content", "note_book_title": "new note book"},
+        )
+        assert [record["line"] for record in records if "error" in record] == [2, 3]
+        assert records[-1] == {"done": True, "imported": 2, "failed": 2, "note_books_created": 1}
+
+        notes = NoteModel.objects.filter(created_by_user_id=self.user.id)
+        assert sorted(notes.values_list("title", "note_book__title")) == [
+            ("first", None),
+            ("second", "new note book"),
+        ]
+
+    def test_foreign_note_book_not_found(self) -> None:
+        """A note can not be imported into the note book of another user by `note_book_id`, like `POST /notes`."""
+        records = self.import_lines(
+            {"title": "stolen", "content": "content", "note_book_id": str(self.other_note_book.id)},
+            {"title": "kept", "content": "content", "note_book_id": str(self.note_book.id)},
+        )
+        assert records[0] == {"line": 1, "error": "Note book not found"}
+        assert records[-1]["imported"] == 1
+
+        notes = NoteModel.objects.filter(created_by_user_id=self.user.id)
+        assert list(notes.values_list("title", "note_book_id")) == [("kept", self.note_book.id)]
+        assert not NoteModel.objects.filter(note_book_id=self.other_note_book.id).exists()
+
+
+class SyncTest(TestCase):
+    """`GET /sync` sends the version and update time of every changed object."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a note book with a note."""
+        cls.user = User.objects.create_user(email="sync@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        cls.note = NoteModel(title="note", content="content", note_book=cls.note_book)
+        cls.note.create(cls.user)
+
+    def sync(self, since: str | None = None) -> dict[str, Any]:
+        """Sync as the user."""
+        response = api_client(self.user).get("/api/sync", {"since": since} if since is not None else {})
+        assert response.status_code == HTTPStatus.OK, response.content
+        return response.json()
+
+    def assert_synced(self, item: dict[str, Any], obj: NoteBookModel | NoteModel) -> None:
+        """Assert a sync item has the id, version and update time of the object, in milliseconds like all json."""
+        obj.refresh_from_db()
+        assert item["id"] == str(obj.id)
+        assert (item["version"], item["updated_at"]) == (obj.version, DjangoJSONEncoder().default(obj.updated_at))
+
+    def test_version_and_updated_at(self) -> None:
+        """The full sync and the delta sync after an update."""
+        changes = self.sync()
+        self.assert_synced(changes["note_books"][0], self.note_book)
+        self.assert_synced(changes["notes"][0], self.note)
+
+        self.note.title = "renamed"
+        self.note.save(self.user)
+
+        changes = self.sync(changes["token"])
+        assert [note["title"] for note in changes["notes"]] == ["renamed"]
+        self.assert_synced(changes["notes"][0], self.note)
+        assert changes["notes"][0]["version"] == 2  # noqa: PLR2004
+
+
+class CounterTest(TestCase):
+    """Every write path keeps the counter rows equal to a recount of the notes, see note/counters.py."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a user with two note books."""
+        cls.user = User.objects.create_user(email="counters@example.com", password=None)
+        cls.note_books = [NoteBookModel(title=f"note book {name}") for name in ("a", "b")]
+        for note_book in cls.note_books:
+            note_book.create(cls.user)
+
+    def counter_rows(self) -> dict[UUID | None, tuple[int, int, int]]:
+        """Get the non empty counter rows of the user by note book."""
+        return {
+            row.note_book_id: (row.count, row.archived_count, row.trash_count)
+            for row in NoteCounterModel.objects.filter(user_id=self.user.id)
+            if row.count or row.archived_count or row.trash_count
+        }
+
+    def assert_counts(self, client: Client, **summary: int) -> None:
+        """Assert the counter rows match a recount, rolled back, and `GET /notebooks/summary` the summary."""
+        rows = self.counter_rows()
+        with transaction.atomic():
+            counters.recount_notes(self.user.id)
+            assert rows == self.counter_rows()
+            transaction.set_rollback(rollback=True)
+
+        response = client.get("/api/notebooks/summary")
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == summary
+
+    def test_write_paths(self) -> None:
+        """Create, update, archive, trash, move, bulk, import, delete, restore and empty trash."""
+        client = api_client(self.user)
+        note_book_a, note_book_b = (str(note_book.id) for note_book in self.note_books)
+
+        def send(method: str, path: str, body: Any = None) -> Any:
+            response = getattr(client, method)(f"/api/{path}", body, content_type="application/json")
+            assert response.status_code == HTTPStatus.OK, response.content
+            return response
+
+        first, second, third = (
+            send("post", "notes", {"title": title, "content": "content", "note_book_id": note_book_id}).json()["id"]
+            for title, note_book_id in (("first", note_book_a), ("second", note_book_a), ("third", None))
+        )
+        self.assert_counts(client, all=3, not_in_any=1, archive=0, trash=0)
+
+        put_body = {"title": "third", "content": "content", "note_book_id": note_book_b}
+        send("put", f"notes/{third}", {**put_body, "is_archived": False, "is_trash": False})
+        self.assert_counts(client, all=3, not_in_any=0, archive=0, trash=0)
+
+        send("patch", f"notes/{first}", {"is_archived": True})
+        send("patch", f"notes/{second}", {"is_trash": True})
+        self.assert_counts(client, all=3, not_in_any=0, archive=1, trash=1)
+
+        send("patch", f"notes/set_note_book_none/{first}")
+        self.assert_counts(client, all=3, not_in_any=1, archive=1, trash=1)
+
+        operations = [
+            {"id": third, "changes": {"is_trash": True}},
+            {"id": second, "changes": {"note_book_id": None}},
+        ]
+        send("post", "notes/bulk", {"operations": operations})
+        self.assert_counts(client, all=3, not_in_any=2, archive=1, trash=2)
+
+        lines = [
+            {"title": "imported", "content": "content", "is_archived": True, "note_book_title": "note book a"},
+            {"title": "imported too", "content": "content"},
+        ]
+        body = b"\n".join(json.dumps(line).encode() for line in lines)
+        response = client.post("/api/notes/import", body, content_type="application/x-ndjson")
+        summary = json.loads(async_to_sync(read_streaming_content)(response).splitlines()[-1])
+        assert summary["imported"] == len(lines)
+        self.assert_counts(client, all=5, not_in_any=3, archive=2, trash=2)
+
+        send("delete", f"notes/{first}")
+        self.assert_counts(client, all=4, not_in_any=2, archive=1, trash=2)
+        send("post", f"notes/{first}/restore")
+        self.assert_counts(client, all=5, not_in_any=3, archive=2, trash=2)
+
+        send("delete", f"notebooks/{note_book_a}?trash_notes=true")
+        self.assert_counts(client, all=5, not_in_any=4, archive=1, trash=2)
+        send("post", f"notebooks/{note_book_a}/restore")
+        self.assert_counts(client, all=5, not_in_any=3, archive=2, trash=2)
+
+        send("delete", "notes/trash")
+        self.assert_counts(client, all=3, not_in_any=2, archive=2, trash=0)
+
+
+class TombstoneTest(TestCase):
+    """Deletes move rows to the tombstone table and restores move them back, see note/tombstones.py."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a user with a note book and two notes in it."""
+        cls.user = User.objects.create_user(email="tombstones@example.com", password=None)
+        cls.note_book = NoteBookModel(title="note book")
+        cls.note_book.create(cls.user)
+        cls.note = NoteModel(title="note", content="zebra content", note_book=cls.note_book)
+        cls.note.create(cls.user)
+        cls.trashed_note = NoteModel(title="trashed note", content="content", note_book=cls.note_book, is_trash=True)
+        cls.trashed_note.create(cls.user)
+
+    def summary(self, client: Client) -> dict[str, int]:
+        """Get the note counts of the user."""
+        return client.get("/api/notebooks/summary").json()
+
+    def test_restore_note(self) -> None:
+        """A restored note has its content, note book, counters and search row back."""
+        client = api_client(self.user)
+        before = self.summary(client)
+
+        assert client.delete(f"/api/notes/{self.note.id}").status_code == HTTPStatus.OK
+        assert not NoteModel.objects.filter(id=self.note.id).exists()
+        assert TombstoneModel.objects.filter(id=self.note.id, model=NoteModel.model_label).exists()
+        assert self.summary(client)["all"] == before["all"] - 1
+        assert search.search_note_ids(self.user.id, "zebra", limit=10) == []
+
+        response = client.post(f"/api/notes/{self.note.id}/restore")
+        assert response.status_code == HTTPStatus.OK
+        assert (response.json()["content"], response.json()["note_book"]) == ("zebra content", str(self.note_book.id))
+        assert not TombstoneModel.objects.filter(id=self.note.id).exists()
+        assert self.summary(client) == before
+        assert search.search_note_ids(self.user.id, "zebra", limit=10) == [self.note.id]
+
+    def test_restore_note_book(self) -> None:
+        """A restored note book gets its notes back, the ones trashed with it leave the trash again."""
+        client = api_client(self.user)
+        before = self.summary(client)
+
+        response = client.delete(f"/api/notebooks/{self.note_book.id}?trash_notes=true")
+        assert response.status_code == HTTPStatus.OK
+        for note in (self.note, self.trashed_note):
+            note.refresh_from_db()
+            assert (note.note_book_id, note.is_trash) == (None, True)
+        assert self.summary(client)["trash"] == before["trash"] + 1
+
+        assert client.post(f"/api/notebooks/{self.note_book.id}/restore").status_code == HTTPStatus.OK
+        self.note.refresh_from_db()
+        self.trashed_note.refresh_from_db()
+        assert (self.note.note_book_id, self.note.is_trash) == (self.note_book.id, False)
+        assert (self.trashed_note.note_book_id, self.trashed_note.is_trash) == (self.note_book.id, True)
+        assert self.summary(client) == before
+
+    def test_restore_after_purge(self) -> None:
+        """A purged tombstone can not be restored."""
+        client = api_client(self.user)
+        client.delete(f"/api/notes/{self.note.id}")
+        client.delete(f"/api/notebooks/{self.note_book.id}")
+        retention.purge_deleted(before=timezone.now() + timedelta(seconds=1))
+
+        assert client.post(f"/api/notes/{self.note.id}/restore").status_code == HTTPStatus.NOT_FOUND
+        assert client.post(f"/api/notebooks/{self.note_book.id}/restore").status_code == HTTPStatus.NOT_FOUND
+
+    def test_empty_trash(self) -> None:
+        """`DELETE /notes/trash` moves the trashed notes to tombstones."""
+        response = api_client(self.user).delete("/api/notes/trash")
+        assert response.json() == {"deleted": 1}
+        assert not NoteModel.objects.filter(id=self.trashed_note.id).exists()
+        tombstone = TombstoneModel.objects.get(id=self.trashed_note.id)
+        assert (tombstone.model, tombstone.user_id) == (NoteModel.model_label, self.user.id)
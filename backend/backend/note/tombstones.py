@@ -0,0 +1,268 @@
+"""Tombstones of deleted notes and note books.
+
+A delete moves the row out of its table into `TombstoneModel`, one cold table for both models, so queries
+of notes and note books never read deleted rows and need no filter for them. A tombstone keeps only what
+sync and restore need:
+    - the id, owner and time of the delete, to send the delete to the other clients of the user.
+    - the row itself, serialized as compressed json, to move it back on restore.
+    - for a note book, the ids of its notes, to put them back in the note book on restore.
+The revisions of a deleted note are kept and apply again once it is restored. Tombstones are purged after
+the retention period, see note/retention.py.
+"""
+import json
+from collections import defaultdict
+from typing import Any
+from uuid import UUID
+
+from core import events
+from core.cache import invalidate_user
+from django.contrib.auth.models import AbstractBaseUser
+from django.core import serializers
+from django.db import transaction
+from django.db.models import F
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import search
+from .counters import CounterDeltas
+from .counters import NoteState
+from .counters import note_state
+
+
+def _bury(queryset: QuerySet, user: AbstractBaseUser, using: str, members: dict[UUID, Any] | None = None) -> list[Any]:
+    """Copy the rows of the queryset to tombstones and delete them with one DELETE.
+
+    `members` maps the pk of a row to the `members` of its tombstone.
+
+    Returns:
+        list[Model]: the deleted objects, as they were before the delete.
+    """
+    from .models import TombstoneModel
+
+    objs = list(queryset.select_for_update())
+    if not objs:
+        return []
+
+    now = timezone.now()
+    TombstoneModel.objects.using(using).bulk_create(
+        TombstoneModel(
+            id=obj.pk,
+            model=obj.model_label,
+            user_id=obj.created_by_user_id,
+            deleted_at=now,
+            deleted_by_user=user,
+            data=serializers.serialize("json", [obj]),
+            members=json.dumps(members[obj.pk]) if members and obj.pk in members else "",
+        )
+        for obj in objs
+    )
+    queryset.model.objects.using(using).filter(pk__in=[obj.pk for obj in objs]).delete()
+
+    ids_by_user: defaultdict[UUID, list[UUID]] = defaultdict(list)
+    for obj in objs:
+        ids_by_user[obj.created_by_user_id].append(obj.pk)
+    for user_id, ids in ids_by_user.items():
+        invalidate_user(user_id, using=using)
+        events.publish(user_id, events.DELETED, queryset.model, ids, using=using)
+    return objs
+
+
+def bury_notes(notes: QuerySet, user: AbstractBaseUser, using: str = "default") -> int:
+    """Move notes to the tombstone table, update the note counters and remove their search index rows.
+
+    Args:
+        notes (QuerySet): notes to delete.
+        user (AbstractBaseUser): user deleting the notes.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        int: number of deleted notes.
+    """
+    with transaction.atomic(using=using):
+        objs = _bury(notes, user, using)
+
+        deltas: defaultdict[UUID, CounterDeltas] = defaultdict(CounterDeltas)
+        for obj in objs:
+            deltas[obj.created_by_user_id].add(note_state(obj), -1)
+        for user_id, user_deltas in deltas.items():
+            user_deltas.apply(user_id, using=using)
+        search.unindex_notes([obj.pk for obj in objs], using=using)
+
+    return len(objs)
+
+
+def bury_note_books(
+    note_books: QuerySet,
+    user: AbstractBaseUser,
+    *,
+    trash_notes: bool = False,
+    using: str = "default",
+) -> int:
+    """Move note books to the tombstone table.
+
+    Their notes are moved to "not in any note book" first, and to the trash with `trash_notes`, with one
+    UPDATE, and bumped, so sync sends them again. The tombstone of a note book keeps the ids of its notes,
+    so `restore_note_book` puts them back. The counter rows of the note books are deleted with them.
+
+    Args:
+        note_books (QuerySet): note books to delete.
+        user (AbstractBaseUser): user deleting the note books.
+        trash_notes (bool, optional): also move the notes to the trash. Defaults to False.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        int: number of deleted note books.
+    """
+    from .models import NoteModel
+
+    with transaction.atomic(using=using):
+        notes = NoteModel.objects.using(using).filter(note_book__in=note_books.values("pk"))
+        members: defaultdict[UUID, dict[str, list[str]]] = defaultdict(lambda: {"notes": [], "trashed": []})
+        deltas: defaultdict[UUID, CounterDeltas] = defaultdict(CounterDeltas)
+        note_ids: defaultdict[UUID, list[UUID]] = defaultdict(list)
+        rows = notes.select_for_update().values_list("id", "created_by_user_id", *NoteState._fields)
+        for note_id, user_id, *state in rows:
+            old = NoteState(*state)
+            note_ids[user_id].append(note_id)
+            members[old.note_book_id]["notes"].append(str(note_id))
+            if trash_notes and not old.is_trash:
+                members[old.note_book_id]["trashed"].append(str(note_id))
+            deltas[user_id].move(old, old._replace(note_book_id=None, is_trash=old.is_trash or trash_notes))
+
+        changes: dict[str, Any] = {"note_book": None}
+        if trash_notes:
+            changes["is_trash"] = True
+        notes.update(**changes, updated_by_user=user, updated_at=timezone.now(), version=F("version") + 1)
+        for user_id, user_deltas in deltas.items():
+            user_deltas.apply(user_id, using=using)
+            events.publish(user_id, events.UPDATED, NoteModel, note_ids[user_id], using=using)
+
+        return len(_bury(note_books, user, using, members=members))
+
+
+def _get_tombstone(model: Any, pk: UUID, user: AbstractBaseUser, using: str) -> tuple[Any, Any] | None:
+    """Get the tombstone of a deleted object of the user and the object, None if there is none."""
+    from .models import TombstoneModel
+
+    tombstone = (
+        TombstoneModel.objects.using(using)
+        .select_for_update()
+        .filter(id=pk, model=model.model_label, user_id=user.id)  # type: ignore
+        .first()
+    )
+    if tombstone is None:
+        return None
+
+    obj = next(serializers.deserialize("json", tombstone.data, using=using)).object
+    obj.updated_by_user = user
+    obj.version += 1
+    return tombstone, obj
+
+
+def _put_back(tombstone: Any, obj: Any, using: str) -> None:
+    """Insert the row of the object back and delete its tombstone."""
+    type(obj).objects.using(using).bulk_create([obj])
+    tombstone.delete()
+    obj.snapshot_loaded_values()
+    invalidate_user(obj.created_by_user_id, using=using)
+    events.publish(obj.created_by_user_id, events.CREATED, type(obj), [obj.pk], using=using)
+
+
+def restore_note(pk: UUID, user: AbstractBaseUser, using: str = "default") -> Any:
+    """Move a deleted note of the user back from the tombstone table.
+
+    The note goes back to its note book, or to "not in any note book" if the note book was deleted meanwhile.
+
+    Args:
+        pk (UUID): note id.
+        user (AbstractBaseUser): owner of the note.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        NoteModel | None: restored note, None if the user has no deleted note with the id.
+    """
+    from .models import NoteBookModel
+    from .models import NoteModel
+
+    with transaction.atomic(using=using):
+        found = _get_tombstone(NoteModel, pk, user, using)
+        if found is None:
+            return None
+
+        tombstone, note = found
+        if (
+            note.note_book_id is not None
+            and not NoteBookModel.objects.using(using).filter(pk=note.note_book_id).exists()
+        ):
+            note.note_book_id = None
+        _put_back(tombstone, note, using)
+
+        deltas = CounterDeltas()
+        deltas.add(note_state(note), 1)
+        deltas.apply(note.created_by_user_id, using=using)
+        search.index_note(note, using=using)
+
+    return note
+
+
+def _reattach_notes(note_book: Any, members: dict[str, list[str]], user: AbstractBaseUser, using: str) -> None:
+    """Put the notes of a restored note book back in it, with one UPDATE per kind of change.
+
+    Notes the delete moved to the trash leave the trash again. Notes moved to another note book, deleted or
+    trashed by the user since the delete are left alone.
+    """
+    from .models import NoteModel
+
+    notes = NoteModel.objects.using(using).filter(
+        id__in=members["notes"],
+        created_by_user_id=note_book.created_by_user_id,
+        note_book=None,
+    )
+    trashed = {UUID(note_id) for note_id in members["trashed"]}
+    deltas = CounterDeltas()
+    note_ids = []
+    untrash = []
+    for note_id, *state in notes.select_for_update().values_list("id", *NoteState._fields):
+        old = NoteState(*state)
+        note_ids.append(note_id)
+        if note_id in trashed and old.is_trash:
+            untrash.append(note_id)
+        deltas.move(old, old._replace(note_book_id=note_book.pk, is_trash=old.is_trash and note_id not in trashed))
+
+    changes = {
+        "note_book": note_book,
+        "updated_by_user": user,
+        "updated_at": timezone.now(),
+        "version": F("version") + 1,
+    }
+    notes.filter(id__in=untrash).update(is_trash=False, **changes)
+    notes.exclude(id__in=untrash).update(**changes)
+    deltas.apply(note_book.created_by_user_id, using=using)
+    invalidate_user(note_book.created_by_user_id, using=using)
+    events.publish(note_book.created_by_user_id, events.UPDATED, NoteModel, note_ids, using=using)
+
+
+def restore_note_book(pk: UUID, user: AbstractBaseUser, using: str = "default") -> Any:
+    """Move a deleted note book of the user back from the tombstone table, with the notes it had.
+
+    Args:
+        pk (UUID): note book id.
+        user (AbstractBaseUser): owner of the note book.
+        using (str, optional): database alias. Defaults to "default".
+
+    Returns:
+        NoteBookModel | None: restored note book, None if the user has no deleted note book with the id.
+    """
+    from .models import NoteBookModel
+
+    with transaction.atomic(using=using):
+        found = _get_tombstone(NoteBookModel, pk, user, using)
+        if found is None:
+            return None
+
+        tombstone, note_book = found
+        _put_back(tombstone, note_book, using)
+        if tombstone.members:
+            _reattach_notes(note_book, json.loads(tombstone.members), user, using)
+
+    return note_book
@@ -90,8 +90,9 @@ else:
     with st.sidebar:
         st.markdown("## Note Book")
 
-        notebooks = utils.get_notebook_list(st.session_state["token"])
-        note_options = utils.get_note_options(st.session_state["token"], notebooks)
+        workspace = utils.get_workspace(st.session_state["token"])
+        notebooks = workspace["note_books"]
+        note_options = utils.get_note_options(workspace)
 
         st.radio(
             "Notebooks",
@@ -199,7 +200,7 @@ else:
         # st.write(st.session_state["notes"])
 
         if st.session_state["notes"] is not None:
-            id, in_notebook, note_title, note_content = utils.unpack_note_content(st.session_state["notes"])
+            id, in_notebook, note_title, note_content = utils.unpack_note_content(st.session_state["token"], st.session_state["notes"])
             st.text_input(
                 "Note Title",
                 value=note_title,
@@ -211,7 +212,7 @@ else:
                 value=note_content,
                 key="note_content",
                 # height=500,
-                on_change=lambda: utils.update_note_content(st.session_state["token"], id, st.session_state["note_content"]),  # type: ignore
+                on_change=lambda: utils.update_note_content(st.session_state["token"], id, note_content, st.session_state["note_content"]),  # type: ignore
             )
 
             st.selectbox(
@@ -1,3 +1,4 @@
+import hashlib
 from typing import Any
 
 import requests
@@ -48,84 +49,51 @@ def get_notebook_list(access_token: str) -> list[dict[str, str]]:
     return sorted(res.json(), key=lambda x: x["title"])
 
 
-def _get_note_list(
-    access_token=None,
-    note_book_id=None,
-    all: str = "true",
-    is_archive: str | None = None,
-    is_trash: str | None = None,
-    notebook_index: int | None = None,
-):
-    assert access_token is not None
-
-    query_params = {}
-
-    if note_book_id is None:
-        if is_archive is not None:
-            query_params = {
-                "all": "false",
-                "is_archived": is_archive,
-            }
-        elif is_trash is not None:
-            query_params = {
-                "all": "false",
-                "is_trash": is_trash,
-            }
-        else:
-            query_params = {
-                "all": all,
-            }
-    else:
-        query_params = {
-            "all": "false",
-            "note_book_id": note_book_id,
-        }
-
+def get_workspace(access_token: str) -> dict[str, Any]:
     res = requests.get(
-        f"{config.API_ROOT}/notes",
+        f"{config.API_ROOT}/workspace",
         headers={
             "Authorization": f"Bearer {access_token}",
         },
-        params=query_params,
     )
 
-    return [
-        {
-            "index": notebook_index,
-            **note,
-        }
-        for note in sorted(res.json(), key=lambda x: x["title"])
-    ]
+    return res.json()
+
 
+def get_note_options(workspace: dict[str, Any]) -> dict[str | list[Any], list[Any]]:
+    notes = {note["id"]: note for note in workspace["notes"]}
+    notebook_index = {notebook["id"]: i for i, notebook in enumerate(workspace["note_books"])}
 
-def get_note_options(access_token: str, notebooks: list[dict[str, str]]) -> dict[str | list[Any], list[Any]]:
     return {
-        "all": _get_note_list(access_token, all="true"),
-        **{
-            notebook["id"]: _get_note_list(
-                access_token,
-                all="false",
-                note_book_id=notebook["id"],
-                notebook_index=i,
-            )
-            for i, notebook in enumerate(notebooks)
-        },
-        "not_in_any": _get_note_list(access_token, all="false"),
-        "archive": _get_note_list(
-            access_token,
-            all="false",
-            is_archive="true",
-        ),
-        "trash": _get_note_list(
-            access_token,
-            all="false",
-            is_trash="true",
-        ),
+        options_id: [
+            {
+                "index": notebook_index.get(options_id),  # type: ignore
+                **notes[note_id],
+            }
+            for note_id in note_ids
+        ]
+        for options_id, note_ids in workspace["buckets"].items()
     }
 
 
-def unpack_note_content(note_content: dict[str, str | bool | int]) -> tuple[str, str, str, str]:
-    return note_content["id"], note_content["note_book"], note_content["title"], note_content["content"]  # type: ignore
+def get_note_content(access_token: str, note_id: str) -> str:
+    res = requests.get(
+        f"{config.API_ROOT}/notes/{note_id}",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+        },
+    )
+
+    return res.json()["content"]
+
+
+def unpack_note_content(access_token: str, note_content: dict[str, str | bool | int]) -> tuple[str, str, str, str]:
+    return (
+        note_content["id"],  # type: ignore
+        note_content["note_book"],  # type: ignore
+        note_content["title"],  # type: ignore
+        get_note_content(access_token, note_content["id"]),  # type: ignore
+    )
 
 
 def create_notebook(
@@ -214,14 +182,35 @@ def update_note_title(access_token: str, note_id: str, new_title: str) -> bool:
     return res.status_code == 200
 
 
-def update_note_content(access_token: str, note_id: str, new_content: str) -> bool:
+def _make_content_edits(old_content: str, new_content: str) -> list[dict[str, Any]]:
+    prefix = 0
+    while prefix < min(len(old_content), len(new_content)) and old_content[prefix] == new_content[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while (
+        suffix < min(len(old_content), len(new_content)) - prefix
+        and old_content[len(old_content) - 1 - suffix] == new_content[len(new_content) - 1 - suffix]
+    ):
+        suffix += 1
+
+    edits = []
+    if len(old_content) - prefix - suffix:
+        edits.append({"op": "delete", "offset": prefix, "length": len(old_content) - prefix - suffix})
+    if len(new_content) - prefix - suffix:
+        edits.append({"op": "insert", "offset": prefix, "text": new_content[prefix : len(new_content) - suffix]})
+    return edits
+
+
+def update_note_content(access_token: str, note_id: str, old_content: str, new_content: str) -> bool:
     res = requests.patch(
-        f"{config.API_ROOT}/notes/{note_id}",
+        f"{config.API_ROOT}/notes/{note_id}/content",
         headers={
             "Authorization": f"Bearer {access_token}",
         },
         json={
-            "content": new_content,
+            "base_hash": hashlib.sha256(old_content.encode()).hexdigest(),
+            "edits": _make_content_edits(old_content, new_content),
         },
     )
 